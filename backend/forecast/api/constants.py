@@ -0,0 +1,35 @@
+"""Константы API."""
+
+SALE_FACT_FIELDS = (
+    "date",
+    "sales_type",
+    "sales_units",
+    "sales_units_promo",
+    "sales_rub",
+    "sales_run_promo",
+)
+SALE_RESAMPLED_FIELDS = (
+    "date",
+    "sales_units",
+    "sales_units_promo",
+    "sales_rub",
+    "sales_run_promo",
+    "promo_days",
+    "days",
+)
+SALE_LAYOUT_COLUMNS = "columns"
+SALE_LAYOUT_ROWS = "rows"
+SALE_LAYOUTS = (SALE_LAYOUT_ROWS, SALE_LAYOUT_COLUMNS)
+SALES_STREAM_CHUNK_SIZE = 2000
+FORECAST_BULK_BATCH_SIZE = 5000
+# Измерения отчета о точности прогнозов и соответствующие поля
+# ForecastAccuracy.
+ACCURACY_DIMENSIONS = {
+    "store": "store_id",
+    "sku": "sku_id",
+    "group": "sku__group",
+    "category": "sku__category",
+    "subcategory": "sku__subcategory",
+    "horizon": "horizon",
+}
+ACCURACY_DEFAULT_GROUP_BY = ("store", "sku", "horizon")
@@ -1,15 +1,224 @@
+from functools import reduce
+from operator import add, and_, or_
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, TextField, Value, When
+from django.db.models.functions import Cast, Greatest, Upper
 from django_filters import rest_framework as filters
-from sale.models import Category, Forecast, Store
+from rest_framework.filters import SearchFilter
+from sale.models import (Category, CityDailySales, DivisionCategoryDailySales,
+                         Forecast, ForecastAccuracy, Sale,
+                         StoreGroupDailySales, Store)
+
+# Наличие расширения pg_trgm по псевдониму базы данных.
+trigram_available = {}
+
+
+def has_trigram(using):
+    """
+    Проверяет, установлено ли в базе данных расширение pg_trgm.
+
+    Args:
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        bool: True для PostgreSQL с установленным pg_trgm.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    if using not in trigram_available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS(SELECT 1 FROM pg_extension "
+                "WHERE extname = 'pg_trgm')"
+            )
+            trigram_available[using] = cursor.fetchone()[0]
+    return trigram_available[using]
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Поиск по подстроке с ранжированием по похожести.
+
+    Каждое слово запроса должно встречаться хотя бы в одном поле
+    (как в SearchFilter), а в PostgreSQL с pg_trgm дополнительно находятся
+    записи, похожие на запрос целиком (опечатки, оператор %). Оба условия
+    используют триграммные GIN-индексы по UPPER(поле) из миграции
+    sale.0004_trigram_search_indexes. Результат упорядочен по убыванию
+    похожести (similarity), а без pg_trgm (SQLite) - по рангу совпадения:
+    полное совпадение поля, совпадение начала, вхождение подстроки.
+
+    Поддерживаются только поля без префиксов (^, =, @, $).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Фильтрует и упорядочивает набор данных по поисковому запросу."""
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        match = reduce(
+            and_,
+            (
+                reduce(
+                    or_,
+                    (Q(**{f"{field}__icontains": term}) for field in search_fields),
+                )
+                for term in search_terms
+            ),
+        )
+        query = " ".join(search_terms)
+        if has_trigram(queryset.db):
+            from django.contrib.postgres.lookups import TrigramSimilar
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            values = [Upper(Cast(field, TextField())) for field in search_fields]
+            ranks = [TrigramSimilarity(value, query.upper()) for value in values]
+            rank = Greatest(*ranks) if len(ranks) > 1 else ranks[0]
+            match = reduce(
+                or_,
+                (TrigramSimilar(value, query.upper()) for value in values),
+                match,
+            )
+        else:
+            rank = reduce(
+                add,
+                (
+                    Case(
+                        When(**{f"{field}__iexact": query}, then=Value(3)),
+                        When(**{f"{field}__istartswith": query}, then=Value(2)),
+                        When(**{f"{field}__icontains": query}, then=Value(1)),
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                    for field in search_fields
+                ),
+            )
+        return (
+            queryset.annotate(search_rank=rank)
+            .filter(match)
+            .order_by("-search_rank", "pk")
+        )
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Фильтр по списку строковых значений, перечисленных через запятую."""
 
 
 class ForecastFilter(filters.FilterSet):
-    """Фильтр для модели Forecast, позволяющий фильтровать прогнозы по дате."""
+    """
+    Фильтр для модели Forecast.
+
+    Позволяет фильтровать прогнозы по дате, одному или нескольким SKU
+    (sku__in=sku1,sku2), а также по группе, категории и подкатегории.
+    """
 
     forecast_date = filters.DateFromToRangeFilter()
+    sku = filters.CharFilter(field_name="sku_id")
+    sku__in = CharInFilter(field_name="sku_id", lookup_expr="in")
+    group = filters.CharFilter(field_name="sku__group")
+    category = filters.CharFilter(field_name="sku__category")
+    subcategory = filters.CharFilter(field_name="sku__subcategory")
 
     class Meta:
         model = Forecast
-        fields = ["forecast_date"]
+        fields = [
+            "forecast_date",
+            "sku",
+            "sku__in",
+            "group",
+            "category",
+            "subcategory",
+        ]
+
+
+class SaleFilter(filters.FilterSet):
+    """
+    Фильтр для модели Sale.
+
+    Позволяет ограничить продажи периодом (date_after/date_before)
+    и списком SKU (sku__in=sku1,sku2).
+    """
+
+    date = filters.DateFromToRangeFilter()
+    sku__in = CharInFilter(field_name="sku_id", lookup_expr="in")
+
+    class Meta:
+        """Параметры фильтра."""
+
+        model = Sale
+        fields = ["date", "sku__in"]
+
+
+class StoreGroupDailySalesFilter(filters.FilterSet):
+    """Фильтр продаж магазинов по группам за день."""
+
+    date = filters.DateFromToRangeFilter()
+    store = filters.CharFilter(field_name="store_id")
+
+    class Meta:
+        """Параметры фильтра."""
+
+        model = StoreGroupDailySales
+        fields = ["store", "group", "date"]
+
+
+class DivisionCategoryDailySalesFilter(filters.FilterSet):
+    """Фильтр продаж дивизионов по категориям за день."""
+
+    date = filters.DateFromToRangeFilter()
+
+    class Meta:
+        """Параметры фильтра."""
+
+        model = DivisionCategoryDailySales
+        fields = ["division", "category", "date"]
+
+
+class CityDailySalesFilter(filters.FilterSet):
+    """Фильтр продаж городов за день."""
+
+    date = filters.DateFromToRangeFilter()
+
+    class Meta:
+        """Параметры фильтра."""
+
+        model = CityDailySales
+        fields = ["city", "date"]
+
+
+class ForecastAccuracyFilter(filters.FilterSet):
+    """
+    Фильтр точности прогнозов.
+
+    Позволяет ограничить отчет магазином, одним или несколькими SKU,
+    группой, категорией, подкатегорией и диапазоном горизонта
+    (horizon_min/horizon_max).
+    """
+
+    store = filters.CharFilter(field_name="store_id")
+    sku = filters.CharFilter(field_name="sku_id")
+    sku__in = CharInFilter(field_name="sku_id", lookup_expr="in")
+    group = filters.CharFilter(field_name="sku__group")
+    category = filters.CharFilter(field_name="sku__category")
+    subcategory = filters.CharFilter(field_name="sku__subcategory")
+    horizon = filters.RangeFilter()
+
+    class Meta:
+        """Параметры фильтра."""
+
+        model = ForecastAccuracy
+        fields = [
+            "store",
+            "sku",
+            "sku__in",
+            "group",
+            "category",
+            "subcategory",
+            "horizon",
+        ]
 
 
 class StoreFilter(filters.FilterSet):
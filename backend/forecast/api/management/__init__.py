@@ -0,0 +1 @@
+"""Пакет команд управления приложения api."""
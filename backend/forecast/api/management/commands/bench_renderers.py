@@ -0,0 +1,108 @@
+"""Команда сравнения скорости рендереров и парсеров JSON."""
+
+import json
+from io import BytesIO
+from datetime import date, timedelta
+from decimal import Decimal
+from timeit import repeat
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+
+from api.utils import CustomRenderer, ORJSONCustomRenderer, ORJSONParser
+
+
+class Command(BaseCommand):
+    """
+    Сравнение скорости рендереров и парсеров JSON.
+
+    Рендеринг измеряется на синтетическом ответе списка продаж (как у
+    /api/sales/), разбор - на синтетическом пакете прогнозов для загрузки.
+    """
+
+    help = "Сравнивает скорость JSON-рендереров и парсеров API."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument(
+            "--skus", type=int, default=200, help="Количество SKU в ответе."
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Количество дней продаж на SKU."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Количество повторов замера."
+        )
+
+    @staticmethod
+    def get_sales(skus, days):
+        """Возвращает ответ списка продаж с заданным числом SKU и дней."""
+        start = date(2023, 1, 1)
+        return [
+            {
+                "store": "store",
+                "sku": f"sku{sku}",
+                "fact": [
+                    {
+                        "date": start + timedelta(days=day),
+                        "sales_type": day % 2,
+                        "sales_units": Decimal("12.0"),
+                        "sales_units_promo": Decimal("3.0"),
+                        "sales_rub": Decimal("1234.5"),
+                        "sales_run_promo": Decimal("321.5"),
+                    }
+                    for day in range(days)
+                ],
+            }
+            for sku in range(skus)
+        ]
+
+    @staticmethod
+    def get_forecasts(skus, days):
+        """Возвращает тело пакетной загрузки прогнозов в JSON."""
+        start = date(2023, 1, 1)
+        return json.dumps(
+            {
+                "data": [
+                    {
+                        "store": "store",
+                        "sku": f"sku{sku}",
+                        "forecast_date": start.isoformat(),
+                        "forecast": {
+                            (start + timedelta(days=day)).isoformat(): day
+                            for day in range(1, days + 1)
+                        },
+                    }
+                    for sku in range(skus)
+                ]
+            }
+        ).encode()
+
+    def measure(self, func, number):
+        """Возвращает лучшее время выполнения func в миллисекундах."""
+        return min(repeat(func, number=1, repeat=number)) * 1000
+
+    def handle(self, *args, **options):
+        """Измеряет скорость рендереров и парсеров и выводит результаты."""
+        sales = self.get_sales(options["skus"], options["days"])
+        context = {"response": Response(status=200)}
+        for renderer_class in (CustomRenderer, ORJSONCustomRenderer):
+            renderer = renderer_class()
+            elapsed = self.measure(
+                lambda: renderer.render(sales, renderer_context=context),
+                options["repeat"],
+            )
+            size = len(renderer.render(sales, renderer_context=context))
+            self.stdout.write(
+                f"{renderer_class.__name__}: {elapsed:.1f} мс, {size} байт"
+            )
+
+        body = self.get_forecasts(options["skus"], options["days"])
+        for parser_class in (JSONParser, ORJSONParser):
+            parser = parser_class()
+            elapsed = self.measure(
+                lambda: parser.parse(BytesIO(body), parser_context={}),
+                options["repeat"],
+            )
+            self.stdout.write(f"{parser_class.__name__}: {elapsed:.1f} мс")
@@ -0,0 +1,184 @@
+"""Команда сравнения хранения показателей продаж."""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from timeit import repeat
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import DecimalField, Value
+from django.db.models.functions import Cast
+from rest_framework.response import Response
+
+from api.utils import ORJSONCustomRenderer
+from api.views import SaleViewSet
+from sale.constants import DECIMAL_PLACES, MAX_DIGITS, SALE_TOTAL_FIELDS
+from sale.models import Category, Sale, Store
+
+BENCH_STORE = "bench_sales"
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с синтетическими продажами."""
+
+
+class Command(BaseCommand):
+    """
+    Замер хранения и чтения показателей продаж.
+
+    Синтетические продажи записываются в таблицу продаж в транзакции,
+    которая откатывается после замера. Сравниваются:
+
+    - размер показателей в строке (только PostgreSQL): bigint
+      с фиксированной точкой против numeric(15, 1);
+    - чтение показателей: numeric в Decimal (прежнее хранение, значения
+      приводятся к numeric в запросе), целых чисел в Decimal
+      (FixedPointDecimalField) и в float;
+    - список продаж /api/sales/: чтение и рендеринг в JSON с показателями
+      в Decimal и в float (ответы должны совпадать).
+    """
+
+    help = "Сравнивает размер и скорость чтения показателей продаж."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument(
+            "--skus", type=int, default=200, help="Количество SKU."
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Количество дней продаж на SKU."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Количество повторов замера."
+        )
+
+    @staticmethod
+    def create_sales(skus, days):
+        """Записывает синтетические продажи магазина BENCH_STORE."""
+        store = Store.objects.create(store=BENCH_STORE)
+        categories = Category.objects.bulk_create(
+            [Category(sku=f"{BENCH_STORE}_{sku}") for sku in range(skus)]
+        )
+        start = date(2023, 1, 1)
+        rng = random.Random(0)
+        Sale.objects.bulk_create(
+            [
+                Sale(
+                    store=store,
+                    sku=category,
+                    date=start + timedelta(days=day),
+                    sales_type=rng.random() < 0.2,
+                    sales_units=Decimal(rng.randint(1, 50)),
+                    sales_units_promo=Decimal(rng.randint(0, 10)),
+                    sales_rub=Decimal(rng.randint(10, 100000)).scaleb(-1),
+                    sales_run_promo=Decimal(rng.randint(0, 20000)).scaleb(-1),
+                )
+                for category in categories
+                for day in range(days)
+            ],
+            batch_size=5000,
+        )
+        return Sale.objects.filter(store=store)
+
+    @staticmethod
+    def get_row_sizes(queryset):
+        """
+        Возвращает средний размер показателей в строке в байтах.
+
+        Returns:
+            tuple: Размер целых чисел и того же значения в numeric(15, 1).
+        """
+        scale = Sale._meta.get_field("sales_units").scale
+        sql, params = queryset.values("id").query.sql_with_params()
+        fixed = " + ".join(
+            f"pg_column_size(s.{field})" for field in SALE_TOTAL_FIELDS
+        )
+        numeric = " + ".join(
+            f"pg_column_size((s.{field} / {scale}.0)"
+            f"::numeric({MAX_DIGITS}, {DECIMAL_PLACES}))"
+            for field in SALE_TOTAL_FIELDS
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT AVG({fixed}), AVG({numeric}) FROM {Sale._meta.db_table} s "
+                f"WHERE s.id IN ({sql})",
+                params,
+            )
+            return tuple(float(size) for size in cursor.fetchone())
+
+    def measure(self, func, number):
+        """Возвращает лучшее время выполнения func в миллисекундах."""
+        return min(repeat(func, number=1, repeat=number)) * 1000
+
+    def report(self, name, elapsed, rows):
+        """Выводит время замера и время на строку."""
+        self.stdout.write(
+            f"{name}: {elapsed:.1f} мс ({elapsed * 1000000 / rows:.0f} нс/строка)"
+        )
+
+    def handle(self, *args, **options):
+        """Выполняет замеры и откатывает созданные продажи."""
+        try:
+            with transaction.atomic():
+                self.bench(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def bench(self, options):
+        """Создает продажи и выводит результаты замеров."""
+        queryset = self.create_sales(options["skus"], options["days"])
+        rows = queryset.count()
+        number = options["repeat"]
+        self.stdout.write(f"Продаж: {rows}")
+
+        if connection.vendor == "postgresql":
+            fixed, numeric = self.get_row_sizes(queryset)
+            self.stdout.write(
+                f"Размер показателей в строке: bigint {fixed:.1f} байт, "
+                f"numeric {numeric:.1f} байт"
+            )
+
+        scale = Sale._meta.get_field("sales_units").scale
+        numeric = [
+            Cast(
+                Cast(field, DecimalField(max_digits=MAX_DIGITS, decimal_places=0))
+                / Value(Decimal(scale)),
+                DecimalField(max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES),
+            )
+            for field in SALE_TOTAL_FIELDS
+        ]
+        for name, fields in (
+            ("Чтение numeric -> Decimal", numeric),
+            ("Чтение bigint -> Decimal", list(SALE_TOTAL_FIELDS)),
+            (
+                "Чтение bigint -> float",
+                queryset.get_value_expressions(SALE_TOTAL_FIELDS, as_float=True),
+            ),
+        ):
+            values = queryset.values_list(*fields)
+            self.report(name, self.measure(lambda: list(values.all()), number), rows)
+
+        renderer = ORJSONCustomRenderer()
+        context = {"response": Response(status=200)}
+        responses = {}
+        for as_float in (False, True):
+            def render():
+                sales = list(
+                    SaleViewSet.sales_by_sku(
+                        queryset, BENCH_STORE, as_float=as_float
+                    )
+                )
+                return renderer.render(sales, renderer_context=context)
+
+            responses[as_float] = render()
+            self.report(
+                f"Список продаж ({'float' if as_float else 'Decimal'})",
+                self.measure(render, number),
+                rows,
+            )
+        self.stdout.write(
+            "Ответы совпадают: "
+            + ("да" if responses[False] == responses[True] else "нет")
+        )
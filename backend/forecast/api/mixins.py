@@ -0,0 +1,67 @@
+"""Примеси представлений API."""
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from sale.constants import RESAMPLE_FREQUENCIES
+
+
+class ReferenceCacheMixin:
+    """
+    Отдает справочник из кэша процесса (см. sale.cache.ReferenceCache).
+
+    Запросы без фильтров и поиска обслуживаются без обращения к базе
+    данных; запросы с параметрами фильтрации выполняются как обычно.
+    """
+
+    reference_cache = None
+
+    def is_filtered(self):
+        """Проверяет, переданы ли в запросе параметры, кроме формата ответа."""
+        return any(
+            param != api_settings.URL_FORMAT_OVERRIDE
+            for param in self.request.query_params
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Возвращает список объектов справочника."""
+        if self.is_filtered():
+            return super().list(request, *args, **kwargs)
+        return Response(self.reference_cache.get_data(self.get_serializer_class()))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Возвращает объект справочника по первичному ключу."""
+        if self.is_filtered():
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = self.reference_cache.get(kwargs[lookup_url_kwarg])
+        if instance is None:
+            raise NotFound
+        return Response(self.get_serializer(instance).data)
+
+
+class ResampleMixin:
+    """Разбор параметра freq - периода агрегации дневных значений."""
+
+    freq_query_param = "freq"
+
+    def get_freq(self):
+        """
+        Возвращает период агрегации из запроса.
+
+        Returns:
+            str | None: W - неделя, M - месяц, None - без агрегации.
+        """
+        freq = self.request.query_params.get(self.freq_query_param)
+        if not freq:
+            return None
+        freq = freq.upper()
+        if freq not in RESAMPLE_FREQUENCIES:
+            raise ValidationError(
+                {
+                    self.freq_query_param: (
+                        f"Допустимые значения: {', '.join(RESAMPLE_FREQUENCIES)}."
+                    )
+                }
+            )
+        return freq
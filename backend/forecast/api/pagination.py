@@ -0,0 +1,282 @@
+"""Пагинация API."""
+
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from heapq import merge
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset).
+
+    Страница задается не смещением, а значением ключа сортировки последней
+    записи предыдущей страницы, поэтому любая страница читается как
+    диапазон по индексу, независимо от ее глубины. Пагинация включается,
+    только если в запросе передан `cursor` или `page_size`, иначе ответ
+    возвращается целиком, как раньше.
+    """
+
+    ordering = ()
+    page_size = 1000
+    max_page_size = 10000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None, extra_rows=None):
+        """
+        Возвращает записи текущей страницы.
+
+        Args:
+            queryset (QuerySet): Набор данных (модели или словари values()).
+            request (Request): HTTP-запрос.
+            view: Вьюсет.
+            extra_rows (Callable | None): Функция, получающая позицию
+                курсора (список строк или None) и возвращающая
+                дополнительные записи не из базы данных (например, из архива)
+                после этой позиции, упорядоченные так же, как queryset.
+                Они объединяются с записями набора данных по ключу и читаются,
+                только пока страница не заполнена; при совпадении ключа
+                остается запись набора данных.
+
+        Returns:
+            list | None: Записи страницы или None, если пагинация не запрошена.
+        """
+        if not (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        ):
+            return None
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    **{f"{self.ordering[0]}__gte": position[0]}
+                ).filter(self.get_position_filter(position))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[: page_size + 1])
+        if extra_rows is not None:
+            rows = list(
+                islice(
+                    self.merge_rows(rows, extra_rows(position), position),
+                    page_size + 1,
+                )
+            )
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = [
+                self.get_key_value(rows[-1], field) for field in self.ordering
+            ]
+        return rows
+
+    def merge_rows(self, rows, extra_rows, position):
+        """
+        Объединяет записи набора данных и дополнительные записи по ключу.
+
+        Args:
+            rows (list): Записи набора данных после позиции.
+            extra_rows (Iterable): Дополнительные записи.
+            position (list | None): Позиция курсора.
+
+        Yields:
+            Записи в порядке ключа без повторов ключа.
+        """
+        if position is not None:
+            extra_rows = (
+                row for row in extra_rows
+                if self.get_row_key(row) > tuple(position)
+            )
+        previous = None
+        # merge устойчива: при равных ключах запись набора данных идет первой.
+        for row in merge(rows, extra_rows, key=self.get_row_key):
+            key = self.get_row_key(row)
+            if key != previous:
+                yield row
+            previous = key
+
+    def get_page_size(self, request):
+        """Возвращает размер страницы из запроса с учетом ограничения."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, position):
+        """
+        Строит условие "ключ записи больше position".
+
+        Для ключа (a, b) это (a > x) OR (a = x AND b > y).
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            condition |= Q(
+                **dict(zip(self.ordering[:index], position[:index])),
+                **{f"{field}__gt": position[index]},
+            )
+        return condition
+
+    def get_row_key(self, row):
+        """Возвращает ключ записи в виде строк, как в курсоре."""
+        return tuple(str(self.get_key_value(row, field)) for field in self.ordering)
+
+    @staticmethod
+    def get_key_value(row, field):
+        """Возвращает значение поля ключа для модели или словаря."""
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
+
+    def decode_cursor(self, request):
+        """Декодирует курсор из запроса."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(b64decode(encoded.encode()).decode())
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        """Кодирует позицию в строку курсора."""
+        return b64encode(
+            json.dumps([str(value) for value in position]).encode()
+        ).decode()
+
+    def get_next_link(self):
+        """Возвращает ссылку на следующую страницу."""
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def set_next_link_header(self, response):
+        """
+        Передает ссылку на следующую страницу в заголовке Link.
+
+        Используется для форматов, в которых нет места для ссылки
+        в теле ответа (NDJSON, Arrow, Parquet).
+
+        Args:
+            response (HttpResponseBase): Ответ со страницей.
+
+        Returns:
+            HttpResponseBase: Тот же ответ.
+        """
+        next_link = self.get_next_link()
+        if next_link is not None:
+            response["Link"] = f'<{next_link}>; rel="next"'
+        return response
+
+    def get_paginated_response(self, data):
+        """Возвращает ответ со страницей и ссылкой на следующую."""
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        """Описание ответа для OpenAPI."""
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        """Параметры пагинации для OpenAPI."""
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор следующей страницы.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Количество записей на странице.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class SaleKeysetPagination(KeysetPagination):
+    """
+    Пагинация продаж по ключу (sku, date).
+
+    Внутри магазина использует индекс sale_store_sku_date_cover_idx.
+    """
+
+    ordering = ("sku_id", "date")
+
+
+class ForecastKeysetPagination(KeysetPagination):
+    """
+    Пагинация прогнозов по ключу (sku, forecast_date).
+
+    Внутри магазина использует индекс unique_store_sku_fore_date_in_forecast.
+    """
+
+    ordering = ("sku_id", "forecast_date")
+
+
+class StoreGroupRollupPagination(KeysetPagination):
+    """Пагинация продаж магазинов по группам по ключу (store, group, date)."""
+
+    ordering = ("store_id", "group", "date")
+
+
+class DivisionCategoryRollupPagination(KeysetPagination):
+    """
+    Пагинация продаж дивизионов по категориям.
+
+    Ключ страницы - (division, category, date).
+    """
+
+    ordering = ("division", "category", "date")
+
+
+class CityRollupPagination(KeysetPagination):
+    """Пагинация продаж городов по ключу (city, date)."""
+
+    ordering = ("city", "date")
+
+
+class ForecastAccuracyPagination(KeysetPagination):
+    """
+    Пагинация отчета о точности прогнозов.
+
+    Ключ - измерения группировки отчета, выбранные в запросе
+    (см. ForecastAccuracyViewSet.get_dimensions).
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Возвращает строки страницы, упорядоченные по измерениям отчета."""
+        self.ordering = tuple(view.get_dimensions().values())
+        return super().paginate_queryset(queryset, request, view)
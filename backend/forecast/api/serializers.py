@@ -1,5 +1,14 @@
 from rest_framework import serializers
-from sale.models import Category, DayForecast, Forecast, Sale, Store
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+from sale.accuracy import ACCURACY_SUM_FIELDS, get_accuracy_metrics
+from sale.cache import category_cache, store_cache
+from sale.constants import DECIMAL_PLACES, MAX_DIGITS, SALE_TOTAL_FIELDS
+from sale.models import (Category, CityDailySales, DayForecast,
+                         DivisionCategoryDailySales, Forecast, Sale,
+                         StoreGroupDailySales, Store)
+
+from .constants import FORECAST_BULK_BATCH_SIZE
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -10,6 +19,50 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ("sku", "group", "category", "subcategory", "uom")
 
 
+def build_category_tree(categories):
+    """
+    Строит дерево группа -> категория -> подкатегория -> SKU.
+
+    Args:
+        categories (Iterable[Category]): Категории товаров.
+
+    Returns:
+        list: Узлы групп, упорядоченные по названию, с вложенными узлами
+        и количеством SKU (sku_count) в каждом узле.
+    """
+    tree = {}
+    for category in categories:
+        tree.setdefault(category.group, {}).setdefault(
+            category.category, {}
+        ).setdefault(category.subcategory, []).append(category.sku)
+
+    groups = []
+    for group, group_categories in sorted(tree.items()):
+        category_nodes = []
+        for category, subcategories in sorted(group_categories.items()):
+            subcategory_nodes = [
+                {"subcategory": subcategory, "sku_count": len(skus), "skus": skus}
+                for subcategory, skus in sorted(subcategories.items())
+            ]
+            category_nodes.append(
+                {
+                    "category": category,
+                    "sku_count": sum(
+                        node["sku_count"] for node in subcategory_nodes
+                    ),
+                    "subcategories": subcategory_nodes,
+                }
+            )
+        groups.append(
+            {
+                "group": group,
+                "sku_count": sum(node["sku_count"] for node in category_nodes),
+                "categories": category_nodes,
+            }
+        )
+    return groups
+
+
 class StoreSerializer(serializers.ModelSerializer):
     """Сериализатор магазина."""
 
@@ -45,6 +98,79 @@ class SaleListSerializer(serializers.ModelSerializer):
         )
 
 
+class StoreGroupDailySalesSerializer(serializers.ModelSerializer):
+    """Сериализатор продаж магазина по группе за день."""
+
+    class Meta:
+        """Параметры сериализатора."""
+
+        model = StoreGroupDailySales
+        fields = ("store", "group", "date", *SALE_TOTAL_FIELDS)
+
+
+class DivisionCategoryDailySalesSerializer(serializers.ModelSerializer):
+    """Сериализатор продаж дивизиона по категории за день."""
+
+    class Meta:
+        """Параметры сериализатора."""
+
+        model = DivisionCategoryDailySales
+        fields = ("division", "category", "date", *SALE_TOTAL_FIELDS)
+
+
+class CityDailySalesSerializer(serializers.ModelSerializer):
+    """Сериализатор продаж города за день."""
+
+    class Meta:
+        """Параметры сериализатора."""
+
+        model = CityDailySales
+        fields = ("city", "date", *SALE_TOTAL_FIELDS)
+
+
+class ForecastAccuracySerializer(serializers.Serializer):
+    """
+    Сериализатор строки отчета о точности прогнозов.
+
+    Измерения, не входящие в группировку отчета (group_by), в ответ
+    не попадают.
+    """
+
+    store = serializers.CharField(required=False)
+    sku = serializers.CharField(required=False)
+    group = serializers.CharField(required=False)
+    category = serializers.CharField(required=False)
+    subcategory = serializers.CharField(required=False)
+    horizon = serializers.IntegerField(required=False)
+    days = serializers.IntegerField()
+    forecast_units = serializers.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES
+    )
+    fact_units = serializers.DecimalField(
+        max_digits=MAX_DIGITS, decimal_places=DECIMAL_PLACES
+    )
+    wape = serializers.FloatField(allow_null=True)
+    bias = serializers.FloatField(allow_null=True)
+    mae = serializers.FloatField(allow_null=True)
+
+    def to_representation(self, instance):
+        """Возвращает измерения строки, суммы и метрики точности."""
+        sums = {
+            field: instance[f"{field}_sum"]
+            for field in ("days", *ACCURACY_SUM_FIELDS)
+        }
+        return {
+            **{
+                name: instance[path]
+                for name, path in self.context["dimensions"].items()
+            },
+            "days": sums["days"],
+            "forecast_units": sums["forecast_units"],
+            "fact_units": sums["fact_units"],
+            **get_accuracy_metrics(sums),
+        }
+
+
 class DayForecastSerializer(serializers.ModelSerializer):
     """Сериализатор для модели DayForecast."""
 
@@ -53,32 +179,277 @@ class DayForecastSerializer(serializers.ModelSerializer):
         fields = ("date", "units")
 
 
+class ReferenceSlugField(serializers.SlugRelatedField):
+    """
+    Ссылка на объект справочника по первичному ключу.
+
+    В отличие от SlugRelatedField не обращается к базе данных: значение
+    проверяется по кэшу справочника (см. sale.cache), в представление
+    попадает значение внешнего ключа без чтения связанного объекта.
+    """
+
+    def __init__(self, reference_cache, **kwargs):
+        """
+        Создает поле ссылки на справочник.
+
+        Args:
+            reference_cache (ReferenceCache): Кэш справочника.
+            **kwargs: Аргументы SlugRelatedField.
+        """
+        self.reference_cache = reference_cache
+        model = reference_cache.model
+        kwargs.setdefault("queryset", model.objects.all())
+        super().__init__(slug_field=model._meta.pk.name, **kwargs)
+
+    def use_pk_only_optimization(self):
+        """Разрешает представление без чтения связанного объекта."""
+        return True
+
+    def to_internal_value(self, data):
+        """
+        Проверяет, что объект справочника существует.
+
+        Args:
+            data: Значение первичного ключа.
+
+        Returns:
+            str: Первичный ключ объекта справочника.
+        """
+        if not isinstance(data, str):
+            self.fail("invalid")
+        if data not in self.reference_cache.get_many({data}):
+            self.fail("does_not_exist", slug_name=self.slug_field, value=data)
+        return data
+
+    def to_representation(self, value):
+        """Возвращает первичный ключ объекта справочника."""
+        return value.pk
+
+
+class ForecastListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор пакета прогнозов.
+
+    Проверяет весь пакет по кэшу справочников магазинов и SKU
+    (см. sale.cache) и сохраняет его двумя вставками bulk_create:
+    сначала все прогнозы, затем все прогнозы дней.
+    """
+
+    @staticmethod
+    def get_keys(attrs, field):
+        """Возвращает строковые значения поля прогнозов пакета."""
+        return {
+            item.get(field)
+            for item in attrs
+            if isinstance(item, dict) and isinstance(item.get(field), str)
+        }
+
+    def validate(self, attrs):
+        """
+        Проверяет пакет прогнозов.
+
+        Args:
+            attrs (list): Прогнозы пакета.
+
+        Returns:
+            list: Прогнозы с преобразованными датами и количеством.
+        """
+        stores = store_cache.get_many(self.get_keys(attrs, "store"))
+        skus = category_cache.get_many(self.get_keys(attrs, "sku"))
+        date_field = serializers.DateField()
+        units_field = serializers.IntegerField(min_value=0)
+        error_messages = serializers.SlugRelatedField.default_error_messages
+        does_not_exist = error_messages["does_not_exist"]
+        invalid = error_messages["invalid"]
+
+        result = []
+        errors = []
+        keys = set()
+        for item in attrs:
+            item_errors = {}
+            for field, references in (("store", stores), ("sku", skus)):
+                value = item.get(field)
+                if not isinstance(value, str):
+                    item_errors[field] = [invalid]
+                elif value not in references:
+                    item_errors[field] = [
+                        does_not_exist.format(slug_name=field, value=value)
+                    ]
+            try:
+                forecast_date = date_field.run_validation(item.get("forecast_date"))
+            except serializers.ValidationError as error:
+                item_errors["forecast_date"] = error.detail
+            try:
+                days_forecast = [
+                    {
+                        "date": date_field.run_validation(day_forecast["date"]),
+                        "units": units_field.run_validation(day_forecast["units"]),
+                    }
+                    for day_forecast in item["forecast"]
+                ]
+            except serializers.ValidationError as error:
+                item_errors["forecast"] = error.detail
+
+            if not item_errors:
+                key = (item["store"], item["sku"], forecast_date)
+                if key in keys:
+                    item_errors[api_settings.NON_FIELD_ERRORS_KEY] = [
+                        "Прогноз повторяется в пакете."
+                    ]
+                keys.add(key)
+            errors.append(item_errors)
+            if not item_errors:
+                result.append(
+                    {
+                        "store": item["store"],
+                        "sku": item["sku"],
+                        "forecast_date": forecast_date,
+                        "forecast": days_forecast,
+                    }
+                )
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return result
+
+    def create(self, validated_data):
+        """
+        Сохраняет пакет прогнозов двумя вставками bulk_create.
+
+        Если в контексте передан флаг upsert, существующие прогнозы
+        с тем же магазином, SKU и датой расчета не вызывают конфликт:
+        их прогнозы дней заменяются прогнозами из пакета. При компактном
+        хранении прогнозы дней, идущие подряд, записываются в сам прогноз,
+        и строки DayForecast для них не создаются.
+
+        Args:
+            validated_data (list): Проверенные прогнозы пакета.
+
+        Returns:
+            list: Объекты прогнозов пакета.
+        """
+        forecasts = [
+            Forecast(
+                store_id=item["store"],
+                sku_id=item["sku"],
+                forecast_date=item["forecast_date"],
+            )
+            for item in validated_data
+        ]
+        if Forecast.is_compact_storage():
+            for forecast, item in zip(forecasts, validated_data):
+                forecast.pack_days(item["forecast"])
+        if self.context.get("upsert"):
+            self.upsert_forecasts(forecasts)
+        else:
+            Forecast.objects.bulk_create(
+                forecasts, batch_size=FORECAST_BULK_BATCH_SIZE
+            )
+        DayForecast.objects.bulk_create(
+            [
+                DayForecast(forecast_sku_of_store=forecast, **day_forecast)
+                for forecast, item in zip(forecasts, validated_data)
+                if forecast.horizon_units is None
+                for day_forecast in item["forecast"]
+            ],
+            batch_size=FORECAST_BULK_BATCH_SIZE,
+        )
+        return forecasts
+
+    @staticmethod
+    def upsert_forecasts(forecasts):
+        """
+        Вставляет или обновляет прогнозы и очищает их дни.
+
+        Вставка выполняется через INSERT ... ON CONFLICT DO UPDATE
+        по уникальному ключу прогноза (обновляется компактный горизонт),
+        после чего идентификаторы всех прогнозов пакета читаются одним
+        запросом, а их прежние прогнозы дней удаляются.
+
+        Args:
+            forecasts (list): Несохраненные объекты прогнозов.
+        """
+        Forecast.objects.bulk_create(
+            forecasts,
+            batch_size=FORECAST_BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=("store", "sku", "forecast_date"),
+            update_fields=("horizon_start", "horizon_units"),
+        )
+        ids = {
+            (store, sku, forecast_date): pk
+            for pk, store, sku, forecast_date in Forecast.objects.filter(
+                store_id__in={forecast.store_id for forecast in forecasts},
+                sku_id__in={forecast.sku_id for forecast in forecasts},
+                forecast_date__in={forecast.forecast_date for forecast in forecasts},
+            ).values_list("pk", "store_id", "sku_id", "forecast_date")
+        }
+        for forecast in forecasts:
+            forecast.pk = ids[
+                (forecast.store_id, forecast.sku_id, forecast.forecast_date)
+            ]
+
+        pks = [forecast.pk for forecast in forecasts]
+        for start in range(0, len(pks), FORECAST_BULK_BATCH_SIZE):
+            DayForecast.objects.filter(
+                forecast_sku_of_store_id__in=pks[
+                    start : start + FORECAST_BULK_BATCH_SIZE
+                ]
+            ).delete()
+
+
+class ForecastBulkResultSerializer(serializers.Serializer):
+    """Ответ пакетной загрузки прогнозов (bulk=true или upsert=true)."""
+
+    forecasts = serializers.IntegerField(help_text="Число сохраненных прогнозов")
+    days = serializers.IntegerField(help_text="Число сохраненных прогнозов дней")
+
+
 class ForecastSerializer(serializers.ModelSerializer):
     """Сериализатор прогноза."""
 
-    store = serializers.SlugRelatedField(
-        slug_field="store", queryset=Store.objects.all()
-    )
-    sku = serializers.SlugRelatedField(
-        slug_field="sku", queryset=Category.objects.all()
-    )
+    store = ReferenceSlugField(store_cache)
+    sku = ReferenceSlugField(category_cache)
     forecast = DayForecastSerializer(many=True)
 
     class Meta:
         model = Forecast
         fields = ("store", "sku", "forecast_date", "forecast")
+        list_serializer_class = ForecastListSerializer
 
     def to_representation(self, instance):
         """
         Преобразует объект прогноза в формат для представления.
 
+        Если в контексте передан resampled (см. ForecastViewSet.list),
+        прогноз дней заменяется суммами по периодам.
+
         Args:
             instance: Объект прогноза.
 
         Returns:
             dict: Сериализованный прогноз в нужном формате.
         """
+        resampled = self.context.get("resampled")
+        if resampled is not None:
+            return {
+                "store": instance.store_id,
+                "sku": instance.sku_id,
+                "forecast_date": self.fields["forecast_date"].to_representation(
+                    instance.forecast_date
+                ),
+                "forecast": {
+                    period.isoformat(): units
+                    for period, units in resampled.get(instance.pk, {}).items()
+                },
+            }
         forecast = super().to_representation(instance)
+        if instance.horizon_units is not None:
+            forecast["forecast"] = {
+                date.isoformat(): units
+                for date, units in instance.get_days_forecast()
+            }
+            return forecast
         forecast["forecast"] = {
             day_forecast["date"]: day_forecast["units"]
             for day_forecast in forecast["forecast"]
@@ -94,7 +465,40 @@ class ForecastSerializer(serializers.ModelSerializer):
 
         Returns:
             dict: Преобразованные внутренние данные.
+
+        Магазин и SKU отдельного прогноза проверяются по кэшу справочников;
+        в пакете они проверяются сразу для всего пакета
+        (см. ForecastListSerializer.validate).
+
+        Raises:
+            ValidationError: Данные не являются словарем, прогноз дней
+            отсутствует либо не является словарем {дата: спрос}, магазина
+            или SKU нет в справочнике.
         """
+        if not isinstance(data, dict):
+            message = self.error_messages["invalid"].format(
+                datatype=type(data).__name__
+            )
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+            )
+        if "forecast" not in data:
+            raise serializers.ValidationError(
+                {"forecast": [self.fields["forecast"].error_messages["required"]]}
+            )
+        if not isinstance(data["forecast"], dict):
+            raise serializers.ValidationError(
+                {"forecast": ["Ожидался словарь {дата: спрос в ШТ}."]}
+            )
+        if not isinstance(self.parent, serializers.ListSerializer):
+            errors = {}
+            for field in ("store", "sku"):
+                try:
+                    self.fields[field].run_validation(data.get(field, empty))
+                except serializers.ValidationError as error:
+                    errors[field] = error.detail
+            if errors:
+                raise serializers.ValidationError(errors)
         data["forecast"] = [
             {"date": date, "units": units} for date, units in data["forecast"].items()
         ]
@@ -121,13 +525,26 @@ class ForecastSerializer(serializers.ModelSerializer):
             Forecast: Созданный объект прогноза.
         """
         days_forecast = validated_data.pop("forecast")
-        forecast = Forecast.objects.create(
+        forecast = Forecast(
             store_id=validated_data["store"],
             sku_id=validated_data["sku"],
             forecast_date=validated_data["forecast_date"],
         )
-
-        self.set_days_forecast(forecast, days_forecast)
+        if Forecast.is_compact_storage():
+            date_field = serializers.DateField()
+            forecast.pack_days(
+                [
+                    {
+                        "date": date_field.to_internal_value(day_forecast["date"]),
+                        "units": day_forecast["units"],
+                    }
+                    for day_forecast in days_forecast
+                ]
+            )
+        forecast.save()
+
+        if forecast.horizon_units is None:
+            self.set_days_forecast(forecast, days_forecast)
 
         return forecast
 
@@ -185,12 +602,8 @@ class SaleDeSerializer(serializers.ModelSerializer):
     Используется только для получения данных.
     """
 
-    store = serializers.SlugRelatedField(
-        slug_field="store", source="st_id", queryset=Store.objects.all()
-    )
-    sku = serializers.SlugRelatedField(
-        slug_field="sku", source="pr_sku_id", queryset=Category.objects.all()
-    )
+    store = ReferenceSlugField(store_cache, source="st_id")
+    sku = ReferenceSlugField(category_cache, source="pr_sku_id")
     date = serializers.DateField()
     sales_type = serializers.IntegerField(source="pr_sales_type_id")
     sales_units = serializers.IntegerField(source="pr_sales_in_units")
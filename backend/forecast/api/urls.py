@@ -3,7 +3,10 @@ from drf_spectacular.views import (SpectacularAPIView, SpectacularSwaggerView,
                                    SpectacularRedocView)
 from rest_framework import routers
 
-from .views import CategoryViewSet, ForecastViewSet, SaleViewSet, StoreViewSet
+from .views import (CategoryViewSet, CityDailySalesViewSet,
+                    DivisionCategoryDailySalesViewSet,
+                    ForecastAccuracyViewSet, ForecastViewSet,
+                    SaleViewSet, StoreGroupDailySalesViewSet, StoreViewSet)
 
 router_v1 = routers.DefaultRouter()
 
@@ -11,6 +14,13 @@ router_v1.register(r"categories", CategoryViewSet, basename="categories")
 router_v1.register(r"shops", StoreViewSet, basename="shops")
 router_v1.register(r"sales", SaleViewSet, basename="sales")
 router_v1.register(r"forecast", ForecastViewSet, basename="forecast")
+router_v1.register(r"rollups/stores", StoreGroupDailySalesViewSet,
+                   basename="rollups-stores")
+router_v1.register(r"rollups/divisions", DivisionCategoryDailySalesViewSet,
+                   basename="rollups-divisions")
+router_v1.register(r"rollups/cities", CityDailySalesViewSet,
+                   basename="rollups-cities")
+router_v1.register(r"accuracy", ForecastAccuracyViewSet, basename="accuracy")
 
 urlpatterns = [
     path("", include(router_v1.urls)),
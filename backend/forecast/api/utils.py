@@ -1,8 +1,25 @@
-from rest_framework.renderers import JSONRenderer
+import abc
+import codecs
+import csv
+import json
 
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
 
-class CustomRenderer(JSONRenderer):
-    """Кастомный рендерер для форматирования ответа API."""
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class DataEnvelopeMixin:
+    """Оборачивает успешный ответ API в {"data": ...}, ошибки - как есть."""
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
         """Рендеринг данных для API-ответа."""
@@ -11,6 +28,207 @@ class CustomRenderer(JSONRenderer):
         if not str(status_code).startswith("2"):
             response = data
 
-        return super(CustomRenderer, self).render(
-            response, accepted_media_type, renderer_context
-        )
+        return super().render(response, accepted_media_type, renderer_context)
+
+
+class CustomRenderer(DataEnvelopeMixin, JSONRenderer):
+    """Кастомный рендерер для форматирования ответа API."""
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Рендерер JSON на основе orjson.
+
+    Даты, списки и словари (в том числе ReturnDict/ReturnList
+    сериализаторов) кодируются orjson напрямую, без промежуточных вызовов
+    Python. Остальные типы (Decimal, ленивые строки, QuerySet и т.п.)
+    приводятся так же, как в стандартном JSONEncoder DRF.
+    """
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендеринг данных в JSON."""
+        if data is None:
+            return b""
+        return orjson.dumps(data, default=self.encoder.default, option=self.options)
+
+
+class ORJSONCustomRenderer(DataEnvelopeMixin, ORJSONRenderer):
+    """Кастомный рендерер ответа API на основе orjson."""
+
+
+class ORJSONParser(BaseParser):
+    """Парсер JSON на основе orjson."""
+
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Разбирает тело запроса в формате JSON."""
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Рендерер в формате NDJSON (один JSON-объект на строку).
+
+    Используется для потоковой отдачи больших списков: каждый объект
+    кодируется отдельно, поэтому ответ можно отправлять по частям.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+    encoder_class = encoders.JSONEncoder
+
+    def render_lines(self, objects):
+        """
+        Кодирует объекты построчно.
+
+        Args:
+            objects: Итерируемый набор объектов.
+
+        Yields:
+            bytes: Строка NDJSON для каждого объекта.
+        """
+        for obj in objects:
+            yield (
+                json.dumps(obj, cls=self.encoder_class, ensure_ascii=False) + "\n"
+            ).encode()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендеринг данных: список - построчно, остальное - одной строкой."""
+        if data is None:
+            return b""
+        if not isinstance(data, list):
+            data = [data]
+        return b"".join(self.render_lines(data))
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Рендерер в формате CSV для потоковой выгрузки строк.
+
+    Ответы с ошибкой отдаются в JSON, так как не являются таблицей.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    class Echo:
+        """Буфер для csv.writer, возвращающий записанную строку."""
+
+        def write(self, value):
+            """Возвращает записанную строку."""
+            return value
+
+    def render_lines(self, rows, header=None):
+        """
+        Кодирует строки таблицы в CSV построчно.
+
+        Args:
+            rows: Итерируемый набор строк (кортежей значений).
+            header (Iterable[str] | None): Заголовок таблицы.
+
+        Yields:
+            str: Строка CSV.
+        """
+        writer = csv.writer(self.Echo())
+        if header is not None:
+            yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендеринг списка строк или ответа с ошибкой."""
+        response = renderer_context["response"]
+        if not str(response.status_code).startswith("2"):
+            response["Content-Type"] = ORJSONRenderer.media_type
+            return ORJSONRenderer().render(data)
+        return "".join(self.render_lines(data)).encode(self.charset)
+
+
+class TableRenderer(BaseRenderer, metaclass=abc.ABCMeta):
+    """
+    Базовый рендерер таблицы в двоичном колоночном формате (pyarrow).
+
+    Данные ответа - словарь {колонка: список значений}. Ответы с ошибкой
+    отдаются в JSON, так как не являются таблицей.
+    """
+
+    charset = None
+    tabular = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Рендеринг таблицы колонок."""
+        response = renderer_context["response"]
+        if not str(response.status_code).startswith("2"):
+            response["Content-Type"] = ORJSONRenderer.media_type
+            return ORJSONRenderer().render(data)
+        sink = pyarrow.BufferOutputStream()
+        self.write_table(pyarrow.table(data), sink)
+        return sink.getvalue().to_pybytes()
+
+    @abc.abstractmethod
+    def write_table(self, table, sink):
+        """Записывает таблицу pyarrow в поток."""
+
+
+class ArrowRenderer(TableRenderer):
+    """Рендерер в формате Apache Arrow IPC (stream)."""
+
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+
+    def write_table(self, table, sink):
+        """Записывает таблицу в формате Arrow IPC."""
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+class ParquetRenderer(TableRenderer):
+    """Рендерер в формате Apache Parquet."""
+
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+    def write_table(self, table, sink):
+        """Записывает таблицу в формате Parquet."""
+        pyarrow.parquet.write_table(table, sink)
+
+
+# Рендереры Arrow и Parquet доступны, только если установлен pyarrow.
+TABLE_RENDERERS = (ArrowRenderer, ParquetRenderer) if pyarrow is not None else ()
+
+
+class UploadStreamParser(BaseParser):
+    """
+    Парсер, возвращающий тело запроса как текстовый поток.
+
+    Тело не читается целиком: обработчик читает его построчно сам.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Возвращает текстовый поток тела запроса."""
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        return codecs.getreader(encoding)(stream)
+
+
+class CSVUploadParser(UploadStreamParser):
+    """Парсер загрузки в формате CSV."""
+
+    media_type = "text/csv"
+
+
+class NDJSONUploadParser(UploadStreamParser):
+    """Парсер загрузки в формате NDJSON."""
+
+    media_type = "application/x-ndjson"
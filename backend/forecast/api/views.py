@@ -1,18 +1,60 @@
-from django.db import IntegrityError
+import hashlib
+import json
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Sum
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (OpenApiParameter, OpenApiResponse,
+                                   PolymorphicProxySerializer, extend_schema,
                                    extend_schema_view)
 from drf_standardized_errors.openapi import AutoSchema
-from rest_framework import filters, mixins, viewsets, status
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from sale.models import Category, Forecast, Sale, Store
+from sale.accuracy import ACCURACY_SUM_FIELDS
+from sale.archive import iter_archived_sales, resample_sales
+from sale.cache import category_cache, store_cache
+from sale.constants import RESAMPLE_FREQUENCIES
+from sale.loaders import (FORECAST_COLUMNS, ForecastLoadError,
+                          export_forecast_rows, load_forecasts)
+from sale.models import (Category, CityDailySales, DayForecast,
+                         DivisionCategoryDailySales, Forecast,
+                         ForecastAccuracy, Sale, StoreGroupDailySales, Store)
 
-from .filters import CategoryFilter, ForecastFilter, StoreFilter
-from .serializers import (CategorySerializer, ForecastSerializer,
-                          StoreSerializer, SaleListSerializer,
-                          SaleRetrieveSerializer)
-from .utils import CustomRenderer
+from .constants import (ACCURACY_DEFAULT_GROUP_BY, ACCURACY_DIMENSIONS,
+                        SALE_FACT_FIELDS, SALE_LAYOUT_COLUMNS,
+                        SALE_LAYOUT_ROWS, SALE_LAYOUTS, SALE_RESAMPLED_FIELDS,
+                        SALES_STREAM_CHUNK_SIZE)
+from .filters import (CategoryFilter, CityDailySalesFilter,
+                      DivisionCategoryDailySalesFilter,
+                      ForecastAccuracyFilter, ForecastFilter,
+                      SaleFilter, StoreFilter, StoreGroupDailySalesFilter,
+                      TrigramSearchFilter)
+from .mixins import ReferenceCacheMixin, ResampleMixin
+from .pagination import (CityRollupPagination,
+                         DivisionCategoryRollupPagination,
+                         ForecastAccuracyPagination,
+                         ForecastKeysetPagination, SaleKeysetPagination,
+                         StoreGroupRollupPagination)
+from .serializers import (CategorySerializer, CityDailySalesSerializer,
+                          DivisionCategoryDailySalesSerializer,
+                          ForecastAccuracySerializer,
+                          ForecastBulkResultSerializer,
+                          ForecastSerializer, StoreSerializer,
+                          SaleListSerializer, SaleRetrieveSerializer,
+                          StoreGroupDailySalesSerializer, build_category_tree)
+from .utils import (TABLE_RENDERERS, CSVRenderer, CSVUploadParser,
+                    NDJSONRenderer, NDJSONUploadParser)
 
 
 @extend_schema(tags=["Категории"])
@@ -53,20 +95,72 @@ from .utils import CustomRenderer
             ),
         ],
     ),
+    tree=extend_schema(
+        summary="Дерево категорий",
+        description=(
+            "Возвращает иерархию группа -> категория -> подкатегория -> SKU "
+            "с количеством SKU в каждом узле. Ответ содержит ETag; при "
+            "совпадении If-None-Match возвращается 304 без тела."
+        ),
+        filters=False,
+        responses={200: OpenApiTypes.OBJECT, 304: None},
+    ),
 )
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(ReferenceCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для модели Category.
 
     Позволяет просматривать информацию о категориях.
-    Поддерживает фильтрацию данных по заданным критериям.
+    Поддерживает фильтрацию данных по заданным критериям и поиск (search)
+    по SKU, группе, категории и подкатегории с ранжированием по похожести.
+    Запросы без фильтров обслуживаются из кэша справочника.
     """
 
-    renderer_classes = (CustomRenderer,)
+    reference_cache = category_cache
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     schema = AutoSchema()
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [TrigramSearchFilter, DjangoFilterBackend]
     filterset_class = CategoryFilter
+    search_fields = ["sku", "group", "category", "subcategory"]
+
+    @staticmethod
+    def build_tree(categories):
+        """
+        Строит дерево категорий и его ETag.
+
+        Args:
+            categories (Iterable[Category]): Категории товаров.
+
+        Returns:
+            tuple: Дерево категорий и ETag - хеш его JSON-представления.
+        """
+        tree = build_category_tree(categories)
+        digest = hashlib.sha256(
+            json.dumps(tree, sort_keys=True).encode()).hexdigest()
+        return tree, quote_etag(f'categories-tree-{digest}')
+
+    @action(detail=False, methods=['get'], url_path='tree')
+    def tree(self, request):
+        """
+        Возвращает дерево категорий.
+
+        Дерево строится один раз на версию справочников и отдается из кэша
+        процесса вместе с ETag - хешем сериализованного дерева. Поэтому
+        ETag меняется, только когда меняется само дерево, а не при любом
+        изменении справочников.
+
+        Args:
+            request (Request): HTTP-запрос.
+
+        Returns:
+            Response: Дерево категорий или 304, если оно не изменилось.
+        """
+        _, (tree, etag) = category_cache.get_computed(
+            'tree', self.build_tree)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+        return Response(tree, headers={'ETag': etag})
 
 
 @extend_schema(tags=["Магазины"])
@@ -104,18 +198,19 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         responses={200: StoreSerializer(many=True)},
     ),
 )
-class StoreViewSet(viewsets.ReadOnlyModelViewSet):
+class StoreViewSet(ReferenceCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет для модели Store.
     
     Позволяет просматривать информацию о магазинах.
     Поддерживает фильтрацию и поиск по формату, локации, городу и подразделению.
+    Запросы без фильтров и поиска обслуживаются из кэша справочника.
     """
     
-    renderer_classes = (CustomRenderer,)
+    reference_cache = store_cache
     queryset = Store.objects.all()
     serializer_class = StoreSerializer
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
+    filter_backends = (TrigramSearchFilter, DjangoFilterBackend)
     filterset_class = StoreFilter
     search_fields = ["type_format", "loc", "city", "division"]
 
@@ -132,6 +227,30 @@ class StoreViewSet(viewsets.ReadOnlyModelViewSet):
                 location=OpenApiParameter.QUERY,
                 description="Название магазина",
             ),
+            OpenApiParameter(
+                name="format",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=["json", NDJSONRenderer.format,
+                      *(renderer.format for renderer in TABLE_RENDERERS)],
+                description=(
+                    "Формат ответа. ndjson - потоковая выдача, "
+                    "один объект SKU на строку; arrow и parquet - "
+                    "таблица продаж в колоночном формате (если установлен "
+                    "pyarrow). В этих форматах ссылка на следующую страницу "
+                    "передается в заголовке Link"
+                ),
+            ),
+            OpenApiParameter(
+                name="layout",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=SALE_LAYOUTS,
+                description=(
+                    "Представление продаж SKU: rows - список объектов "
+                    "по дням, columns - массивы значений по каждому полю"
+                ),
+            ),
         ],
         request=SaleListSerializer,
         responses={200: SaleListSerializer(many=True)},
@@ -152,16 +271,42 @@ class StoreViewSet(viewsets.ReadOnlyModelViewSet):
                 location=OpenApiParameter.QUERY,
                 description="SKU товара",
             ),
+            OpenApiParameter(
+                name="layout",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=SALE_LAYOUTS,
+                description=(
+                    "Представление продаж: rows - список объектов по дням, "
+                    "columns - массивы значений по каждому полю"
+                ),
+            ),
+            OpenApiParameter(
+                name="freq",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=RESAMPLE_FREQUENCIES,
+                description=(
+                    "Суммирование продаж по периодам: W - по неделям, "
+                    "M - по месяцам. Для каждого периода возвращаются суммы "
+                    "показателей без промо и с промо, число дней с промо "
+                    "(promo_days) и число дней с продажами (days)"
+                ),
+            ),
         ],
         request=SaleRetrieveSerializer,
         responses={200: SaleRetrieveSerializer(many=True)},
     ),
 )
-class SaleViewSet(viewsets.ReadOnlyModelViewSet):
+class SaleViewSet(ResampleMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для модели Sale."""
 
-    renderer_classes = (CustomRenderer,)
+    renderer_classes = (*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer,
+                        *TABLE_RENDERERS)
     schema = AutoSchema()
+    pagination_class = SaleKeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SaleFilter
 
     def get_queryset(self):
         """Возвращает набор данных продаж для заданного SKU и ID магазина."""
@@ -179,6 +324,24 @@ class SaleViewSet(viewsets.ReadOnlyModelViewSet):
             return SaleListSerializer
         return SaleRetrieveSerializer
 
+    def get_layout(self):
+        """
+        Возвращает представление продаж из параметра layout.
+
+        Двоичные табличные форматы (Arrow, Parquet) всегда строятся
+        из колонок.
+
+        Returns:
+            str: Представление продаж: rows или columns.
+        """
+        layout = self.request.query_params.get('layout', SALE_LAYOUT_ROWS)
+        if layout not in SALE_LAYOUTS:
+            raise ValidationError(
+                {'layout': f'Допустимые значения: {", ".join(SALE_LAYOUTS)}.'})
+        if getattr(self.request.accepted_renderer, 'tabular', False):
+            return SALE_LAYOUT_COLUMNS
+        return layout
+
     def list(self, request, *args, **kwargs):
         """
         Возвращает список продаж сгруппированных по SKU.
@@ -191,24 +354,214 @@ class SaleViewSet(viewsets.ReadOnlyModelViewSet):
         Returns:
             Response: HTTP-ответ с данными о продажах, сгруппированными по SKU.
         """
-        result = []
-        sku_indexs = {}
         store = self.request.query_params.get('store')
-        for purchase in self.get_serializer(
-                self.get_queryset(), many=True).data:
-            sku = purchase.pop('sku')
-            if sku not in sku_indexs:
-                sku_indexs[sku] = len(result)
-                result.append({'store': store, 'sku': sku, 'fact': [purchase]})
+        layout = self.get_layout()
+        tabular = getattr(request.accepted_renderer, 'tabular', False)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginator.paginate_queryset(
+            queryset.values('sku_id', *SALE_FACT_FIELDS), request, view=self,
+            extra_rows=lambda position: self.get_archived_sales(
+                after=position) or ())
+        if page is not None:
+            sales = self.group_page_by_sku(page, store, layout)
+            if tabular:
+                response = Response(self.sales_table(sales))
+            elif request.accepted_renderer.format == NDJSONRenderer.format:
+                response = StreamingHttpResponse(
+                    request.accepted_renderer.render_lines(sales),
+                    content_type=NDJSONRenderer.media_type)
             else:
-                result[sku_indexs[sku]]['fact'].append(purchase)
+                return self.get_paginated_response(list(sales))
+            return self.paginator.set_next_link_header(response)
+
+        # Для JSON показатели читаются как float, без создания Decimal;
+        # в Arrow и Parquet они остаются десятичными колонками.
+        sales = self.sales_by_sku(queryset, store, layout,
+                                  self.get_archived_sales(),
+                                  as_float=not tabular)
+        if tabular:
+            return Response(self.sales_table(sales))
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                request.accepted_renderer.render_lines(sales),
+                content_type=NDJSONRenderer.media_type)
+        return Response(list(sales))
+
+    def get_archived_sales(self, sku=None, after=None):
+        """
+        Возвращает продажи магазина из архива за период запроса.
+
+        Период (date_after/date_before) и SKU (sku__in или sku) берутся
+        из параметров запроса, как и для продаж из таблицы Sale. Читаются
+        только части архива месяцев периода и нужных SKU, и только
+        по мере чтения продаж (см. sale.archive.iter_archived_sales).
+
+        Args:
+            sku (str | None): SKU товара.
+            after (list | None): Позиция курсора (SKU, дата): продажи
+                возвращаются после нее.
+
+        Returns:
+            Iterator | None: Продажи в порядке (SKU, дата) или None,
+            если магазин не указан или параметры запроса неверны.
+        """
+        store = self.request.query_params.get('store')
+        filterset = DjangoFilterBackend().get_filterset(
+            self.request, self.get_queryset(), self)
+        if not store or not filterset.is_valid():
+            return None
+        window = filterset.form.cleaned_data.get('date')
+        skus = [sku] if sku else filterset.form.cleaned_data.get('sku__in')
+        if after is not None:
+            after = (after[0], date.fromisoformat(after[1]))
+        return iter_archived_sales(
+            store, skus or None,
+            window.start if window else None,
+            window.stop if window else None,
+            after)
+
+    @classmethod
+    def merge_archived(cls, sales, archived):
+        """
+        Дополняет продажи из таблицы по SKU продажами из архива.
 
-        return Response(result)
+        Продажа из таблицы заменяет продажу из архива за ту же дату
+        (например, загруженную после архивации месяца).
+
+        Args:
+            sales (Iterable[tuple]): SKU и колонки продаж в порядке SKU.
+            archived (Iterable[dict]): Продажи из архива
+                в порядке (SKU, дата).
+
+        Yields:
+            tuple: SKU и колонки продаж, упорядоченных по дате.
+        """
+        archived = groupby(archived, key=itemgetter('sku_id'))
+        pending = next(archived, None)
+        for sku, columns in sales:
+            while pending is not None and pending[0] < sku:
+                yield pending[0], cls.rows_to_columns(pending[1])
+                pending = next(archived, None)
+            if pending is None or pending[0] != sku:
+                yield sku, columns
+                continue
+            rows = {row['date']: row for row in pending[1]}
+            rows.update((values[0], dict(zip(columns, values)))
+                        for values in zip(*columns.values()))
+            pending = next(archived, None)
+            yield sku, cls.rows_to_columns(
+                sorted(rows.values(), key=itemgetter('date')))
+        while pending is not None:
+            yield pending[0], cls.rows_to_columns(pending[1])
+            pending = next(archived, None)
+
+    @classmethod
+    def sales_by_sku(cls, queryset, store, layout=SALE_LAYOUT_ROWS,
+                     archived=None, as_float=False):
+        """
+        Отдает продажи магазина, сгруппированные по SKU.
+
+        Группировка выполняется в базе данных (см. SaleQuerySet.fact_by_sku),
+        а результат читается курсором, поэтому в памяти одновременно
+        находятся только продажи одного SKU (и продажи из архива, если
+        период запроса их захватывает).
+
+        Args:
+            queryset (QuerySet): Продажи магазина.
+            store (str): ID магазина.
+            layout (str): Представление продаж: rows или columns.
+            archived (Iterable[dict] | None): Продажи из архива
+                в порядке (SKU, дата).
+            as_float (bool): Читать показатели продаж как float
+                (см. SaleQuerySet.get_value_expressions).
+
+        Yields:
+            dict: Продажи одного SKU в формате списка продаж.
+        """
+        sales = queryset.fact_by_sku(
+            SALE_FACT_FIELDS, chunk_size=SALES_STREAM_CHUNK_SIZE,
+            as_float=as_float)
+        if archived is not None:
+            sales = cls.merge_archived(sales, archived)
+        for sku, columns in sales:
+            if layout == SALE_LAYOUT_COLUMNS:
+                fact = columns
+            else:
+                fact = [dict(zip(SALE_FACT_FIELDS, values))
+                        for values in zip(*columns.values())]
+            yield {'store': store, 'sku': sku, 'fact': fact}
+
+    @classmethod
+    def group_page_by_sku(cls, page, store, layout=SALE_LAYOUT_ROWS):
+        """
+        Группирует по SKU продажи одной страницы.
+
+        Продажи SKU, попавшего на границу страниц, продолжаются на следующей
+        странице с тем же SKU.
+
+        Args:
+            page (list): Продажи страницы, упорядоченные по (sku, date).
+            store (str): ID магазина.
+            layout (str): Представление продаж: rows или columns.
+
+        Yields:
+            dict: Продажи одного SKU в формате списка продаж.
+        """
+        for sku, purchases in groupby(page, key=itemgetter('sku_id')):
+            fact = []
+            for purchase in purchases:
+                del purchase['sku_id']
+                fact.append(purchase)
+            if layout == SALE_LAYOUT_COLUMNS:
+                fact = cls.rows_to_columns(fact)
+            yield {'store': store, 'sku': sku, 'fact': fact}
+
+    @staticmethod
+    def rows_to_columns(rows, fields=SALE_FACT_FIELDS):
+        """
+        Преобразует продажи по дням в массивы значений по полям.
+
+        Args:
+            rows (Iterable[dict]): Продажи, упорядоченные по дате.
+            fields (tuple): Поля продаж.
+
+        Returns:
+            dict: Словарь {поле: список значений по датам}.
+        """
+        columns = {field: [] for field in fields}
+        for row in rows:
+            for field in fields:
+                columns[field].append(row[field])
+        return columns
+
+    @staticmethod
+    def sales_table(sales, fields=SALE_FACT_FIELDS):
+        """
+        Собирает продажи нескольких SKU в одну таблицу колонок.
+
+        Args:
+            sales (Iterable[dict]): Продажи SKU в представлении columns.
+            fields (tuple): Поля продаж.
+
+        Returns:
+            dict: Словарь {колонка: список значений} с колонками store и sku.
+        """
+        table = {'store': [], 'sku': [], **{field: [] for field in fields}}
+        for sale in sales:
+            size = len(sale['fact']['date'])
+            table['store'].extend([sale['store']] * size)
+            table['sku'].extend([sale['sku']] * size)
+            for field in fields:
+                table[field].extend(sale['fact'][field])
+        return table
 
     def retrieve(self, request, *args, **kwargs):
         """
         Возвращает данные о продажах для заданного SKU и ID магазина.
 
+        С параметром freq продажи суммируются по неделям или месяцам
+        в базе данных (см. SaleQuerySet.resample).
+
         Args:
             request (Request): HTTP-запрос.
             *args: Дополнительные аргументы.
@@ -217,44 +570,122 @@ class SaleViewSet(viewsets.ReadOnlyModelViewSet):
         Returns:
             Response: HTTP-ответ с данными о продажах для заданного SKU и ID магазина.
         """
-        queryset = self.get_queryset().filter(
-            sku_id=self.request.query_params.get("sku"))
-        return Response({'store': self.request.query_params.get('store'),
-                         'sku': self.request.query_params.get('sku'),
-                         'fact': self.get_serializer(
-                             queryset, many=True).data})
+        store = self.request.query_params.get('store')
+        sku = self.request.query_params.get('sku')
+        layout = self.get_layout()
+        freq = self.get_freq()
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            sku_id=sku)
+        archived = list(self.get_archived_sales(sku) or ())
+        if archived:
+            # Продажи из архива объединяются с продажами из таблицы
+            # (продажа из таблицы заменяет архивную за ту же дату)
+            # и при необходимости суммируются по периодам в Python.
+            rows = {row['date']: row for row in archived}
+            rows.update(
+                (row['date'], row)
+                for row in queryset.values(*SALE_FACT_FIELDS))
+            queryset = sorted(rows.values(), key=itemgetter('date'))
+        if freq is None and layout == SALE_LAYOUT_ROWS:
+            return Response({'store': store, 'sku': sku,
+                             'fact': self.get_serializer(
+                                 queryset, many=True).data})
+
+        if freq is None:
+            fields = SALE_FACT_FIELDS
+            rows = (queryset if archived
+                    else queryset.order_by('date').values(*fields))
+        else:
+            fields = SALE_RESAMPLED_FIELDS
+            rows = (resample_sales(queryset, freq) if archived
+                    else queryset.resample(freq))
+        if layout == SALE_LAYOUT_ROWS:
+            return Response({'store': store, 'sku': sku, 'fact': rows})
+
+        sale = {'store': store, 'sku': sku,
+                'fact': self.rows_to_columns(rows, fields)}
+        if getattr(request.accepted_renderer, 'tabular', False):
+            return Response(self.sales_table([sale], fields))
+        return Response(sale)
 
 
 @extend_schema(tags=["Прогнозы"])
 @extend_schema_view(
     create=extend_schema(
         summary="Создать прогноз",
-        description="Создает новый прогноз на основе предоставленных данных.",
+        description=(
+            "Создает новый прогноз на основе предоставленных данных. "
+            "С параметром bulk=true весь пакет проверяется и сохраняется "
+            "одной транзакцией, а в ответе возвращается число созданных записей. "
+            "С параметром upsert=true существующие прогнозы с тем же магазином, "
+            "SKU и датой расчета перезаписываются, поэтому пакет можно "
+            "безопасно отправить повторно."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="bulk",
+                type=bool,
+                location=OpenApiParameter.QUERY,
+                description="Пакетная загрузка прогнозов",
+            ),
+            OpenApiParameter(
+                name="upsert",
+                type=bool,
+                location=OpenApiParameter.QUERY,
+                description="Перезапись существующих прогнозов (включает bulk)",
+            ),
+        ],
         request=ForecastSerializer,
-        responses={201: ForecastSerializer(many=True)},
+        responses={
+            201: OpenApiResponse(
+                response=PolymorphicProxySerializer(
+                    component_name="ForecastCreateResponse",
+                    serializers=[
+                        ForecastSerializer(many=True),
+                        ForecastBulkResultSerializer,
+                    ],
+                    resource_type_field_name=None,
+                    many=False,
+                ),
+                description=(
+                    "Созданные прогнозы или, с bulk=true либо upsert=true, "
+                    "число сохраненных прогнозов и прогнозов дней"
+                ),
+            ),
+        },
     ),
     list=extend_schema(
         summary="Список прогнозов",
-        description="Возвращает список прогнозов с возможностью фильтрации по SKU и ID магазина.",
+        description=(
+            "Возвращает прогнозы магазина (параметр store обязателен) "
+            "с возможностью фильтрации по одному или нескольким SKU, "
+            "группе, категории и подкатегории товаров."
+        ),
         parameters=[
             OpenApiParameter(
-                name="sku",
+                name="store",
                 type=str,
                 location=OpenApiParameter.QUERY,
-                description="Единица складского учета",
+                description="Название магазина",
+                required=True,
             ),
             OpenApiParameter(
-                name="store",
+                name="freq",
                 type=str,
                 location=OpenApiParameter.QUERY,
-                description="Название магазина",
+                enum=RESAMPLE_FREQUENCIES,
+                description=(
+                    "Суммирование прогноза по периодам: W - по неделям, "
+                    "M - по месяцам (ключ - первый день периода)"
+                ),
             ),
         ],
         responses={200: ForecastSerializer(many=True)},
     ),
 )
 class ForecastViewSet(
-    mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+    ResampleMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+    viewsets.GenericViewSet
 ):
     """
     Вьюсет для модели Forecast.
@@ -263,22 +694,66 @@ class ForecastViewSet(
     Поддерживает фильтрацию прогнозов по SKU, ID магазина и дате.
     """
 
-    renderer_classes = (CustomRenderer,)
     serializer_class = ForecastSerializer
     schema = AutoSchema()
     filter_backends = [DjangoFilterBackend]
     filterset_class = ForecastFilter
+    pagination_class = ForecastKeysetPagination
 
     def get_queryset(self):
         """
-        Возвращает набор данных прогнозов для заданных SKU и ID магазина.
+        Возвращает набор данных прогнозов магазина.
+
+        Магазин и SKU присоединяются в том же запросе (select_related),
+        а прогнозы дней загружаются одним дополнительным запросом
+        (prefetch_related), поэтому число запросов не зависит от числа
+        прогнозов в ответе.
 
         Returns:
-            QuerySet: Набор данных прогнозов, соответствующих заданным SKU и ID магазина.
+            QuerySet: Набор данных прогнозов магазина или пустой набор,
+            если магазин не указан.
         """
-        sku = self.request.query_params.get("sku")
         store = self.request.query_params.get("store")
-        return Forecast.objects.filter(sku_id=sku, store_id=store)
+        if not store:
+            return Forecast.objects.none()
+        queryset = Forecast.objects.filter(store_id=store).select_related(
+            "store", "sku")
+        if self.action == "list" and self.get_freq() is not None:
+            return queryset
+        return queryset.prefetch_related(
+            Prefetch("forecast", queryset=DayForecast.objects.order_by("date"))
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает прогнозы магазина.
+
+        С параметром freq прогнозы дней суммируются по неделям или месяцам
+        (см. Forecast.resample_forecasts) одним запросом на страницу.
+
+        Args:
+            request (Request): HTTP-запрос.
+            *args: Дополнительные аргументы.
+            **kwargs: Дополнительные ключевые аргументы.
+
+        Returns:
+            Response: HTTP-ответ с прогнозами.
+        """
+        freq = self.get_freq()
+        if freq is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        forecasts = list(queryset if page is None else page)
+        serializer = self.get_serializer(
+            forecasts, many=True, context={
+                **self.get_serializer_context(),
+                "resampled": Forecast.resample_forecasts(forecasts, freq),
+            })
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
     def create(self, request, *args, **kwargs):
         """
@@ -293,6 +768,10 @@ class ForecastViewSet(
             Response: HTTP-ответ с созданными прогнозами или сообщением об ошибке.
         """
         data = request.data.get('data')
+        upsert = self.is_flag_set('upsert')
+        if upsert or self.is_flag_set('bulk'):
+            return self.create_bulk(data, upsert=upsert)
+
         result = []
         try:
             for forecast in data:
@@ -308,3 +787,286 @@ class ForecastViewSet(
         return Response(result, status=status.HTTP_201_CREATED,
                         headers=headers)
 
+    def create_bulk(self, data, upsert=False):
+        """
+        Создает пакет прогнозов одной транзакцией.
+
+        Весь пакет проверяется до записи, прогнозы и прогнозы дней
+        сохраняются двумя вставками bulk_create. При конфликте с уже
+        существующими прогнозами не сохраняется ничего, если не включен
+        режим upsert, в котором существующие прогнозы перезаписываются.
+
+        Args:
+            data (list): Прогнозы пакета.
+            upsert (bool): Перезаписывать существующие прогнозы.
+
+        Returns:
+            Response: HTTP-ответ с числом сохраненных прогнозов и прогнозов дней.
+        """
+        serializer = self.get_serializer(
+            data=data, many=True,
+            context={**self.get_serializer_context(), 'upsert': upsert})
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                forecasts = serializer.save()
+        except IntegrityError as error_message:
+            return Response({'error': str(error_message)},
+                            status=status.HTTP_409_CONFLICT)
+
+        return Response(
+            {'forecasts': len(forecasts),
+             'days': sum(len(item['forecast'])
+                         for item in serializer.validated_data)},
+            status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Загрузить прогнозы из файла",
+        description=(
+            "Загружает прогнозы из CSV или NDJSON с колонками store, sku, "
+            "forecast_date, date, units. Существующие прогнозы с тем же "
+            "магазином, SKU и датой расчета перезаписываются. "
+            "Требует аутентификации."
+        ),
+        request={
+            CSVUploadParser.media_type: OpenApiTypes.STR,
+            NDJSONUploadParser.media_type: OpenApiTypes.STR,
+        },
+        responses={201: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=['post'], url_path='load',
+            permission_classes=[IsAuthenticated],
+            parser_classes=[CSVUploadParser, NDJSONUploadParser])
+    def load(self, request):
+        """
+        Загружает прогнозы из CSV или NDJSON в теле запроса.
+
+        Args:
+            request (Request): HTTP-запрос.
+
+        Returns:
+            Response: HTTP-ответ с числом загруженных прогнозов
+            или сообщением об ошибке.
+        """
+        if not hasattr(request.data, 'read'):
+            return Response({'error': 'Пустое тело запроса.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        file_format = ('ndjson' if request.content_type.startswith(
+            NDJSONUploadParser.media_type) else 'csv')
+        try:
+            result = load_forecasts(request.data, file_format)
+        except ForecastLoadError as error_message:
+            return Response({'error': str(error_message)},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Выгрузить прогнозы в файл",
+        description=(
+            "Выгружает прогнозы дней в CSV или NDJSON (format=csv или "
+            "format=ndjson) с колонками store, sku, forecast_date, date, "
+            "units, которые принимает загрузка прогнозов. Без параметра "
+            "store выгружаются прогнозы всех магазинов. Ответ отдается "
+            "потоком по мере чтения из базы."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="store",
+                type=OpenApiTypes.STR,
+                description="ID магазина",
+            ),
+        ],
+        responses={
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+        },
+    )
+    @action(detail=False, methods=['get'], url_path='export',
+            renderer_classes=[CSVRenderer, NDJSONRenderer],
+            pagination_class=None)
+    def export(self, request):
+        """
+        Выгружает прогнозы дней потоком.
+
+        Прогнозы и прогнозы дней читаются одним запросом курсором
+        (см. sale.loaders.export_forecast_rows), строки кодируются
+        по одной и сразу отправляются клиенту, поэтому ни число запросов,
+        ни занимаемая память не зависят от объема выгрузки.
+
+        Args:
+            request (Request): HTTP-запрос.
+
+        Returns:
+            StreamingHttpResponse: Поток строк CSV или NDJSON.
+        """
+        queryset = Forecast.objects.all()
+        store = request.query_params.get('store')
+        if store:
+            queryset = queryset.filter(store_id=store)
+        rows = export_forecast_rows(self.filter_queryset(queryset))
+        renderer = request.accepted_renderer
+        if renderer.format == NDJSONRenderer.format:
+            lines = renderer.render_lines(
+                dict(zip(FORECAST_COLUMNS, row)) for row in rows)
+        else:
+            lines = renderer.render_lines(rows, header=FORECAST_COLUMNS)
+        response = StreamingHttpResponse(
+            lines, content_type=renderer.media_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="forecasts.{renderer.format}"')
+        return response
+
+    def is_flag_set(self, name):
+        """Проверяет, включен ли флаг в параметрах запроса."""
+        return self.request.query_params.get(name, '').lower() in (
+            '1', 'true', 'yes')
+
+
+class RollupViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Базовый вьюсет агрегатов продаж.
+
+    Агрегаты читаются из таблиц, обновляемых при импорте продаж
+    (см. sale.rollups), поэтому время ответа не зависит от объема истории.
+    """
+
+    schema = AutoSchema()
+    filter_backends = [DjangoFilterBackend]
+
+    def get_queryset(self):
+        """Возвращает агрегаты, упорядоченные по ключу пагинации."""
+        return self.queryset.order_by(*self.pagination_class.ordering)
+
+
+@extend_schema(tags=["Агрегаты продаж"])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Продажи магазинов по группам за день",
+        description=(
+            "Возвращает суммы продаж магазина по группе товаров за каждый "
+            "день с фильтрацией по магазину, группе и периоду."
+        ),
+    ),
+)
+class StoreGroupDailySalesViewSet(RollupViewSet):
+    """Вьюсет продаж магазинов по группам за день."""
+
+    queryset = StoreGroupDailySales.objects.all()
+    serializer_class = StoreGroupDailySalesSerializer
+    filterset_class = StoreGroupDailySalesFilter
+    pagination_class = StoreGroupRollupPagination
+
+
+@extend_schema(tags=["Агрегаты продаж"])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Продажи дивизионов по категориям за день",
+        description=(
+            "Возвращает суммы продаж дивизиона по категории товаров за "
+            "каждый день с фильтрацией по дивизиону, категории и периоду."
+        ),
+    ),
+)
+class DivisionCategoryDailySalesViewSet(RollupViewSet):
+    """Вьюсет продаж дивизионов по категориям за день."""
+
+    queryset = DivisionCategoryDailySales.objects.all()
+    serializer_class = DivisionCategoryDailySalesSerializer
+    filterset_class = DivisionCategoryDailySalesFilter
+    pagination_class = DivisionCategoryRollupPagination
+
+
+@extend_schema(tags=["Агрегаты продаж"])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Продажи городов за день",
+        description=(
+            "Возвращает суммы продаж города за каждый день с фильтрацией "
+            "по городу и периоду."
+        ),
+    ),
+)
+class CityDailySalesViewSet(RollupViewSet):
+    """Вьюсет продаж городов за день."""
+
+    queryset = CityDailySales.objects.all()
+    serializer_class = CityDailySalesSerializer
+    filterset_class = CityDailySalesFilter
+    pagination_class = CityRollupPagination
+
+
+@extend_schema(tags=["Точность прогнозов"])
+@extend_schema_view(
+    list=extend_schema(
+        summary="Точность прогнозов",
+        description=(
+            "Возвращает точность прогнозов по сравнению с фактом продаж: "
+            "WAPE (сумма абсолютных ошибок к сумме факта), смещение bias "
+            "(сумма ошибок прогноз - факт к сумме факта) и MAE (средняя "
+            "абсолютная ошибка за день). Метрики группируются по измерениям "
+            "из параметра group_by и пересчитываются после каждого импорта "
+            "продаж."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="group_by",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description=(
+                    "Измерения отчета через запятую: "
+                    f"{', '.join(ACCURACY_DIMENSIONS)}. По умолчанию "
+                    f"{','.join(ACCURACY_DEFAULT_GROUP_BY)}"
+                ),
+            ),
+        ],
+    ),
+)
+class ForecastAccuracyViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Вьюсет точности прогнозов.
+
+    Суммы ошибок хранятся в ForecastAccuracy по (магазин, SKU, горизонт),
+    поэтому отчет любого уровня строится одним запросом с группировкой.
+    """
+
+    serializer_class = ForecastAccuracySerializer
+    schema = AutoSchema()
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ForecastAccuracyFilter
+    pagination_class = ForecastAccuracyPagination
+
+    def get_dimensions(self):
+        """
+        Возвращает измерения отчета из параметра group_by.
+
+        Returns:
+            dict: Измерения и соответствующие поля ForecastAccuracy.
+        """
+        group_by = self.request.query_params.get('group_by')
+        names = (
+            [name.strip() for name in group_by.split(',') if name.strip()]
+            if group_by else ACCURACY_DEFAULT_GROUP_BY
+        )
+        unknown = [name for name in names if name not in ACCURACY_DIMENSIONS]
+        if unknown or not names:
+            raise ValidationError(
+                {'group_by': (
+                    f'Допустимые значения: {", ".join(ACCURACY_DIMENSIONS)}.')})
+        return {name: ACCURACY_DIMENSIONS[name] for name in dict.fromkeys(names)}
+
+    def get_queryset(self):
+        """Возвращает суммы точности, сгруппированные по измерениям отчета."""
+        paths = self.get_dimensions().values()
+        return (
+            ForecastAccuracy.objects.values(*paths)
+            .annotate(
+                **{f'{field}_sum': Sum(field)
+                   for field in ('days', *ACCURACY_SUM_FIELDS)},
+            )
+            .order_by(*paths)
+        )
+
+    def get_serializer_context(self):
+        """Добавляет в контекст измерения отчета."""
+        return {**super().get_serializer_context(),
+                'dimensions': self.get_dimensions()}
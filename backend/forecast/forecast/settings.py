@@ -100,6 +100,24 @@ DATABASES = {
     }
 }
 
+# Кэш Django: в нем хранится версия справочников (магазины и категории),
+# по которой процессы сбрасывают свой локальный кэш. LocMemCache по умолчанию
+# существует только внутри процесса, поэтому при нескольких процессах
+# (воркеры gunicorn, обработчик заданий импорта) нужен общий бэкенд,
+# например FileBasedCache на общем томе (см. infra/docker-compose.yml).
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", default=""),
+    }
+}
+
+# Срок (в секундах), после которого локальный кэш справочников
+# перечитывается, даже если версия справочников не изменилась.
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT', default=60))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,15 +149,32 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
 
+# Каталог загруженных файлов фонового импорта. Не должен раздаваться
+# веб-сервером, в отличие от media.
+IMPORT_ROOT = os.getenv('IMPORT_ROOT', default=os.path.join(BASE_DIR, 'imports/'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Библиотека кодирования JSON в API: orjson или json (стандартная).
+JSON_BACKEND = os.getenv('JSON_BACKEND', default='orjson')
+
 REST_FRAMEWORK = {
     "EXCEPTION_HANDLER": "drf_standardized_errors.handler.exception_handler",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     'COERCE_DECIMAL_TO_STRING': False,
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.utils.ORJSONCustomRenderer"
+        if JSON_BACKEND == "orjson" else "api.utils.CustomRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.utils.ORJSONParser"
+        if JSON_BACKEND == "orjson" else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -155,6 +190,28 @@ SPECTACULAR_SETTINGS = {
 
 MAX_LENGTH_FOR_FIELDS = 32
 
+# Способ хранения прогнозов дней: rows - строка DayForecast на каждый день,
+# compact - один массив значений на прогноз (Forecast.horizon_units).
+FORECAST_STORAGE = os.getenv('FORECAST_STORAGE', default='rows')
+
+# Число потоков фонового импорта файлов (ImportJob) в каждом процессе.
+IMPORT_JOB_WORKERS = int(os.getenv('IMPORT_JOB_WORKERS', default=1))
+# Задача импорта, прогресс которой не обновлялся дольше этого числа секунд,
+# считается прерванной и возвращается в очередь (run_import_jobs).
+IMPORT_JOB_STALE_TIMEOUT = int(os.getenv('IMPORT_JOB_STALE_TIMEOUT', default=600))
+
+# Число процессов параллельного импорта продаж (import_sales --workers).
+SALE_IMPORT_PROCESSES = int(
+    os.getenv('SALE_IMPORT_PROCESSES', default=os.cpu_count() or 1))
+
+# Число следующих месяцев, для которых заранее создаются секции таблицы
+# продаж в PostgreSQL (sale_partitions create).
+SALE_PARTITIONS_AHEAD = int(os.getenv('SALE_PARTITIONS_AHEAD', default=3))
+
+# Число последних месяцев, продажи которых хранятся в таблице продаж;
+# более старые переносятся в архив (archive_sales).
+SALE_HOT_MONTHS = int(os.getenv('SALE_HOT_MONTHS', default=12))
+
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r'^.*$'
@@ -0,0 +1,248 @@
+"""Расчет точности прогнозов по продажам."""
+
+from datetime import date, timedelta
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .archive import iter_sales_history
+from .models import DayForecast, Forecast, ForecastAccuracy, Sale
+
+ACCURACY_STAGE_TABLE = "accuracy_stage"
+ACCURACY_ARCHIVE_TABLE = "accuracy_archive"
+ACCURACY_CHUNK_SIZE = 10000
+ACCURACY_SUM_FIELDS = (
+    "forecast_units",
+    "fact_units",
+    "error_units",
+    "abs_error_units",
+)
+
+
+def get_accuracy_metrics(row):
+    """
+    Вычисляет метрики точности по суммам строк ForecastAccuracy.
+
+    WAPE - сумма абсолютных ошибок, деленная на сумму факта; смещение
+    (bias) - сумма ошибок (прогноз - факт), деленная на сумму факта,
+    положительное при завышенном прогнозе; MAE - средняя абсолютная ошибка
+    за день.
+
+    Args:
+        row (dict): Суммы ACCURACY_SUM_FIELDS и число дней (days).
+
+    Returns:
+        dict: Значения wape, bias и mae (None, если не определены).
+    """
+    fact = row["fact_units"]
+    days = row["days"]
+    return {
+        "wape": float(row["abs_error_units"] / fact) if fact else None,
+        "bias": float(row["error_units"] / fact) if fact else None,
+        "mae": float(row["abs_error_units"] / days) if days else None,
+    }
+
+
+def horizon_sql(connection, day, forecast_date):
+    """Возвращает SQL-выражение разницы дат в днях для СУБД."""
+    if connection.vendor == "postgresql":
+        return f"({day} - {forecast_date})"
+    return f"CAST(julianday({day}) - julianday({forecast_date}) AS integer)"
+
+
+def stores_sql(stores, column):
+    """
+    Возвращает условие отбора магазинов и его параметры.
+
+    Args:
+        stores (list | None): ID магазинов, None - все магазины.
+        column (str): Колонка ID магазина.
+
+    Returns:
+        tuple: SQL-условие и список параметров.
+    """
+    if stores is None:
+        return "true", []
+    placeholders = ", ".join(["%s"] * len(stores))
+    return f"{column} IN ({placeholders})", list(stores)
+
+
+def stage_compact_days(connection, cursor, stores):
+    """
+    Раскрывает компактные прогнозы в строки дней временной таблицы.
+
+    В PostgreSQL массив раскрывается в базе (unnest WITH ORDINALITY),
+    в остальных СУБД массив хранится двоичной строкой, поэтому строки
+    строятся в Python и вставляются порциями.
+    """
+    forecast_table = Forecast._meta.db_table
+    condition, params = stores_sql(stores, "f.store_id")
+    if connection.vendor == "postgresql":
+        cursor.execute(
+            f"INSERT INTO {ACCURACY_STAGE_TABLE} "
+            "(store_id, sku_id, date, horizon, units) "
+            "SELECT f.store_id, f.sku_id, "
+            "f.horizon_start + CAST(u.ord - 1 AS integer), "
+            "(f.horizon_start - f.forecast_date) + CAST(u.ord - 1 AS integer), "
+            f"u.units FROM {forecast_table} f CROSS JOIN LATERAL "
+            "unnest(f.horizon_units) WITH ORDINALITY AS u(units, ord) "
+            f"WHERE f.horizon_units IS NOT NULL AND {condition}",
+            params,
+        )
+        return
+
+    forecasts = Forecast.objects.using(cursor.db.alias).filter(
+        horizon_units__isnull=False
+    )
+    if stores is not None:
+        forecasts = forecasts.filter(store_id__in=stores)
+    rows = (
+        (
+            store,
+            sku,
+            (start + timedelta(days=offset)).isoformat(),
+            (start - forecast_date).days + offset,
+            units,
+        )
+        for store, sku, forecast_date, start, days in forecasts.values_list(
+            "store_id", "sku_id", "forecast_date", "horizon_start", "horizon_units"
+        ).iterator(chunk_size=ACCURACY_CHUNK_SIZE)
+        for offset, units in enumerate(days)
+    )
+    while True:
+        chunk = list(islice(rows, ACCURACY_CHUNK_SIZE))
+        if not chunk:
+            return
+        cursor.executemany(
+            f"INSERT INTO {ACCURACY_STAGE_TABLE} "
+            "(store_id, sku_id, date, horizon, units) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            chunk,
+        )
+
+
+def stage_archived_facts(cursor, stores):
+    """
+    Записывает во временную таблицу факт продаж из архива.
+
+    Берутся продажи архива за период прогнозов дней, кроме продаж,
+    которые есть и в таблице Sale (загружены после архивации месяца).
+    """
+    cursor.execute(f"SELECT MIN(date), MAX(date) FROM {ACCURACY_STAGE_TABLE}")
+    start, end = cursor.fetchone()
+    if start is None:
+        return
+    # SQLite возвращает даты временной таблицы строками.
+    start, end = (
+        day if isinstance(day, date) else date.fromisoformat(day)
+        for day in (start, end)
+    )
+    rows = (
+        (
+            store,
+            row["sku_id"],
+            row["date"].isoformat(),
+            row["sales_units"] + row["sales_units_promo"],
+        )
+        for store, row in iter_sales_history(
+            stores, start, end, using=cursor.db.alias
+        )
+    )
+    while True:
+        chunk = list(islice(rows, ACCURACY_CHUNK_SIZE))
+        if not chunk:
+            break
+        cursor.executemany(
+            f"INSERT INTO {ACCURACY_ARCHIVE_TABLE} "
+            "(store_id, sku_id, date, units) VALUES (%s, %s, %s, %s)",
+            chunk,
+        )
+    sale_table = Sale._meta.db_table
+    cursor.execute(
+        f"DELETE FROM {ACCURACY_ARCHIVE_TABLE} WHERE EXISTS ("
+        f"SELECT 1 FROM {sale_table} s "
+        f"WHERE s.store_id = {ACCURACY_ARCHIVE_TABLE}.store_id "
+        f"AND s.sku_id = {ACCURACY_ARCHIVE_TABLE}.sku_id "
+        f"AND s.date = {ACCURACY_ARCHIVE_TABLE}.date)"
+    )
+
+
+def refresh_forecast_accuracy(stores=None, using=DEFAULT_DB_ALIAS):
+    """
+    Пересчитывает точность прогнозов запросами над всем набором строк.
+
+    Прогнозы дней (строки DayForecast и раскрытые компактные прогнозы)
+    собираются во временную таблицу с горизонтом - числом дней от даты
+    расчета прогноза. Затем она соединяется с продажами по
+    (магазин, SKU, дата) одним запросом с группировкой по
+    (магазин, SKU, горизонт), результат которого заменяет строки
+    ForecastAccuracy. Учитываются только дни с известным фактом продаж,
+    в том числе из архива продаж (см. sale.archive).
+
+    Args:
+        stores (Iterable[str] | None): ID магазинов для пересчета,
+            None - все магазины.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        int: Число записанных строк точности.
+    """
+    if stores is not None:
+        stores = sorted(set(stores))
+        if not stores:
+            return 0
+    connection = connections[using]
+    accuracy_table = ForecastAccuracy._meta.db_table
+    forecast_table = Forecast._meta.db_table
+    day_table = DayForecast._meta.db_table
+    sale_table = Sale._meta.db_table
+    condition, params = stores_sql(stores, "store_id")
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {accuracy_table} WHERE {condition}", params)
+        cursor.execute(f"DROP TABLE IF EXISTS {ACCURACY_STAGE_TABLE}")
+        cursor.execute(f"DROP TABLE IF EXISTS {ACCURACY_ARCHIVE_TABLE}")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {ACCURACY_STAGE_TABLE} ("
+            "store_id varchar(32), sku_id varchar(32), date date, "
+            "horizon integer, units integer)"
+        )
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {ACCURACY_ARCHIVE_TABLE} ("
+            "store_id varchar(32), sku_id varchar(32), date date, "
+            "units numeric(16, 1))"
+        )
+        day_condition, day_params = stores_sql(stores, "f.store_id")
+        cursor.execute(
+            f"INSERT INTO {ACCURACY_STAGE_TABLE} "
+            "(store_id, sku_id, date, horizon, units) "
+            "SELECT f.store_id, f.sku_id, d.date, "
+            f"{horizon_sql(connection, 'd.date', 'f.forecast_date')}, d.units "
+            f"FROM {day_table} d JOIN {forecast_table} f "
+            f"ON f.id = d.forecast_sku_of_store_id WHERE {day_condition}",
+            day_params,
+        )
+        stage_compact_days(connection, cursor, stores)
+        stage_archived_facts(cursor, stores)
+        # Показатели продаж хранятся целыми числами с фиксированной точкой.
+        scale = Sale._meta.get_field("sales_units").scale
+        facts = (
+            "SELECT store_id, sku_id, date, "
+            f"(sales_units + sales_units_promo) / {scale}.0 AS units "
+            f"FROM {sale_table} UNION ALL "
+            f"SELECT store_id, sku_id, date, units FROM {ACCURACY_ARCHIVE_TABLE}"
+        )
+        cursor.execute(
+            f"INSERT INTO {accuracy_table} "
+            "(store_id, sku_id, horizon, days, forecast_units, fact_units, "
+            "error_units, abs_error_units) "
+            "SELECT a.store_id, a.sku_id, a.horizon, COUNT(*), SUM(a.units), "
+            "SUM(s.units), SUM(a.units - s.units), SUM(ABS(a.units - s.units)) "
+            f"FROM {ACCURACY_STAGE_TABLE} a JOIN ({facts}) s "
+            "ON s.store_id = a.store_id AND s.sku_id = a.sku_id "
+            "AND s.date = a.date "
+            "GROUP BY a.store_id, a.sku_id, a.horizon"
+        )
+        total = cursor.rowcount
+        cursor.execute(f"DROP TABLE {ACCURACY_STAGE_TABLE}")
+        cursor.execute(f"DROP TABLE {ACCURACY_ARCHIVE_TABLE}")
+    return total
@@ -1,10 +1,70 @@
+from datetime import date
+
 from django.contrib import admin
+from django.contrib.admin.utils import prepare_lookup_value
+from django.core.exceptions import PermissionDenied
+from django.db.models.functions import Length
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 
 from import_export.admin import ImportExportModelAdmin
 
-from .models import Category, DayForecast, Sale, Store
+from .forms import SaleImportForm
+from .jobs import submit_import_job
+from .models import (Category, DayForecast, Forecast, ImportJob, Sale,
+                     SaleArchive, Store)
+from .paginators import EstimatedCountPaginator
 from .resources import CategoryResource, StoreResource, SaleResource, \
     ForecastResource
+from .rollups import schedule_sales_rollups_refresh
+
+
+def get_date_hierarchy_period(params, field_name):
+    """
+    Возвращает период, выбранный в навигации по датам списка записей.
+
+    Args:
+        params (QueryDict): Параметры запроса списка записей.
+        field_name (str): Поле date_hierarchy.
+
+    Returns:
+        tuple: Первый день периода и день после его окончания
+        (None, None - период не выбран).
+    """
+    lookups = (params.get(f'{field_name}__{part}')
+               for part in ('year', 'month', 'day'))
+    try:
+        year, month, day = (int(value) if value else None
+                            for value in lookups)
+        if year is None:
+            return None, None
+        if month is None:
+            return date(year, 1, 1), date(year + 1, 1, 1)
+        if day is None:
+            start = date(year, month, 1)
+            return start, date(year + month // 12, month % 12 + 1, 1)
+        start = date(year, month, day)
+        return start, date.fromordinal(start.toordinal() + 1)
+    except ValueError:
+        return None, None
+
+
+class LargeTableAdminMixin:
+    """
+    Настройки списка записей для больших таблиц.
+
+    Число записей оценивается без COUNT(*) по всей таблице
+    (EstimatedCountPaginator), общее число записей без фильтров не
+    подсчитывается, а навигация по датам строится по индексу поля
+    date_hierarchy (см. sale.templatetags.sale_admin).
+    """
+
+    change_list_template = 'admin/sale/change_list_large_table.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'date'
 
 
 @admin.register(Category)
@@ -25,32 +85,260 @@ class StoreAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Sale)
-class SaleAdmin(ImportExportModelAdmin):
+class SaleAdmin(LargeTableAdminMixin, ImportExportModelAdmin):
     """Административная панель для модели Sale."""
     resource_class = SaleResource
 
+    import_export_change_list_template = (
+        'admin/sale/sale/change_list_fast_import.html')
+
     list_display = ('store', 'sku', 'date', 'sales_type', 'sales_units',
                     'sales_units_promo', 'sales_rub', 'sales_run_promo')
+    list_select_related = ('store', 'sku')
+    raw_id_fields = ('store', 'sku')
+
+    def delete_model(self, request, obj):
+        """Удаляет продажу и обновляет агрегаты ее магазина и даты."""
+        super().delete_model(request, obj)
+        schedule_sales_rollups_refresh({(obj.store_id, obj.date)})
+
+    def delete_queryset(self, request, queryset):
+        """Удаляет выбранные продажи и обновляет их агрегаты."""
+        keys = set(queryset.values_list('store_id', 'date'))
+        super().delete_queryset(request, queryset)
+        schedule_sales_rollups_refresh(keys)
+
+    def get_urls(self):
+        """Добавляет страницу быстрого импорта продаж."""
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('fast-import/',
+                 self.admin_site.admin_view(self.fast_import_view),
+                 name='%s_%s_fast_import' % info),
+            *super().get_urls(),
+        ]
+
+    def fast_import_view(self, request):
+        """
+        Быстрый импорт продаж из CSV в фоне.
+
+        Загруженный файл сохраняется в задаче импорта (ImportJob), которая
+        выполняется фоновым обработчиком (см. sale.jobs), а пользователь
+        перенаправляется на страницу ее прогресса.
+        """
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+        form = SaleImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['import_file']
+            job = ImportJob.objects.create(
+                file=upload, created_by=request.user, bytes_total=upload.size)
+            submit_import_job(job)
+            return redirect('admin:sale_importjob_progress', job.pk)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'title': 'Быстрый импорт продаж',
+        }
+        return TemplateResponse(
+            request, 'admin/sale/sale/fast_import.html', context)
+
+
+@admin.register(SaleArchive)
+class SaleArchiveAdmin(admin.ModelAdmin):
+    """
+    Административная панель архивов продаж.
+
+    Архивы создаются командой archive_sales и только просматриваются.
+    """
+
+    list_display = ('store', 'month', 'first_sku', 'last_sku', 'rows',
+                    'get_size', 'archived_at')
+    list_filter = ('store',)
+    date_hierarchy = 'month'
+    exclude = ('data',)
+
+    def has_add_permission(self, request):
+        """Запрещает добавление архивов вручную."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Запрещает изменение архивов."""
+        return False
+
+    def get_queryset(self, request):
+        """Сжатые продажи не читаются, их размер считается в базе."""
+        return super().get_queryset(request).defer('data').annotate(
+            size=Length('data'))
+
+    @admin.display(description='Размер, байт', ordering='size')
+    def get_size(self, obj):
+        """Возвращает размер сжатых продаж."""
+        return obj.size
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """Административная панель для задач фонового импорта."""
+
+    list_display = ('pk', 'file', 'status', 'get_progress', 'rows_done',
+                    'rows_failed', 'get_throughput', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('file', 'status', 'created_by', 'created_at',
+                       'started_at', 'finished_at', 'updated_at',
+                       'bytes_total',
+                       'bytes_done', 'rows_done', 'rows_failed', 'errors')
+    progress_refresh_interval = 2
+
+    def get_fields(self, request, obj=None):
+        """При создании задачи запрашивается только файл."""
+        if obj is None:
+            return ('file',)
+        return self.readonly_fields
+
+    def get_readonly_fields(self, request, obj=None):
+        """Созданная задача не редактируется."""
+        if obj is None:
+            return ()
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        """Сохраняет новую задачу и ставит ее в очередь."""
+        if not change:
+            obj.created_by = request.user
+            obj.bytes_total = obj.file.size
+        super().save_model(request, obj, form, change)
+        if not change:
+            submit_import_job(obj)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        """После создания задачи открывает страницу ее прогресса."""
+        return redirect('admin:sale_importjob_progress', obj.pk)
+
+    def get_urls(self):
+        """Добавляет страницу прогресса задачи."""
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('<int:object_id>/progress/',
+                 self.admin_site.admin_view(self.progress_view),
+                 name='%s_%s_progress' % info),
+            *super().get_urls(),
+        ]
+
+    def progress_view(self, request, object_id):
+        """Страница прогресса задачи, обновляющаяся до ее завершения."""
+        job = self.get_object(request, object_id)
+        if job is None or not self.has_view_permission(request, job):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'job': job,
+            'refresh_interval': self.progress_refresh_interval,
+            'title': f'Импорт {job.pk}',
+        }
+        return TemplateResponse(
+            request, 'admin/sale/importjob/progress.html', context)
+
+    @admin.display(description='Прогресс, %')
+    def get_progress(self, obj):
+        """Возвращает прогресс задачи со ссылкой на страницу прогресса."""
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:sale_importjob_progress', args=(obj.pk,)),
+            obj.progress)
+
+    @admin.display(description='Строк в секунду')
+    def get_throughput(self, obj):
+        """Возвращает скорость импорта задачи."""
+        return obj.throughput
 
 
 @admin.register(DayForecast)
-class ForecastAdmin(ImportExportModelAdmin):
+class ForecastAdmin(LargeTableAdminMixin, ImportExportModelAdmin):
     """Административная панель для модели Forecast."""
     resource_class = ForecastResource
 
     list_display = (
         'get_store', 'get_sku', 'get_forecast_date', 'date', 'units')
+    list_filter = ('forecast_sku_of_store__store',
+                   'forecast_sku_of_store__sku')
+    list_select_related = ('forecast_sku_of_store',)
+    raw_id_fields = ('forecast_sku_of_store',)
 
     def get_store(self, obj):
-        return obj.forecast_sku_of_store.store.store
+        return obj.forecast_sku_of_store.store_id
 
     def get_sku(self, obj):
-        return obj.forecast_sku_of_store.sku.sku
+        return obj.forecast_sku_of_store.sku_id
 
     def get_forecast_date(self, obj):
         return obj.forecast_sku_of_store.forecast_date
 
+    def get_export_resource_kwargs(self, request, *args, **kwargs):
+        """
+        Передает в выгрузку отбор компактных прогнозов.
+
+        Компактные прогнозы отбираются по периоду навигации по датам
+        и по тем же фильтрам полей прогноза (магазин, SKU, сам прогноз),
+        что и прогнозы дней списка.
+        """
+        start, end = get_date_hierarchy_period(request.GET, self.date_hierarchy)
+        prefix = 'forecast_sku_of_store__'
+        forecast_filters = {
+            lookup[len(prefix):]: prepare_lookup_value(lookup, value)
+            for lookup, value in request.GET.items()
+            if lookup.startswith(prefix)
+        }
+        if request.GET.get('forecast_sku_of_store'):
+            forecast_filters['pk'] = request.GET['forecast_sku_of_store']
+        return {**super().get_export_resource_kwargs(request, *args, **kwargs),
+                'start': start, 'end': end,
+                'forecast_filters': forecast_filters}
+
     get_store.short_description = 'Магазин'
     get_sku.short_description = 'Единица складского учета'
     get_forecast_date.short_description = 'Дата расчета прогноза'
 
+
+@admin.register(Forecast)
+class CompactForecastAdmin(admin.ModelAdmin):
+    """
+    Административная панель компактных прогнозов.
+
+    Дни компактных прогнозов (Forecast.horizon_units) хранятся без строк
+    DayForecast и поэтому не видны в списке прогнозов дней. Здесь они
+    показываются раскрытыми по дням и только просматриваются.
+    """
+
+    list_display = ('store', 'sku', 'forecast_date', 'horizon_start',
+                    'get_days')
+    list_select_related = ('store', 'sku')
+    date_hierarchy = 'forecast_date'
+    fields = ('store', 'sku', 'forecast_date', 'get_days_forecast')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        """Запрещает добавление компактных прогнозов."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Запрещает изменение компактных прогнозов."""
+        return False
+
+    def get_queryset(self, request):
+        """Возвращает только компактные прогнозы."""
+        return super().get_queryset(request).filter(
+            horizon_units__isnull=False)
+
+    @admin.display(description='Дней')
+    def get_days(self, obj):
+        """Возвращает число дней прогноза."""
+        return len(obj.horizon_units)
+
+    @admin.display(description='Прогноз по дням')
+    def get_days_forecast(self, obj):
+        """Возвращает прогноз по дням одной строкой."""
+        return ', '.join(f'{day:%Y-%m-%d}: {units}'
+                         for day, units in obj.get_days_forecast())
@@ -6,3 +6,7 @@ class SaleConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "sale"
+
+    def ready(self):
+        """Подключает обработчики сигналов."""
+        from . import signals  # noqa: F401
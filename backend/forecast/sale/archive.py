@@ -0,0 +1,466 @@
+"""Архив продаж по магазинам и месяцам."""
+
+import json
+import lzma
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from heapq import heappop, heappush, merge
+from itertools import chain, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.functions import TruncMonth
+
+from .constants import SALE_TOTAL_FIELDS
+from .models import Sale, SaleArchive, Store, get_period_start
+from .partitions import month_start, next_month
+
+SALE_ARCHIVE_FIELDS = ("sku_id", "date", "sales_type", *SALE_TOTAL_FIELDS)
+# Степень сжатия lzma: архив пишется редко, а читается целиком.
+SALE_ARCHIVE_PRESET = 6
+SALE_ARCHIVE_CHUNK_SIZE = 5000
+# Число SKU в одной части архива месяца.
+SALE_ARCHIVE_PART_SKUS = 50
+
+
+def get_archive_cutoff(hot_months=None):
+    """
+    Возвращает первый день самого старого месяца, остающегося в Sale.
+
+    Args:
+        hot_months (int | None): Число последних месяцев в таблице продаж,
+            по умолчанию settings.SALE_HOT_MONTHS (текущий месяц входит
+            в их число).
+
+    Returns:
+        date: Продажи до этой даты переносятся в архив.
+    """
+    if hot_months is None:
+        hot_months = settings.SALE_HOT_MONTHS
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - max(hot_months - 1, 0)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def encode_sales(rows):
+    """
+    Сжимает продажи месяца магазина в колонки.
+
+    Значения каждого поля хранятся подряд (дата - днем месяца, суммы -
+    строками без потери точности), поэтому повторяющиеся значения
+    колонок хорошо сжимаются.
+
+    Args:
+        rows (list): Словари SALE_ARCHIVE_FIELDS, упорядоченные
+            по (sku_id, date).
+
+    Returns:
+        bytes: Колонки в JSON, сжатые lzma.
+    """
+    columns = {
+        "sku": [row["sku_id"] for row in rows],
+        "day": [row["date"].day for row in rows],
+        "sales_type": [int(row["sales_type"]) for row in rows],
+        **{field: [str(row[field]) for row in rows] for field in SALE_TOTAL_FIELDS},
+    }
+    return lzma.compress(
+        json.dumps(columns, separators=(",", ":")).encode(),
+        preset=SALE_ARCHIVE_PRESET,
+    )
+
+
+def decode_sales(archive):
+    """
+    Распаковывает продажи архива месяца.
+
+    Args:
+        archive (SaleArchive): Архив продаж магазина за месяц.
+
+    Returns:
+        list: Словари SALE_ARCHIVE_FIELDS, упорядоченные по (sku_id, date).
+    """
+    columns = json.loads(lzma.decompress(bytes(archive.data)))
+    month = archive.month
+    return [
+        {
+            "sku_id": sku,
+            "date": month.replace(day=day),
+            "sales_type": bool(sales_type),
+            **{
+                field: Decimal(value)
+                for field, value in zip(SALE_TOTAL_FIELDS, values)
+            },
+        }
+        for sku, day, sales_type, *values in zip(
+            columns["sku"],
+            columns["day"],
+            columns["sales_type"],
+            *(columns[field] for field in SALE_TOTAL_FIELDS),
+        )
+    ]
+
+
+def build_parts(store, month, rows):
+    """
+    Делит продажи месяца магазина на части по SKU.
+
+    Args:
+        store (str): ID магазина.
+        month (date): Первый день месяца.
+        rows (list): Словари SALE_ARCHIVE_FIELDS, упорядоченные
+            по (sku_id, date).
+
+    Returns:
+        list: Несохраненные части архива по SALE_ARCHIVE_PART_SKUS SKU.
+    """
+    groups = [
+        list(group) for _, group in groupby(rows, key=itemgetter("sku_id"))
+    ]
+    parts = []
+    for index in range(0, len(groups), SALE_ARCHIVE_PART_SKUS):
+        part = list(
+            chain.from_iterable(groups[index:index + SALE_ARCHIVE_PART_SKUS])
+        )
+        parts.append(
+            SaleArchive(
+                store_id=store,
+                month=month,
+                first_sku=part[0]["sku_id"],
+                last_sku=part[-1]["sku_id"],
+                rows=len(part),
+                data=encode_sales(part),
+            )
+        )
+    return parts
+
+
+def archive_month(store, month, using=DEFAULT_DB_ALIAS):
+    """
+    Переносит продажи магазина за месяц из Sale в архив.
+
+    Если архив месяца уже есть (продажи пришли после архивации),
+    продажи объединяются, значения из Sale заменяют архивные, и части
+    архива месяца записываются заново.
+
+    Args:
+        store (str): ID магазина.
+        month (date): Первый день месяца.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        int: Число перенесенных продаж.
+    """
+    sales = Sale.objects.using(using).filter(
+        store_id=store, date__gte=month, date__lt=next_month(month)
+    )
+    with transaction.atomic(using=using):
+        rows = list(sales.order_by("sku_id", "date").values(*SALE_ARCHIVE_FIELDS))
+        archives = list(
+            SaleArchive.objects.using(using)
+            .select_for_update()
+            .filter(store_id=store, month=month)
+            .order_by("first_sku")
+        )
+        if archives:
+            keys = {get_row_key(row) for row in rows}
+            rows = sorted(
+                [
+                    row
+                    for archive in archives
+                    for row in decode_sales(archive)
+                    if get_row_key(row) not in keys
+                ]
+                + rows,
+                key=get_row_key,
+            )
+            SaleArchive.objects.using(using).filter(
+                pk__in=[archive.pk for archive in archives]
+            ).delete()
+        SaleArchive.objects.using(using).bulk_create(build_parts(store, month, rows))
+        return sales.delete()[0]
+
+
+def archive_sales(before=None, stores=None, using=DEFAULT_DB_ALIAS):
+    """
+    Переносит в архив продажи до даты по месяцам и магазинам.
+
+    Каждый месяц магазина переносится своей транзакцией, поэтому
+    прерванную архивацию можно повторить.
+
+    Args:
+        before (date | None): Продажи до первого дня месяца этой даты
+            переносятся в архив, по умолчанию get_archive_cutoff().
+        stores (Iterable[str] | None): ID магазинов, None - все магазины.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        dict: Число архивированных месяцев магазинов (months)
+        и перенесенных продаж (sales).
+    """
+    before = month_start(before or get_archive_cutoff())
+    sales = Sale.objects.using(using).filter(date__lt=before)
+    if stores is not None:
+        sales = sales.filter(store_id__in=list(stores))
+    months = (
+        sales.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values_list("store_id", "month")
+        .distinct()
+    )
+    result = {"months": 0, "sales": 0}
+    for store, month in sorted(months):
+        result["sales"] += archive_month(store, month, using)
+        result["months"] += 1
+    return result
+
+
+def get_row_key(row):
+    """Возвращает ключ продажи (SKU, дата) для упорядочивания."""
+    return row["sku_id"], row["date"]
+
+
+def get_archives(store=None, start=None, end=None, first_sku=None,
+                 last_sku=None, using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает части архива, пересекающиеся с периодом и диапазоном SKU.
+
+    Args:
+        store (str | None): ID магазина, None - все магазины.
+        start (date | None): Первый день периода.
+        end (date | None): Последний день периода.
+        first_sku (str | None): Наименьший нужный SKU.
+        last_sku (str | None): Наибольший нужный SKU.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        QuerySet: Части архива.
+    """
+    archives = SaleArchive.objects.using(using)
+    if store is not None:
+        archives = archives.filter(store_id=store)
+    if start is not None:
+        archives = archives.filter(month__gte=month_start(start))
+    if end is not None:
+        archives = archives.filter(month__lte=end)
+    if first_sku is not None:
+        archives = archives.filter(last_sku__gte=first_sku)
+    if last_sku is not None:
+        archives = archives.filter(first_sku__lte=last_sku)
+    return archives
+
+
+def filter_rows(rows, skus=None, start=None, end=None, after=None):
+    """Отбирает продажи части архива по SKU, периоду и ключу."""
+    for row in rows:
+        if skus is not None and row["sku_id"] not in skus:
+            continue
+        if start is not None and row["date"] < start:
+            continue
+        if end is not None and row["date"] > end:
+            continue
+        if after is not None and get_row_key(row) <= after:
+            continue
+        yield row
+
+
+def iter_archived_sales(store, skus=None, start=None, end=None, after=None,
+                        using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает продажи магазина из архива в порядке (SKU, дата).
+
+    Части архива читаются лениво: часть распаковывается, только когда
+    очередная продажа может оказаться в ней (ее первый SKU не больше
+    SKU очередной продажи). Поэтому при чтении первых продаж (страница
+    списка) или продаж одного SKU распаковываются только нужные части,
+    а в памяти одновременно находятся продажи не более одной части
+    каждого месяца.
+
+    Args:
+        store (str): ID магазина.
+        skus (Iterable[str] | None): SKU, None - все SKU.
+        start (date | None): Первый день периода.
+        end (date | None): Последний день периода.
+        after (tuple | None): Ключ (SKU, дата), после которого
+            возвращаются продажи.
+        using (str): Псевдоним базы данных.
+
+    Yields:
+        dict: Словари SALE_ARCHIVE_FIELDS.
+    """
+    skus = set(skus) if skus is not None else None
+    if skus is not None and not skus:
+        return
+    first_sku = min(skus) if skus else None
+    if after is not None and (first_sku is None or after[0] > first_sku):
+        first_sku = after[0]
+    archives = get_archives(
+        store, start, end, first_sku, max(skus) if skus else None, using
+    ).order_by("first_sku", "month")
+    archives = iter(archives.iterator(chunk_size=SALE_ARCHIVE_CHUNK_SIZE))
+    pending = next(archives, None)
+    heap = []
+    while True:
+        # Часть открывается, только если в ней может быть продажа
+        # не больше наименьшей из уже открытых частей.
+        while pending is not None and (
+            not heap or pending.first_sku <= heap[0][0][0]
+        ):
+            rows = filter_rows(decode_sales(pending), skus, start, end, after)
+            row = next(rows, None)
+            if row is not None:
+                heappush(heap, (get_row_key(row), pending.pk, row, rows))
+            pending = next(archives, None)
+        if not heap:
+            return
+        _, part, row, rows = heappop(heap)
+        yield row
+        row = next(rows, None)
+        if row is not None:
+            heappush(heap, (get_row_key(row), part, row, rows))
+
+
+def iter_archived_days(keys, using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает продажи из архива за дни магазинов.
+
+    Продажи, которые есть и в таблице Sale (загружены после архивации
+    месяца), пропускаются: значения из таблицы заменяют архивные.
+
+    Args:
+        keys (Iterable[tuple]): Пары (ID магазина, дата).
+        using (str): Псевдоним базы данных.
+
+    Yields:
+        tuple: ID магазина и словарь SALE_ARCHIVE_FIELDS.
+    """
+    months = defaultdict(set)
+    for store, day in keys:
+        months[store, month_start(day)].add(day)
+    if not months:
+        return
+    archived = (
+        SaleArchive.objects.using(using)
+        .filter(
+            store_id__in={store for store, _ in months},
+            month__in={month for _, month in months},
+        )
+        .order_by()
+        .values_list("store_id", "month")
+        .distinct()
+    )
+    for store, month in sorted(set(archived) & months.keys()):
+        days = months[store, month]
+        hot = set(
+            Sale.objects.using(using)
+            .filter(store_id=store, date__in=days)
+            .values_list("sku_id", "date")
+        )
+        for row in iter_archived_sales(
+            store, start=min(days), end=max(days), using=using
+        ):
+            if row["date"] in days and get_row_key(row) not in hot:
+                yield store, row
+
+
+def merge_hot_sales(hot, archived):
+    """
+    Объединяет продажи из таблицы и из архива в порядке (SKU, дата).
+
+    Продажа из таблицы заменяет продажу из архива с тем же ключом
+    (например, загруженную после архивации месяца).
+
+    Args:
+        hot (Iterable[dict]): Продажи из таблицы в порядке (SKU, дата).
+        archived (Iterable[dict]): Продажи из архива в том же порядке.
+
+    Yields:
+        dict: Продажи без повторов ключа.
+    """
+    previous = None
+    for row in merge(hot, archived, key=get_row_key):
+        key = get_row_key(row)
+        if key != previous:
+            yield row
+        previous = key
+
+
+def resample_sales(rows, freq):
+    """
+    Суммирует продажи по неделям или месяцам в Python.
+
+    Результат совпадает с SaleQuerySet.resample и используется, когда
+    продажи объединены из таблицы и архива.
+
+    Args:
+        rows (Iterable[dict]): Продажи, упорядоченные по дате.
+        freq (str): Период: W - неделя, M - месяц.
+
+    Returns:
+        list: Словари с началом периода (date), суммами показателей,
+        числом дней с промо (promo_days) и числом дней (days).
+    """
+    periods = {}
+    for row in rows:
+        period = get_period_start(row["date"], freq)
+        if period not in periods:
+            periods[period] = {
+                "date": period,
+                **{field: Decimal(0) for field in SALE_TOTAL_FIELDS},
+                "promo_days": 0,
+                "days": 0,
+            }
+        total = periods[period]
+        for field in SALE_TOTAL_FIELDS:
+            total[field] += row[field]
+        total["promo_days"] += bool(row["sales_type"])
+        total["days"] += 1
+    return [periods[period] for period in sorted(periods)]
+
+
+def iter_sales_history(stores=None, start=None, end=None, with_hot=False,
+                       using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает продажи из архива и, по запросу, из таблицы продаж.
+
+    Используется для выгрузки истории продаж (например, для обучения
+    моделей) без возврата архива в таблицу продаж. Продажи из таблицы
+    заменяют архивные продажи с тем же ключом.
+
+    Args:
+        stores (Iterable[str] | None): ID магазинов, None - все магазины.
+        start (date | None): Первый день периода.
+        end (date | None): Последний день периода.
+        with_hot (bool): Добавить продажи из таблицы Sale.
+        using (str): Псевдоним базы данных.
+
+    Yields:
+        tuple: ID магазина и словарь SALE_ARCHIVE_FIELDS; продажи
+        упорядочены по магазину, SKU и дате.
+    """
+    if stores is None:
+        archived = get_archives(start=start, end=end, using=using).values_list(
+            "store_id", flat=True
+        )
+        stores = set(archived)
+        if with_hot:
+            stores |= set(
+                Store.objects.using(using).values_list("store", flat=True)
+            )
+    for store in sorted(stores):
+        rows = iter_archived_sales(store, None, start, end, using=using)
+        if with_hot:
+            sales = Sale.objects.using(using).filter(store_id=store)
+            if start is not None:
+                sales = sales.filter(date__gte=start)
+            if end is not None:
+                sales = sales.filter(date__lte=end)
+            rows = merge_hot_sales(
+                sales.order_by("sku_id", "date")
+                .values(*SALE_ARCHIVE_FIELDS)
+                .iterator(chunk_size=SALE_ARCHIVE_CHUNK_SIZE),
+                rows,
+            )
+        for row in rows:
+            yield store, row
@@ -0,0 +1,178 @@
+"""Кэш справочников магазинов и категорий."""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Category, Store
+
+REFERENCE_VERSION_KEY = "sale:reference_version"
+
+
+def get_reference_version():
+    """
+    Возвращает текущую версию справочников.
+
+    Начальная версия берется из времени, чтобы после очистки общего кэша
+    она не совпала с версией, уже загруженной каким-либо процессом.
+    """
+    return cache.get_or_set(REFERENCE_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_reference_version():
+    """
+    Увеличивает версию справочников.
+
+    Версия увеличивается сразу и еще раз после фиксации транзакции:
+    иначе процесс, перечитавший справочник до фиксации, запомнил бы
+    старые данные с новой версией.
+    """
+
+    def bump():
+        try:
+            cache.incr(REFERENCE_VERSION_KEY)
+        except ValueError:
+            cache.set(REFERENCE_VERSION_KEY, time.time_ns(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+class ReferenceCache:
+    """
+    Кэш таблицы справочника в памяти процесса.
+
+    Таблица читается целиком при первом обращении и перечитывается, когда
+    меняется версия справочников в кэше Django (см. bump_reference_version)
+    или прошло REFERENCE_CACHE_TIMEOUT секунд с последнего чтения. Версия
+    видна всем процессам, только если кэш Django общий (CACHE_BACKEND);
+    с LocMemCache изменения из других процессов (команд, обработчика
+    заданий импорта, других воркеров) видны не позже чем через
+    REFERENCE_CACHE_TIMEOUT. Вместе с объектами кэшируются вычисленные
+    по ним значения: сериализованные списки, дерево категорий и т.п.
+    """
+
+    def __init__(self, model):
+        """Создает пустой кэш справочника модели model."""
+        self.model = model
+        self.version = None
+        self.loaded_at = None
+        self.objects = {}
+        self.computed = {}
+        self.lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        """
+        Возвращает этот же кэш.
+
+        Кэш общий для процесса; копии полей сериализаторов (см.
+        api.serializers.ReferenceSlugField) должны ссылаться на него же.
+        """
+        return self
+
+    def is_stale(self, version):
+        """Проверяет, нужно ли перечитать таблицу."""
+        return (
+            version != self.version
+            or self.loaded_at is None
+            or time.monotonic() - self.loaded_at
+            >= settings.REFERENCE_CACHE_TIMEOUT
+        )
+
+    def load(self, force=False):
+        """
+        Перечитывает таблицу, если она устарела.
+
+        Таблица устаревает при смене версии справочников и по истечении
+        REFERENCE_CACHE_TIMEOUT секунд.
+
+        Args:
+            force (bool): Перечитать таблицу в любом случае.
+        """
+        version = get_reference_version()
+        if force or self.is_stale(version):
+            with self.lock:
+                if force or self.is_stale(version):
+                    self.objects = {
+                        obj.pk: obj for obj in self.model.objects.all()
+                    }
+                    self.computed = {}
+                    self.version = version
+                    self.loaded_at = time.monotonic()
+
+    def all(self):
+        """
+        Возвращает объекты справочника.
+
+        Returns:
+            dict: Объекты справочника по первичному ключу.
+        """
+        self.load()
+        return self.objects
+
+    def get(self, pk):
+        """Возвращает объект справочника по первичному ключу или None."""
+        return self.all().get(pk)
+
+    def get_many(self, pks):
+        """
+        Возвращает объекты справочника, перечитывая его при промахе.
+
+        Если какого-либо ключа нет в кэше, он ищется в базе данных:
+        объект мог быть добавлен в другом процессе, версия из которого
+        еще не видна. Если такой объект есть, таблица перечитывается.
+
+        Args:
+            pks (Iterable): Первичные ключи, которые нужно проверить.
+
+        Returns:
+            dict: Объекты справочника по первичному ключу.
+        """
+        objects = self.all()
+        missing = {pk for pk in pks if pk not in objects}
+        if missing and self.model.objects.filter(pk__in=missing).exists():
+            self.load(force=True)
+            objects = self.objects
+        return objects
+
+    def get_computed(self, key, build):
+        """
+        Возвращает значение, вычисленное по объектам справочника.
+
+        Значение вычисляется один раз на версию справочников.
+
+        Args:
+            key: Ключ значения.
+            build (Callable): Функция, получающая список объектов
+                в порядке первичного ключа.
+
+        Returns:
+            tuple: Версия справочников и значение.
+        """
+        self.load()
+        version, objects, computed = self.version, self.objects, self.computed
+        if key not in computed:
+            computed[key] = build(sorted(objects.values(), key=lambda obj: obj.pk))
+        return version, computed[key]
+
+    def get_data(self, serializer_class):
+        """
+        Возвращает сериализованный список объектов справочника.
+
+        Args:
+            serializer_class: Класс сериализатора объекта.
+
+        Returns:
+            list: Данные всех объектов в порядке первичного ключа.
+        """
+        return self.get_computed(
+            serializer_class,
+            lambda objects: serializer_class(objects, many=True).data,
+        )[1]
+
+
+store_cache = ReferenceCache(Store)
+category_cache = ReferenceCache(Category)
@@ -1,3 +1,9 @@
 DECIMAL_PLACES = 1
 MAX_LENGTH_FOR_FIELDS = 32
 MAX_DIGITS = 15
+FORECAST_STORAGE_COMPACT = "compact"
+FORECAST_STORAGE_ROWS = "rows"
+RESAMPLE_MONTH = "M"
+RESAMPLE_WEEK = "W"
+RESAMPLE_FREQUENCIES = (RESAMPLE_WEEK, RESAMPLE_MONTH)
+SALE_TOTAL_FIELDS = ("sales_units", "sales_units_promo", "sales_rub", "sales_run_promo")
@@ -0,0 +1,102 @@
+"""Поля моделей приложения sale."""
+
+import sys
+from array import array
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import models
+
+
+class PackedIntegerArrayField(models.Field):
+    """
+    Поле с массивом неотрицательных целых чисел.
+
+    В PostgreSQL хранится как integer[], в остальных СУБД - как двоичная
+    строка из 32-битных чисел в порядке little-endian. В Python значение
+    поля - список int.
+    """
+
+    description = "Упакованный массив целых чисел"
+    typecode = "I"
+
+    def db_type(self, connection):
+        """Возвращает тип колонки для СУБД."""
+        if connection.vendor == "postgresql":
+            return "integer[]"
+        return "blob"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        """Преобразует список чисел в значение для записи в базу данных."""
+        if value is None:
+            return None
+        values = [int(item) for item in value]
+        if connection.vendor == "postgresql":
+            return values
+        packed = array(self.typecode, values)
+        if sys.byteorder != "little":
+            packed.byteswap()
+        return packed.tobytes()
+
+    def from_db_value(self, value, expression, connection):
+        """Преобразует значение из базы данных в список чисел."""
+        if value is None or isinstance(value, list):
+            return value
+        packed = array(self.typecode)
+        packed.frombytes(bytes(value))
+        if sys.byteorder != "little":
+            packed.byteswap()
+        return packed.tolist()
+
+    def to_python(self, value):
+        """Приводит значение к списку чисел."""
+        if value is None or isinstance(value, list):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self.from_db_value(value, None, None)
+        return [int(item) for item in value]
+
+
+class FixedPointDecimalField(models.DecimalField):
+    """
+    Десятичное поле, хранящееся целым числом с фиксированной точкой.
+
+    Значение умножается на 10 ** decimal_places и хранится как bigint,
+    поэтому строка таблицы имеет фиксированный размер, а драйвер базы
+    данных читает целые числа вместо numeric. В Python значение поля -
+    Decimal, как у DecimalField; формы, сериализаторы и фильтры работают
+    с полем как с DecimalField. Суммы (Sum) по полю также пересчитываются
+    в Decimal. В SQL-запросах без ORM значения нужно делить на scale.
+    """
+
+    description = "Десятичное число с фиксированной точкой"
+
+    @property
+    def scale(self):
+        """Множитель хранимого целого значения."""
+        return 10 ** self.decimal_places
+
+    def get_internal_type(self):
+        """Колонка создается как целочисленная (bigint)."""
+        return "BigIntegerField"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        """Преобразует Decimal в целое число для записи и сравнений."""
+        if value is None or hasattr(value, "as_sql"):
+            return value
+        if not prepared:
+            value = self.get_prep_value(value)
+        return int(
+            self.to_python(value)
+            .scaleb(self.decimal_places)
+            .to_integral_value(ROUND_HALF_UP)
+        )
+
+    def get_db_prep_save(self, value, connection):
+        """Преобразует значение поля в целое число для записи."""
+        return self.get_db_prep_value(value, connection)
+
+    def from_db_value(self, value, expression, connection):
+        """Преобразует целое число (или сумму) из базы данных в Decimal."""
+        if value is None:
+            return value
+        return Decimal(value).scaleb(-self.decimal_places)
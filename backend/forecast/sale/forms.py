@@ -0,0 +1,9 @@
+"""Формы приложения sale."""
+
+from django import forms
+
+
+class SaleImportForm(forms.Form):
+    """Форма быстрого импорта продаж из CSV."""
+
+    import_file = forms.FileField(label="Файл CSV")
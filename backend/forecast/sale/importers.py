@@ -0,0 +1,442 @@
+"""Быстрый импорт продаж из CSV."""
+
+import csv
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, DatabaseError, DataError,
+                       IntegrityError, connections, transaction)
+
+from .constants import SALE_TOTAL_FIELDS
+from .models import Category, Sale, Store
+from .partitions import ensure_sale_partitions
+from .signals import sales_imported
+
+# Колонки файла продаж (как в SaleResource) и поля Sale.
+SALE_IMPORT_COLUMNS = {
+    "st_id": "store_id",
+    "pr_sku_id": "sku_id",
+    "date": "date",
+    "pr_sales_type_id": "sales_type",
+    "pr_sales_in_units": "sales_units",
+    "pr_promo_sales_in_units": "sales_units_promo",
+    "pr_sales_in_rub": "sales_rub",
+    "pr_promo_sales_in_rub": "sales_run_promo",
+}
+SALE_IMPORT_CHUNK_SIZE = 5000
+# Разделов на процесс: несколько разделов на процесс выравнивают нагрузку,
+# если магазины сильно различаются по числу продаж.
+SALE_IMPORT_PARTITIONS_PER_WORKER = 4
+SALE_TYPE_VALUES = {
+    "0": False, "0.0": False, "false": False,
+    "1": True, "1.0": True, "true": True,
+}
+
+
+class SaleImportError(Exception):
+    """Ошибка импорта файла продаж."""
+
+
+def parse_sale_row(row, number):
+    """
+    Преобразует строку CSV в значения полей Sale.
+
+    Args:
+        row (dict): Строка csv.DictReader.
+        number (int): Номер строки файла для сообщения об ошибке.
+
+    Returns:
+        dict: Значения полей Sale.
+    """
+    try:
+        values = {
+            field: row[column].strip()
+            for column, field in SALE_IMPORT_COLUMNS.items()
+        }
+        values["date"] = date.fromisoformat(values["date"])
+        values["sales_type"] = SALE_TYPE_VALUES[values["sales_type"].lower()]
+        for field in SALE_TOTAL_FIELDS:
+            values[field] = Decimal(values[field])
+    except (AttributeError, InvalidOperation, KeyError, ValueError):
+        raise SaleImportError(f"Строка {number}: неверный формат.")
+    return values
+
+
+def open_sale_reader(stream):
+    """Возвращает csv.DictReader, проверив наличие колонок SaleResource."""
+    reader = csv.DictReader(stream)
+    missing = set(SALE_IMPORT_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise SaleImportError(
+            f"В файле нет колонок: {', '.join(sorted(missing))}."
+        )
+    return reader
+
+
+def read_sale_rows(stream):
+    """
+    Читает строки продаж из CSV с колонками SaleResource.
+
+    Args:
+        stream: Текстовый поток с данными.
+
+    Yields:
+        tuple: Номер строки файла и словарь значений полей Sale.
+    """
+    for number, row in enumerate(open_sale_reader(stream), start=2):
+        yield number, parse_sale_row(row, number)
+
+
+def read_sale_months(stream):
+    """
+    Читает месяцы продаж из CSV без разбора остальных колонок.
+
+    Строки с неверной датой пропускаются: они будут отклонены при импорте.
+
+    Args:
+        stream: Текстовый поток с данными.
+
+    Returns:
+        set: Первые дни месяцев продаж.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None) or []
+    if "date" not in header:
+        return set()
+    column = header.index("date")
+    months = set()
+    for row in reader:
+        try:
+            months.add(date.fromisoformat(row[column].strip()).replace(day=1))
+        except (IndexError, ValueError):
+            continue
+    return months
+
+
+def get_reference_keys(using=DEFAULT_DB_ALIAS):
+    """Возвращает множества ID магазинов и SKU для проверки строк."""
+    return (
+        set(Store.objects.using(using).values_list("pk", flat=True)),
+        set(Category.objects.using(using).values_list("pk", flat=True)),
+    )
+
+
+def check_references(values, stores, skus, number):
+    """Проверяет, что магазин и SKU строки есть в справочниках."""
+    if values["store_id"] not in stores:
+        raise SaleImportError(
+            f"Строка {number}: не найден магазин {values['store_id']}."
+        )
+    if values["sku_id"] not in skus:
+        raise SaleImportError(f"Строка {number}: не найден SKU {values['sku_id']}.")
+
+
+def write_sales(sales, using):
+    """
+    Записывает порцию продаж одним запросом INSERT ... ON CONFLICT.
+
+    Существующие продажи с теми же магазином, SKU и датой
+    (unique_store_sku_date_in_sale) обновляются.
+    """
+    Sale.objects.using(using).bulk_create(
+        sales,
+        update_conflicts=True,
+        unique_fields=("store", "sku", "date"),
+        update_fields=("sales_type", *SALE_TOTAL_FIELDS),
+    )
+
+
+def get_sale_key(values):
+    """Возвращает ключ продажи (магазин, SKU, дата)."""
+    return values["store_id"], values["sku_id"], values["date"]
+
+
+def write_chunk(chunk, using=DEFAULT_DB_ALIAS):
+    """
+    Записывает порцию продаж без повторов ключа.
+
+    Секции таблицы продаж для месяцев порции создаются вызывающим кодом
+    до начала транзакции записи (ensure_sale_partitions), чтобы она
+    не держала блокировки, взятые при присоединении секций.
+
+    Args:
+        chunk (dict): Значения полей Sale по ключу (магазин, SKU, дата).
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        set: Затронутые пары (магазин, дата) для сигнала sales_imported.
+    """
+    write_sales([Sale(**values) for values in chunk.values()], using)
+    return {(store, day) for store, _, day in chunk}
+
+
+def write_sale_rows(stream, chunk_size=SALE_IMPORT_CHUNK_SIZE,
+                    using=DEFAULT_DB_ALIAS):
+    """
+    Записывает продажи из CSV одной транзакцией без отправки сигнала.
+
+    Секции таблицы продаж для месяцев файла должны быть созданы заранее
+    (см. import_sales).
+
+    Args:
+        stream: Текстовый поток с данными.
+        chunk_size (int): Число продаж в одном запросе.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        dict: Число прочитанных строк (rows), записанных продаж (sales)
+        и затронутые пары (магазин, дата) (keys).
+    """
+    stores, skus = get_reference_keys(using)
+    rows = read_sale_rows(stream)
+    keys = set()
+    total_rows = total_sales = 0
+    try:
+        with transaction.atomic(using=using):
+            while True:
+                chunk = {}
+                for number, values in islice(rows, chunk_size):
+                    check_references(values, stores, skus, number)
+                    chunk[get_sale_key(values)] = values
+                    total_rows += 1
+                if not chunk:
+                    break
+                keys.update(write_chunk(chunk, using))
+                total_sales += len(chunk)
+    except (DataError, IntegrityError) as error:
+        raise SaleImportError(str(error)) from error
+    return {"rows": total_rows, "sales": total_sales, "keys": keys}
+
+
+def import_sales(stream, chunk_size=SALE_IMPORT_CHUNK_SIZE, using=DEFAULT_DB_ALIAS):
+    """
+    Быстро импортирует продажи из CSV одной транзакцией.
+
+    В отличие от SaleResource магазины и SKU проверяются по множествам
+    ключей, прочитанным из базы один раз, а продажи записываются порциями
+    через bulk_create(update_conflicts=True) без поиска каждой записи.
+    Повторы ключа (магазин, SKU, дата) внутри порции схлопываются
+    (побеждает последняя строка), между порциями - перезаписываются,
+    поэтому повторный импорт файла безопасен. После импорта отправляется
+    сигнал sales_imported.
+
+    Перед транзакцией импорта файл читается один раз для поиска месяцев
+    продаж, и недостающие секции таблицы продаж создаются своей короткой
+    транзакцией: их присоединение блокирует секцию по умолчанию, и эта
+    блокировка не должна держаться до конца импорта. Поток без
+    произвольного доступа для этого сохраняется во временный файл.
+
+    Args:
+        stream: Текстовый поток с данными.
+        chunk_size (int): Число продаж в одном запросе.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        dict: Число прочитанных строк и записанных продаж.
+    """
+    with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as spool:
+        if not stream.seekable():
+            shutil.copyfileobj(stream, spool)
+            spool.seek(0)
+            stream = spool
+        start = stream.tell()
+        ensure_sale_partitions(read_sale_months(stream), using)
+        stream.seek(start)
+        result = write_sale_rows(stream, chunk_size, using)
+    sales_imported.send(sender=Sale, keys=result["keys"])
+    return {"rows": result["rows"], "sales": result["sales"]}
+
+
+def partition_sales_file(stream, directory, partitions):
+    """
+    Разбивает CSV продаж на файлы по магазинам (st_id).
+
+    Магазин попадает в раздел по crc32 своего ID, поэтому все строки
+    магазина оказываются в одном разделе, а ключи продаж разных разделов
+    не пересекаются. Строки не разбираются, а переписываются как есть.
+
+    Args:
+        stream: Текстовый поток с данными.
+        directory (str): Каталог для файлов разделов.
+        partitions (int): Число разделов.
+
+    Returns:
+        list: Для каждого непустого раздела словарь с путем к файлу (path),
+        магазинами (stores), месяцами продаж (months) и числом строк (rows).
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None) or []
+    missing = [column for column in ("st_id", "date") if column not in header]
+    if missing:
+        raise SaleImportError(f"В файле нет колонок: {', '.join(missing)}.")
+    store_column = header.index("st_id")
+    date_column = header.index("date")
+    files = {}
+    writers = {}
+    info = {}
+    try:
+        for row in reader:
+            if not row:
+                continue
+            store = row[store_column].strip() if len(row) > store_column else ""
+            index = zlib.crc32(store.encode()) % partitions
+            if index not in writers:
+                path = os.path.join(directory, f"partition_{index}.csv")
+                files[index] = open(path, "w", encoding="utf-8", newline="")
+                writers[index] = csv.writer(files[index])
+                writers[index].writerow(header)
+                info[index] = {
+                    "path": path, "stores": set(), "months": set(), "rows": 0
+                }
+            writers[index].writerow(row)
+            info[index]["stores"].add(store)
+            try:
+                info[index]["months"].add(
+                    date.fromisoformat(row[date_column].strip()).replace(day=1)
+                )
+            except (IndexError, ValueError):
+                # Строка с ошибкой будет отклонена при импорте раздела.
+                pass
+            info[index]["rows"] += 1
+    finally:
+        for file in files.values():
+            file.close()
+    return [info[index] for index in sorted(info)]
+
+
+def init_import_worker():
+    """
+    Готовит процесс пула к импорту.
+
+    При запуске процессов через spawn настраивает Django; соединения
+    с БД процесс открывает свои (родитель закрывает свои до запуска пула).
+    """
+    import django
+
+    django.setup()
+    connections.close_all()
+
+
+def import_partition(path, chunk_size=SALE_IMPORT_CHUNK_SIZE,
+                     using=DEFAULT_DB_ALIAS):
+    """
+    Импортирует файл одного раздела в процессе пула.
+
+    Returns:
+        dict: Результат write_sale_rows и время импорта раздела (seconds).
+    """
+    started = time.perf_counter()
+    with open(path, encoding="utf-8", newline="") as stream:
+        result = write_sale_rows(stream, chunk_size, using)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def import_sales_parallel(stream, workers=None, chunk_size=SALE_IMPORT_CHUNK_SIZE,
+                          using=DEFAULT_DB_ALIAS):
+    """
+    Импортирует продажи, параллельно обрабатывая разделы файла по магазинам.
+
+    Файл разбивается на разделы по st_id (partition_sales_file), и каждый
+    раздел разбирается и записывается своей транзакцией в отдельном
+    процессе пула со своим соединением с БД. Разделы содержат
+    непересекающиеся ключи продаж, поэтому процессы не ждут блокировок
+    друг друга на unique_store_sku_date_in_sale. SQLite допускает только
+    одного пишущего, поэтому в нем, как и при workers=1 или вызове внутри
+    транзакции (процессы пула не увидели бы ее данные), разделы
+    импортируются по очереди в текущем процессе.
+
+    Раздел с ошибкой откатывается целиком, остальные сохраняются.
+    Сигнал sales_imported отправляется один раз по всем сохраненным
+    разделам, после чего при ошибках поднимается SaleImportError.
+
+    Args:
+        stream: Текстовый поток с данными.
+        workers (int | None): Число процессов, по умолчанию
+            settings.SALE_IMPORT_PROCESSES.
+        chunk_size (int): Число продаж в одном запросе.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        dict: Число прочитанных строк (rows), записанных продаж (sales)
+        и результаты разделов (partitions): магазины, строки, продажи
+        и время импорта в секундах.
+    """
+    workers = max(1, workers or settings.SALE_IMPORT_PROCESSES)
+    connection = connections[using]
+    if connection.vendor == "sqlite" or connection.in_atomic_block:
+        workers = 1
+    results = []
+    errors = []
+    keys = set()
+    with tempfile.TemporaryDirectory(prefix="sales_import_") as directory:
+        partitions = partition_sales_file(
+            stream, directory, workers * SALE_IMPORT_PARTITIONS_PER_WORKER
+        )
+        # Секции таблицы продаж создаются заранее, чтобы процессы пула
+        # не ждали друг друга на их создании.
+        ensure_sale_partitions(
+            set().union(*(partition["months"] for partition in partitions)),
+            using,
+        )
+        if workers == 1:
+            outcomes = []
+            for partition in partitions:
+                try:
+                    outcomes.append(
+                        (partition, import_partition(
+                            partition["path"], chunk_size, using), None)
+                    )
+                except (DatabaseError, SaleImportError) as error:
+                    outcomes.append((partition, None, error))
+        else:
+            # Соединения родителя не должны наследоваться процессами пула.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=init_import_worker
+            ) as executor:
+                futures = {
+                    executor.submit(
+                        import_partition, partition["path"], chunk_size, using
+                    ): partition
+                    for partition in partitions
+                }
+                outcomes = []
+                for future in as_completed(futures):
+                    try:
+                        outcomes.append((futures[future], future.result(), None))
+                    except (DatabaseError, SaleImportError) as error:
+                        outcomes.append((futures[future], None, error))
+
+    for partition, result, error in outcomes:
+        stores = sorted(partition["stores"])
+        if error is not None:
+            errors.append(f"Магазины {', '.join(stores)}: {error}")
+            continue
+        keys.update(result["keys"])
+        results.append(
+            {
+                "stores": stores,
+                "rows": result["rows"],
+                "sales": result["sales"],
+                "seconds": result["seconds"],
+            }
+        )
+    if keys:
+        sales_imported.send(sender=Sale, keys=keys)
+    if errors:
+        raise SaleImportError(" ".join(errors))
+    results.sort(key=lambda result: result["stores"])
+    return {
+        "rows": sum(result["rows"] for result in results),
+        "sales": sum(result["sales"] for result in results),
+        "partitions": results,
+    }
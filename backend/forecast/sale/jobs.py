@@ -0,0 +1,228 @@
+"""Фоновое выполнение задач импорта продаж."""
+
+import csv
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from threading import Lock
+
+from django.conf import settings
+from django.db import (DataError, IntegrityError, close_old_connections,
+                       connection, transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .importers import (SALE_IMPORT_CHUNK_SIZE, SaleImportError,
+                        check_references, get_reference_keys, get_sale_key,
+                        open_sale_reader, parse_sale_row, write_chunk)
+from .models import ImportJob
+from .partitions import ensure_sale_partitions
+from .signals import sales_imported
+
+IMPORT_JOB_MAX_ERRORS = 100
+
+logger = logging.getLogger(__name__)
+
+# Пул потоков фонового импорта создается при первой задаче в процессе.
+executor = None
+executor_lock = Lock()
+
+
+def get_executor():
+    """Возвращает пул потоков фонового импорта процесса."""
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.IMPORT_JOB_WORKERS,
+                thread_name_prefix="import-job",
+            )
+    return executor
+
+
+def submit_import_job(job):
+    """
+    Ставит задачу импорта в очередь пула потоков процесса.
+
+    Задача отправляется после фиксации транзакции, в которой она создана,
+    чтобы поток обработчика видел ее и загруженный файл.
+    """
+    transaction.on_commit(
+        lambda: get_executor().submit(run_import_job_in_thread, job.pk)
+    )
+
+
+def run_import_job_in_thread(job_id):
+    """Выполняет задачу в потоке пула и закрывает его соединение с БД."""
+    close_old_connections()
+    try:
+        run_import_job(job_id)
+    except Exception:
+        logger.exception("Ошибка фонового импорта, задача %s", job_id)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.STATUS_FAILED, finished_at=timezone.now()
+        )
+    finally:
+        connection.close()
+
+
+def add_error(errors, message):
+    """Добавляет сообщение об ошибке, если их меньше IMPORT_JOB_MAX_ERRORS."""
+    if len(errors) < IMPORT_JOB_MAX_ERRORS:
+        errors.append(message)
+
+
+def claim_job(job_id):
+    """
+    Переводит задачу из очереди в работу.
+
+    Обновление условное, поэтому задачу, которую подхватили одновременно
+    пул потоков и команда run_import_jobs, выполнит только один из них.
+
+    Returns:
+        bool: True, если задача захвачена.
+    """
+    now = timezone.now()
+    return bool(
+        ImportJob.objects.filter(
+            pk=job_id, status=ImportJob.STATUS_PENDING
+        ).update(status=ImportJob.STATUS_RUNNING, started_at=now, updated_at=now)
+    )
+
+
+def update_job(job, **fields):
+    """
+    Сохраняет поля задачи, пока она остается за этим обработчиком.
+
+    Задача принадлежит обработчику, пока она выполняется с тем же временем
+    начала: после возврата в очередь (см. reclaim_stale_jobs) обновление
+    не выполняется.
+
+    Args:
+        job (ImportJob): Задача, захваченная обработчиком.
+        **fields: Сохраняемые поля задачи.
+
+    Returns:
+        bool: False, если задача возвращена в очередь и ее выполнение
+        нужно прекратить.
+    """
+    return bool(
+        ImportJob.objects.filter(
+            pk=job.pk,
+            status=ImportJob.STATUS_RUNNING,
+            started_at=job.started_at,
+        ).update(updated_at=timezone.now(), **fields)
+    )
+
+
+def reclaim_stale_jobs():
+    """
+    Возвращает в очередь прерванные задачи.
+
+    Задача остается в работе, если процесс обработчика остановлен во время
+    импорта. Такой считается задача, прогресс которой не обновлялся дольше
+    IMPORT_JOB_STALE_TIMEOUT секунд. Файл задачи импортируется заново:
+    продажи записываются с заменой по ключу, поэтому уже записанные
+    порции не дублируются.
+
+    Returns:
+        int: Число возвращенных в очередь задач.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_STALE_TIMEOUT)
+    return ImportJob.objects.filter(
+        Q(updated_at__lt=stale)
+        | Q(updated_at__isnull=True, started_at__lt=stale),
+        status=ImportJob.STATUS_RUNNING,
+    ).update(
+        status=ImportJob.STATUS_PENDING,
+        started_at=None,
+        updated_at=None,
+        bytes_done=0,
+        rows_done=0,
+        rows_failed=0,
+        errors="",
+    )
+
+
+def run_import_job(job_id, chunk_size=SALE_IMPORT_CHUNK_SIZE):
+    """
+    Импортирует файл задачи порциями.
+
+    Каждая порция записывается своей транзакцией (см.
+    sale.importers.write_chunk), после чего в задаче сохраняются число
+    обработанных байт и строк. Строки с ошибками (неверный формат,
+    неизвестный магазин или SKU) пропускаются и учитываются в rows_failed,
+    первые IMPORT_JOB_MAX_ERRORS сообщений сохраняются в errors. После
+    импорта отправляется сигнал sales_imported по записанным продажам.
+
+    Args:
+        job_id (int): ID задачи.
+        chunk_size (int): Число строк в порции.
+
+    Returns:
+        ImportJob | None: Задача после выполнения или None, если задача
+        уже выполняется, выполнена или возвращена в очередь во время
+        выполнения.
+    """
+    if not claim_job(job_id):
+        return None
+    job = ImportJob.objects.get(pk=job_id)
+    errors = []
+    keys = set()
+    status = ImportJob.STATUS_DONE
+    try:
+        stores, skus = get_reference_keys()
+        with job.file.open("rb"):
+            raw = job.file.file
+            update_job(job, bytes_total=job.file.size)
+            reader = open_sale_reader(
+                io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            )
+            rows = enumerate(reader, start=2)
+            while True:
+                batch = list(islice(rows, chunk_size))
+                if not batch:
+                    break
+                chunk = {}
+                failed = 0
+                for number, row in batch:
+                    try:
+                        values = parse_sale_row(row, number)
+                        check_references(values, stores, skus, number)
+                    except SaleImportError as error:
+                        add_error(errors, str(error))
+                        failed += 1
+                        continue
+                    chunk[get_sale_key(values)] = values
+                try:
+                    if chunk:
+                        ensure_sale_partitions({day for _, _, day in chunk})
+                        with transaction.atomic():
+                            keys.update(write_chunk(chunk))
+                except (DataError, IntegrityError) as error:
+                    add_error(
+                        errors, f"Строки {batch[0][0]}-{batch[-1][0]}: {error}"
+                    )
+                    failed = len(batch)
+                if not update_job(
+                    job,
+                    bytes_done=raw.tell(),
+                    rows_done=F("rows_done") + len(batch) - failed,
+                    rows_failed=F("rows_failed") + failed,
+                    errors="\n".join(errors),
+                ):
+                    logger.warning("Задача %s возвращена в очередь", job.pk)
+                    return None
+    except (SaleImportError, OSError, UnicodeDecodeError, csv.Error) as error:
+        errors.append(str(error))
+        status = ImportJob.STATUS_FAILED
+    if keys:
+        sales_imported.send(sender=ImportJob, keys=keys)
+    if not update_job(
+        job, status=status, finished_at=timezone.now(), errors="\n".join(errors)
+    ):
+        return None
+    job.refresh_from_db()
+    return job
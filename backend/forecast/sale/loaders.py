@@ -0,0 +1,329 @@
+"""Загрузка и выгрузка прогнозов."""
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import (DEFAULT_DB_ALIAS, DataError, IntegrityError, connections,
+                       transaction)
+
+from .models import Category, DayForecast, Forecast, Store
+
+FORECAST_COLUMNS = ("store", "sku", "forecast_date", "date", "units")
+FORECAST_FORMATS = ("csv", "ndjson")
+STAGE_TABLE = "forecast_stage"
+STAGE_CHUNK_SIZE = 10000
+EXPORT_CHUNK_SIZE = 5000
+
+
+class ForecastLoadError(Exception):
+    """Ошибка загрузки файла прогнозов."""
+
+
+def read_forecast_rows(stream, file_format):
+    """
+    Читает строки прогнозов из CSV или NDJSON.
+
+    Колонки CSV определяются по заголовку, как в экспорте ForecastResource.
+
+    Args:
+        stream: Текстовый поток с данными.
+        file_format (str): Формат данных: csv или ndjson.
+
+    Yields:
+        tuple: Значения колонок FORECAST_COLUMNS.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        missing = set(FORECAST_COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise ForecastLoadError(
+                f"В файле нет колонок: {', '.join(sorted(missing))}."
+            )
+        for row in reader:
+            yield tuple(row[column] for column in FORECAST_COLUMNS)
+    elif file_format == "ndjson":
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                yield tuple(row[column] for column in FORECAST_COLUMNS)
+            except (ValueError, KeyError, TypeError):
+                raise ForecastLoadError(f"Неверная строка {number}.")
+    else:
+        raise ForecastLoadError(f"Неизвестный формат: {file_format}.")
+
+
+def export_forecast_rows(forecasts, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Выгружает прогнозы дней в колонках FORECAST_COLUMNS.
+
+    Прогнозы и их прогнозы дней читаются одним запросом (LEFT JOIN
+    DayForecast) курсором порциями по chunk_size (в PostgreSQL - серверным
+    курсором), поэтому число запросов и память не зависят от объема
+    выгрузки. Компактные прогнозы раскрываются по дням при чтении.
+
+    Args:
+        forecasts (QuerySet): Выгружаемые прогнозы.
+        chunk_size (int): Число строк, читаемых из базы за раз.
+
+    Yields:
+        tuple: Магазин, SKU, дата расчета прогноза, дата и спрос в ШТ.
+    """
+    rows = forecasts.order_by(
+        "store_id", "sku_id", "forecast_date", "forecast__date"
+    ).values_list(
+        "store_id",
+        "sku_id",
+        "forecast_date",
+        "horizon_start",
+        "horizon_units",
+        "forecast__date",
+        "forecast__units",
+    )
+    for store, sku, forecast_date, start, horizon, day, units in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        if horizon is not None:
+            for offset, value in enumerate(horizon):
+                yield store, sku, forecast_date, start + timedelta(days=offset), value
+        elif day is not None:
+            yield store, sku, forecast_date, day, units
+
+
+class CSVRowsReader(io.TextIOBase):
+    """
+    Файлоподобный объект, отдающий строки прогнозов в формате CSV для COPY.
+
+    Ошибка чтения исходных строк не пробрасывается внутрь COPY (драйвер
+    заменил бы ее своей), а сохраняется в error и завершает поток.
+    """
+
+    def __init__(self, rows):
+        """Создает поток из итератора строк прогнозов."""
+        self.rows = iter(rows)
+        self.buffer = ""
+        self.error = None
+
+    def readable(self):
+        """Сообщает, что поток доступен для чтения."""
+        return True
+
+    def read(self, size=-1):
+        """Возвращает очередную порцию CSV размером не менее size символов."""
+        while size < 0 or len(self.buffer) < size:
+            try:
+                chunk = list(islice(self.rows, 1000))
+            except (ForecastLoadError, csv.Error) as error:
+                self.error = error
+                chunk = []
+            if not chunk:
+                break
+            output = io.StringIO()
+            csv.writer(output).writerows(chunk)
+            self.buffer += output.getvalue()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def stage_rows(connection, cursor, rows):
+    """
+    Загружает строки во временную таблицу.
+
+    В PostgreSQL используется COPY, в остальных СУБД - executemany порциями.
+
+    Returns:
+        int: Число загруженных строк.
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {STAGE_TABLE}")
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE {STAGE_TABLE} ("
+        "store varchar(32), sku varchar(32), forecast_date date, "
+        "date date, units integer)"
+    )
+    columns = ", ".join(FORECAST_COLUMNS)
+    if connection.vendor == "postgresql":
+        reader = CSVRowsReader(rows)
+        with connection.wrap_database_errors:
+            cursor.copy_expert(
+                f"COPY {STAGE_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)",
+                reader,
+            )
+        if reader.error is not None:
+            raise reader.error
+        cursor.execute(f"SELECT COUNT(*) FROM {STAGE_TABLE}")
+        return cursor.fetchone()[0]
+
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = [
+            (store, sku, parse_date(forecast_date), parse_date(day), int(units))
+            for store, sku, forecast_date, day, units in islice(
+                rows, STAGE_CHUNK_SIZE
+            )
+        ]
+        if not chunk:
+            return total
+        cursor.executemany(
+            f"INSERT INTO {STAGE_TABLE} ({columns}) VALUES (%s, %s, %s, %s, %s)",
+            chunk,
+        )
+        total += len(chunk)
+
+
+def parse_date(value):
+    """Преобразует дату в формате ISO, поднимая ValueError при ошибке."""
+    return date.fromisoformat(str(value)).isoformat()
+
+
+def check_references(cursor):
+    """Проверяет, что все магазины и SKU из загрузки существуют."""
+    for model, column, label in (
+        (Store, "store", "магазины"),
+        (Category, "sku", "SKU"),
+    ):
+        cursor.execute(
+            f"SELECT DISTINCT s.{column} FROM {STAGE_TABLE} s "
+            f"LEFT JOIN {model._meta.db_table} r "
+            f"ON r.{model._meta.pk.column} = s.{column} "
+            f"WHERE r.{model._meta.pk.column} IS NULL"
+        )
+        unknown = sorted(str(value) for (value,) in cursor.fetchall())
+        if unknown:
+            raise ForecastLoadError(
+                f"Не найдены {label}: {', '.join(unknown[:10])}."
+            )
+
+
+def fetch_rows(cursor, chunk_size):
+    """Возвращает строки результата запроса, читая их порциями."""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def pack_stage(cursor, join):
+    """
+    Записывает загруженные прогнозы дней в компактное поле прогнозов.
+
+    Прогнозы дней читаются порциями по STAGE_CHUNK_SIZE (в PostgreSQL -
+    серверным курсором) и группируются по прогнозам по мере чтения,
+    упакованные прогнозы записываются такими же порциями. Поэтому память
+    не зависит от объема загрузки. Прогнозы, дни которых идут
+    с пропусками, не упаковываются и остаются для хранения строками
+    DayForecast.
+    """
+    using = cursor.db.alias
+    forecasts = []
+    with connections[using].chunked_cursor() as rows_cursor:
+        rows_cursor.execute(
+            f"SELECT f.id, s.date, s.units FROM {STAGE_TABLE} s {join} "
+            "ORDER BY f.id, s.date"
+        )
+        for forecast_id, days in groupby(
+            fetch_rows(rows_cursor, STAGE_CHUNK_SIZE), key=itemgetter(0)
+        ):
+            forecast = Forecast(id=forecast_id)
+            if forecast.pack_days(
+                [
+                    {"date": date.fromisoformat(str(day)), "units": units}
+                    for _, day, units in days
+                ]
+            ):
+                forecasts.append(forecast)
+            if len(forecasts) >= STAGE_CHUNK_SIZE:
+                Forecast.objects.using(using).bulk_update(
+                    forecasts, ("horizon_start", "horizon_units")
+                )
+                forecasts = []
+    Forecast.objects.using(using).bulk_update(
+        forecasts, ("horizon_start", "horizon_units")
+    )
+
+
+def merge_stage(cursor):
+    """
+    Переносит прогнозы из временной таблицы запросами над всем набором строк.
+
+    Прогнозы создаются, если их еще нет, а их прогнозы дней полностью
+    заменяются загруженными, поэтому повторная загрузка файла безопасна.
+    При компактном хранении дни, идущие подряд, упаковываются в прогноз.
+
+    Returns:
+        int: Число прогнозов в загрузке.
+    """
+    forecast_table = Forecast._meta.db_table
+    day_table = DayForecast._meta.db_table
+    join = (
+        f"JOIN {forecast_table} f ON f.store_id = s.store "
+        "AND f.sku_id = s.sku AND f.forecast_date = s.forecast_date"
+    )
+    cursor.execute(
+        f"INSERT INTO {forecast_table} (store_id, sku_id, forecast_date) "
+        f"SELECT DISTINCT store, sku, forecast_date FROM {STAGE_TABLE} "
+        "WHERE true "
+        "ON CONFLICT (store_id, sku_id, forecast_date) DO NOTHING"
+    )
+    cursor.execute(
+        f"SELECT COUNT(*) FROM (SELECT DISTINCT store, sku, forecast_date "
+        f"FROM {STAGE_TABLE}) keys"
+    )
+    forecasts = cursor.fetchone()[0]
+    staged_ids = (
+        f"SELECT f.id FROM (SELECT DISTINCT store, sku, forecast_date "
+        f"FROM {STAGE_TABLE}) s {join}"
+    )
+    cursor.execute(
+        f"UPDATE {forecast_table} SET horizon_start = NULL, "
+        f"horizon_units = NULL WHERE id IN ({staged_ids})"
+    )
+    cursor.execute(
+        f"DELETE FROM {day_table} "
+        f"WHERE forecast_sku_of_store_id IN ({staged_ids})"
+    )
+    if Forecast.is_compact_storage():
+        pack_stage(cursor, join)
+    cursor.execute(
+        f"INSERT INTO {day_table} (forecast_sku_of_store_id, date, units) "
+        f"SELECT f.id, s.date, s.units FROM {STAGE_TABLE} s {join} "
+        "WHERE f.horizon_units IS NULL"
+    )
+    return forecasts
+
+
+def load_forecasts(stream, file_format="csv", using=DEFAULT_DB_ALIAS):
+    """
+    Загружает прогнозы из CSV или NDJSON одной транзакцией.
+
+    Строки сначала загружаются во временную таблицу (COPY в PostgreSQL,
+    executemany порциями в остальных СУБД), а затем переносятся в Forecast
+    и DayForecast несколькими запросами над всем набором сразу.
+
+    Args:
+        stream: Текстовый поток с данными.
+        file_format (str): Формат данных: csv или ndjson.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        dict: Число загруженных прогнозов и прогнозов дней.
+    """
+    connection = connections[using]
+    rows = read_forecast_rows(stream, file_format)
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            days = stage_rows(connection, cursor, rows)
+            check_references(cursor)
+            forecasts = merge_stage(cursor)
+            cursor.execute(f"DROP TABLE {STAGE_TABLE}")
+    except (csv.Error, DataError, IntegrityError, TypeError, ValueError) as error:
+        raise ForecastLoadError(str(error)) from error
+    return {"forecasts": forecasts, "days": days}
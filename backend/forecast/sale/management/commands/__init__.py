@@ -0,0 +1 @@
+"""Команды управления приложения sale."""
@@ -0,0 +1,54 @@
+"""Команда переноса старых продаж в архив."""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sale.archive import archive_sales, get_archive_cutoff
+
+
+class Command(BaseCommand):
+    """
+    Команда переноса старых продаж в архив.
+
+    Продажи месяцев до даты отсечения сжимаются в архив по магазинам
+    и месяцам (SaleArchive) и удаляются из таблицы продаж. API продаж
+    продолжает отдавать их из архива. Команду можно запускать
+    по расписанию: повторный запуск дописывает в архив продажи,
+    загруженные после предыдущего.
+    """
+
+    help = "Переносит продажи старых месяцев в архив."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument(
+            "--before",
+            help=(
+                "Месяц ГГГГ-ММ: архивируются продажи до него. По умолчанию "
+                "в таблице остаются SALE_HOT_MONTHS последних месяцев."
+            ),
+        )
+        parser.add_argument(
+            "--store",
+            action="append",
+            dest="stores",
+            help="ID магазина (можно указать несколько раз).",
+        )
+
+    def handle(self, *args, **options):
+        """Переносит продажи месяцев до даты отсечения в архив."""
+        if options["before"]:
+            try:
+                before = date.fromisoformat(f"{options['before']}-01")
+            except ValueError:
+                raise CommandError("Неверный месяц, ожидается ГГГГ-ММ.")
+        else:
+            before = get_archive_cutoff()
+        result = archive_sales(before, options["stores"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Архивировано месяцев магазинов: {result['months']}, "
+                f"продаж: {result['sales']} (до {before})."
+            )
+        )
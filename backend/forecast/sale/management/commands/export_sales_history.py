@@ -0,0 +1,84 @@
+"""Команда выгрузки истории продаж в CSV."""
+
+import csv
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sale.archive import iter_sales_history
+from sale.constants import SALE_TOTAL_FIELDS
+from sale.importers import SALE_IMPORT_COLUMNS
+
+
+def parse_date(value):
+    """Разбирает дату в формате ГГГГ-ММ-ДД."""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Неверная дата {value}, ожидается ГГГГ-ММ-ДД.")
+
+
+class Command(BaseCommand):
+    """
+    Выгрузка истории продаж из архива в CSV.
+
+    Колонки совпадают с файлом импорта продаж, поэтому выгрузку можно
+    передать для обучения моделей или загрузить обратно (import_sales).
+    Архив читается по месяцам магазинов, без возврата в таблицу продаж.
+    """
+
+    help = "Выгружает продажи из архива в CSV (путь к файлу или - для stdout)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument("path", help="Путь к файлу или - для stdout.")
+        parser.add_argument(
+            "--store",
+            action="append",
+            dest="stores",
+            help="ID магазина (можно указать несколько раз).",
+        )
+        parser.add_argument("--since", help="Первый день периода ГГГГ-ММ-ДД.")
+        parser.add_argument("--until", help="Последний день периода ГГГГ-ММ-ДД.")
+        parser.add_argument(
+            "--with-hot",
+            action="store_true",
+            help="Добавить продажи из таблицы продаж (полная история).",
+        )
+
+    def handle(self, *args, **options):
+        """Выгружает продажи из архива в CSV."""
+        rows = iter_sales_history(
+            options["stores"],
+            parse_date(options["since"]),
+            parse_date(options["until"]),
+            options["with_hot"],
+        )
+        if options["path"] == "-":
+            total = self.write(rows, sys.stdout)
+        else:
+            with open(options["path"], "w", encoding="utf-8", newline="") as file:
+                total = self.write(rows, file)
+        self.stderr.write(f"Выгружено продаж: {total}.")
+
+    @staticmethod
+    def write(rows, file):
+        """Записывает продажи в CSV с колонками файла импорта."""
+        writer = csv.writer(file)
+        writer.writerow(SALE_IMPORT_COLUMNS)
+        total = 0
+        for store, row in rows:
+            writer.writerow(
+                [
+                    store,
+                    row["sku_id"],
+                    row["date"].isoformat(),
+                    int(row["sales_type"]),
+                    *(row[field] for field in SALE_TOTAL_FIELDS),
+                ]
+            )
+            total += 1
+        return total
@@ -0,0 +1,80 @@
+"""Команда быстрого импорта продаж."""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sale.importers import (SALE_IMPORT_CHUNK_SIZE, SaleImportError,
+                            import_sales, import_sales_parallel)
+
+
+class Command(BaseCommand):
+    """
+    Быстрый импорт продаж из CSV.
+
+    Файл содержит те же колонки, что и при импорте через админку
+    (st_id, pr_sku_id, date, pr_sales_type_id, pr_sales_in_units, ...).
+    Существующие продажи с тем же магазином, SKU и датой перезаписываются.
+    С --parallel или --workers файл разбивается на разделы по магазинам,
+    которые импортируются параллельно в пуле процессов.
+    """
+
+    help = "Импортирует продажи из CSV (путь к файлу или - для stdin)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument("path", help="Путь к файлу или - для stdin.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=SALE_IMPORT_CHUNK_SIZE,
+            help="Число продаж в одном запросе.",
+        )
+        parser.add_argument(
+            "--parallel",
+            action="store_true",
+            help="Параллельный импорт разделов по магазинам.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help=(
+                "Число процессов параллельного импорта (включает --parallel). "
+                "По умолчанию SALE_IMPORT_PROCESSES."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """Импортирует продажи из файла и выводит итоги."""
+        path = options["path"]
+        parallel = options["parallel"] or options["workers"] is not None
+        try:
+            if path == "-":
+                result = self.import_stream(sys.stdin, parallel, options)
+            else:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    result = self.import_stream(stream, parallel, options)
+        except (SaleImportError, OSError) as error:
+            raise CommandError(error)
+
+        for partition in result.get("partitions", ()):
+            self.stdout.write(
+                f"Магазины {', '.join(partition['stores'])}: "
+                f"строк {partition['rows']}, "
+                f"{partition['seconds']:.2f} с."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Прочитано строк: {result['rows']}, "
+                f"записано продаж: {result['sales']}."
+            )
+        )
+
+    @staticmethod
+    def import_stream(stream, parallel, options):
+        """Импортирует поток одним процессом или параллельно."""
+        if parallel:
+            return import_sales_parallel(
+                stream, options["workers"], options["chunk_size"]
+            )
+        return import_sales(stream, options["chunk_size"])
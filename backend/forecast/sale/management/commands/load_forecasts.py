@@ -0,0 +1,51 @@
+"""Команда загрузки прогнозов."""
+
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sale.loaders import FORECAST_FORMATS, ForecastLoadError, load_forecasts
+
+
+class Command(BaseCommand):
+    """
+    Загрузка прогнозов из CSV или NDJSON.
+
+    Файл содержит колонки store, sku, forecast_date, date, units - в том же
+    виде, в котором прогнозы выгружаются из админки. Существующие прогнозы
+    с тем же магазином, SKU и датой расчета перезаписываются.
+    """
+
+    help = "Загружает прогнозы из CSV или NDJSON (путь к файлу или - для stdin)."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument("path", help="Путь к файлу или - для stdin.")
+        parser.add_argument(
+            "--format",
+            choices=FORECAST_FORMATS,
+            help="Формат файла. По умолчанию определяется по расширению.",
+        )
+
+    def handle(self, *args, **options):
+        """Загружает прогнозы из файла."""
+        path = options["path"]
+        file_format = options["format"] or (
+            "ndjson" if Path(path).suffix in (".ndjson", ".jsonl") else "csv"
+        )
+        try:
+            if path == "-":
+                result = load_forecasts(sys.stdin, file_format)
+            else:
+                with open(path, encoding="utf-8", newline="") as stream:
+                    result = load_forecasts(stream, file_format)
+        except (ForecastLoadError, OSError) as error:
+            raise CommandError(error)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено прогнозов: {result['forecasts']}, "
+                f"прогнозов дней: {result['days']}."
+            )
+        )
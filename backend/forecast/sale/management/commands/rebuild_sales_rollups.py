@@ -0,0 +1,23 @@
+"""Команда перестроения агрегатов продаж."""
+
+from django.core.management.base import BaseCommand
+
+from sale.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    """
+    Полное перестроение агрегатов продаж.
+
+    Нужно один раз для заполнения агрегатов по уже загруженной истории;
+    дальше они обновляются инкрементально при каждом импорте продаж.
+    """
+
+    help = "Перестраивает агрегаты продаж по всей истории."
+
+    def handle(self, *args, **options):
+        """Перестраивает агрегаты продаж по всей истории."""
+        total = rebuild_sales_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(f"Записано строк агрегатов: {total}.")
+        )
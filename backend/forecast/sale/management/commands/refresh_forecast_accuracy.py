@@ -0,0 +1,33 @@
+"""Команда пересчета точности прогнозов."""
+
+from django.core.management.base import BaseCommand
+
+from sale.accuracy import refresh_forecast_accuracy
+
+
+class Command(BaseCommand):
+    """
+    Команда полного пересчета точности прогнозов.
+
+    После импорта продаж точность пересчитывается автоматически для
+    затронутых магазинов; команда нужна после загрузки новых прогнозов
+    или для первоначального заполнения.
+    """
+
+    help = "Пересчитывает точность прогнозов по продажам."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument(
+            "--store",
+            action="append",
+            dest="stores",
+            help="ID магазина для пересчета (можно указать несколько раз).",
+        )
+
+    def handle(self, *args, **options):
+        """Пересчитывает точность прогнозов выбранных магазинов."""
+        total = refresh_forecast_accuracy(options["stores"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Записано строк точности: {total}.")
+        )
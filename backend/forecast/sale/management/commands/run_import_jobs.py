@@ -0,0 +1,57 @@
+"""Команда выполнения задач импорта."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from sale.jobs import reclaim_stale_jobs, run_import_job
+from sale.models import ImportJob
+
+
+class Command(BaseCommand):
+    """
+    Обработчик задач фонового импорта без веб-процесса.
+
+    Выполняет задачи из очереди по одной. Нужен, если задачи остались
+    в очереди после перезапуска веб-процессов, или для обработки импорта
+    отдельным процессом. Перед проверкой очереди прерванные задачи
+    возвращаются в нее (см. sale.jobs.reclaim_stale_jobs).
+    """
+
+    help = "Выполняет задачи импорта из очереди."
+
+    def add_arguments(self, parser):
+        """Добавляет аргументы команды."""
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Не завершаться, а ждать новые задачи.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Интервал проверки очереди в секундах для --watch.",
+        )
+
+    def handle(self, *args, **options):
+        """Выполняет задачи импорта из очереди."""
+        while True:
+            reclaimed = reclaim_stale_jobs()
+            if reclaimed:
+                self.stdout.write(f"Возвращено в очередь задач: {reclaimed}.")
+            job_ids = list(
+                ImportJob.objects.filter(status=ImportJob.STATUS_PENDING)
+                .order_by("created_at")
+                .values_list("pk", flat=True)
+            )
+            for job_id in job_ids:
+                job = run_import_job(job_id)
+                if job is not None:
+                    self.stdout.write(
+                        f"Задача {job.pk}: {job.get_status_display()}, "
+                        f"строк {job.rows_done}, с ошибками {job.rows_failed}."
+                    )
+            if not options["watch"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,92 @@
+"""Команда управления секциями таблицы продаж."""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from sale.partitions import (attach_partition, detach_partitions,
+                             ensure_future_partitions, get_partition_month,
+                             get_partitions, is_partitioned)
+
+
+def parse_month(value):
+    """Разбирает месяц в формате ГГГГ-ММ."""
+    try:
+        return date.fromisoformat(f"{value}-01")
+    except ValueError:
+        raise CommandError(f"Неверный месяц {value}, ожидается ГГГГ-ММ.")
+
+
+class Command(BaseCommand):
+    """
+    Команда обслуживания секций таблицы продаж (только PostgreSQL).
+
+    Секции новых месяцев создаются при импорте продаж автоматически;
+    create нужна для создания секций заранее (например, по расписанию),
+    detach и attach - для отсоединения старых месяцев от таблицы продаж
+    и их возврата.
+    """
+
+    help = "Создает, отсоединяет и присоединяет секции таблицы продаж."
+
+    def add_arguments(self, parser):
+        """Добавляет подкоманды и их аргументы."""
+        subparsers = parser.add_subparsers(dest="action", required=True)
+        subparsers.add_parser("list", help="Список секций.")
+        create = subparsers.add_parser(
+            "create", help="Создать секции текущего и следующих месяцев."
+        )
+        create.add_argument(
+            "--ahead",
+            type=int,
+            help="Число следующих месяцев (по умолчанию SALE_PARTITIONS_AHEAD).",
+        )
+        detach = subparsers.add_parser(
+            "detach", help="Отсоединить секции месяцев до указанного."
+        )
+        detach.add_argument(
+            "--before", required=True, help="Месяц ГГГГ-ММ (не включается)."
+        )
+        attach = subparsers.add_parser(
+            "attach", help="Присоединить секции месяцев или таблицы секций."
+        )
+        attach.add_argument(
+            "months", nargs="+", help="Месяцы ГГГГ-ММ или имена таблиц секций."
+        )
+
+    def handle(self, *args, **options):
+        """Выполняет выбранную подкоманду."""
+        if not is_partitioned():
+            raise CommandError("Таблица продаж не секционирована.")
+        action = options["action"]
+        if action == "list":
+            for name, start, end, rows in get_partitions():
+                self.stdout.write(f"{name}: {start} - {end}, строк ~{rows}")
+            return
+        if action == "create":
+            names = ensure_future_partitions(options["ahead"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Создано секций: {len(names)}.")
+            )
+        elif action == "detach":
+            names = detach_partitions(parse_month(options["before"]))
+            self.stdout.write(
+                self.style.SUCCESS(f"Отсоединено секций: {len(names)}.")
+            )
+        else:
+            names = []
+            for value in options["months"]:
+                try:
+                    month = get_partition_month(value)
+                except ValueError:
+                    month = parse_month(value)
+                try:
+                    names.append(attach_partition(month))
+                except DatabaseError as error:
+                    raise CommandError(f"{value}: {error}")
+            self.stdout.write(
+                self.style.SUCCESS(f"Присоединено секций: {len(names)}.")
+            )
+        for name in names:
+            self.stdout.write(name)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='sale',
+            name='unique_store_sku_date_in_sale',
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('store', 'sku', 'date'), include=('sales_type', 'sales_units', 'sales_units_promo', 'sales_rub', 'sales_run_promo'), name='unique_store_sku_date_in_sale'),
+        ),
+    ]
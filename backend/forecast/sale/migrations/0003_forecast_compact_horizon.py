@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:00
+
+from django.db import migrations, models
+import sale.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0002_sale_covering_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecast',
+            name='horizon_start',
+            field=models.DateField(blank=True, null=True, verbose_name='Первая дата компактного прогноза'),
+        ),
+        migrations.AddField(
+            model_name='forecast',
+            name='horizon_units',
+            field=sale.fields.PackedIntegerArrayField(blank=True, null=True, verbose_name='Спрос в ШТ по дням компактного прогноза'),
+        ),
+    ]
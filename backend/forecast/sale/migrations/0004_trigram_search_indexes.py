@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Индексы повторяют выражение, в которое Django компилирует icontains
+# (UPPER(col::text) LIKE UPPER(...)), поэтому используются и фильтрами
+# CategoryFilter, и поиском. Числовые поля поиска магазинов не индексируются:
+# у них всего несколько различных значений.
+TRIGRAM_INDEXES = (
+    ("sale_category", "sku"),
+    ("sale_category", "group"),
+    ("sale_category", "category"),
+    ("sale_category", "subcategory"),
+    ("sale_store", "city"),
+    ("sale_store", "division"),
+)
+
+
+def get_index_name(table, column):
+    """Возвращает имя триграммного индекса колонки."""
+    return f"{table}_{column}_trgm"
+
+
+def has_trigram(schema_editor):
+    """Проверяет, что СУБД - PostgreSQL с доступным расширением pg_trgm."""
+    if schema_editor.connection.vendor != "postgresql":
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS(SELECT 1 FROM pg_available_extensions "
+            "WHERE name = 'pg_trgm')"
+        )
+        return cursor.fetchone()[0]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Создает триграммные индексы справочников."""
+    if not has_trigram(schema_editor):
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {get_index_name(table, column)} "
+            f'ON {table} USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    """Удаляет триграммные индексы справочников."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS {get_index_name(table, column)}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0003_forecast_compact_horizon'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
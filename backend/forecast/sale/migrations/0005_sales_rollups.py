@@ -0,0 +1,76 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0004_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('sales_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров без признака промо')),
+                ('sales_units_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров с признаком промо')),
+                ('sales_rub', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи без признака промо в РУБ')),
+                ('sales_run_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи с признаком промо в РУБ')),
+                ('city', models.CharField(max_length=32, verbose_name='Город')),
+            ],
+            options={
+                'verbose_name': 'Продажи города за день',
+                'verbose_name_plural': 'Продажи городов за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='DivisionCategoryDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('sales_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров без признака промо')),
+                ('sales_units_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров с признаком промо')),
+                ('sales_rub', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи без признака промо в РУБ')),
+                ('sales_run_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи с признаком промо в РУБ')),
+                ('division', models.CharField(max_length=32, verbose_name='Дивизион')),
+                ('category', models.CharField(max_length=32, verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Продажи дивизиона по категории за день',
+                'verbose_name_plural': 'Продажи дивизионов по категориям за день',
+            },
+        ),
+        migrations.CreateModel(
+            name='StoreGroupDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('sales_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров без признака промо')),
+                ('sales_units_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Число проданных товаров с признаком промо')),
+                ('sales_rub', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи без признака промо в РУБ')),
+                ('sales_run_promo', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продажи с признаком промо в РУБ')),
+                ('group', models.CharField(max_length=32, verbose_name='Группа')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sale.store', verbose_name='Название магазина')),
+            ],
+            options={
+                'verbose_name': 'Продажи магазина по группе за день',
+                'verbose_name_plural': 'Продажи магазинов по группам за день',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='divisioncategorydailysales',
+            constraint=models.UniqueConstraint(fields=('division', 'category', 'date'), name='unique_division_category_date_in_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='citydailysales',
+            constraint=models.UniqueConstraint(fields=('city', 'date'), name='unique_city_date_in_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='storegroupdailysales',
+            constraint=models.UniqueConstraint(fields=('store', 'group', 'date'), name='unique_store_group_date_in_rollup'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0005_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastAccuracy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horizon', models.SmallIntegerField(verbose_name='Горизонт прогноза в днях')),
+                ('days', models.PositiveIntegerField(verbose_name='Число дней с фактом продаж')),
+                ('forecast_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Прогноз в ШТ')),
+                ('fact_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Продано в ШТ')),
+                ('error_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Сумма ошибок (прогноз - факт) в ШТ')),
+                ('abs_error_units', models.DecimalField(decimal_places=1, max_digits=15, verbose_name='Сумма абсолютных ошибок в ШТ')),
+                ('sku', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sale.category', verbose_name='Единица складского учета')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sale.store', verbose_name='Название магазина')),
+            ],
+            options={
+                'verbose_name': 'Точность прогноза',
+                'verbose_name_plural': 'Точность прогнозов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='forecastaccuracy',
+            constraint=models.UniqueConstraint(fields=('store', 'sku', 'horizon'), name='unique_store_sku_horizon_in_accuracy'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import sale.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('sale', '0006_forecast_accuracy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(storage=sale.models.ImportStorage(), upload_to='sales/%Y/%m/%d/', verbose_name='Файл CSV')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершена'), ('failed', 'Ошибка')], default='pending', max_length=32, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('bytes_total', models.PositiveBigIntegerField(default=0, verbose_name='Размер файла')),
+                ('bytes_done', models.PositiveBigIntegerField(default=0, verbose_name='Обработано байт')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Импортировано строк')),
+                ('rows_failed', models.PositiveIntegerField(default=0, verbose_name='Строк с ошибками')),
+                ('errors', models.TextField(blank=True, verbose_name='Ошибки')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Задача импорта',
+                'verbose_name_plural': 'Задачи импорта',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0007_import_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dayforecast',
+            index=models.Index(fields=['date'], name='dayforecast_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date'], name='sale_date_idx'),
+        ),
+    ]
@@ -0,0 +1,156 @@
+from datetime import date
+
+from django.db import migrations
+
+# Таблица продаж в PostgreSQL секционируется по месяцам поля date
+# (PARTITION BY RANGE). Первичный ключ секционированной таблицы должен
+# включать ключ секционирования, поэтому он становится (id, date); id
+# по-прежнему уникален, так как выдается одной последовательностью.
+# В других СУБД таблица не меняется.
+SALE_TABLE = "sale_sale"
+# Число месяцев после текущего, секции которых создаются миграцией.
+# Не зависит от настроек, чтобы миграция давала одинаковую схему;
+# остальные секции создает команда sale_partitions.
+INITIAL_PARTITIONS_AHEAD = 3
+
+
+def month_start(day):
+    """Возвращает первый день месяца даты."""
+    return day.replace(day=1)
+
+
+def next_month(month):
+    """Возвращает первый день следующего месяца."""
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def get_table_definition(cursor):
+    """Возвращает ограничения и индексы таблицы продаж."""
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass ORDER BY contype, conname",
+        [SALE_TABLE],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s "
+        "ORDER BY indexname",
+        [SALE_TABLE],
+    )
+    names = {name for name, _, _ in constraints}
+    indexes = [
+        definition for name, definition in cursor.fetchall() if name not in names
+    ]
+    return constraints, indexes
+
+
+def get_dependent_foreign_keys(cursor):
+    """Возвращает внешние ключи других таблиц, ссылающиеся на продажи."""
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) "
+        "FROM pg_constraint WHERE contype = 'f' AND confrelid = %s::regclass "
+        "AND conrelid <> confrelid ORDER BY 1, 2",
+        [SALE_TABLE],
+    )
+    return cursor.fetchall()
+
+
+def rebuild_sale_table(schema_editor, partitioned):
+    """
+    Пересоздает таблицу продаж секционированной или обычной.
+
+    Данные копируются в новую таблицу, после чего ограничения и индексы
+    создаются заново с прежними именами, а последовательность id
+    продолжается с максимального значения. Внешние ключи других таблиц,
+    ссылающиеся на продажи, удаляются до удаления старой таблицы
+    и создаются заново для новой, поэтому старая таблица удаляется
+    без CASCADE: если от нее зависит что-то еще, миграция прервется.
+    """
+    old_table = f"{SALE_TABLE}_old"
+    with schema_editor.connection.cursor() as cursor:
+        constraints, indexes = get_table_definition(cursor)
+        dependents = get_dependent_foreign_keys(cursor)
+        cursor.execute(f"SELECT MIN(date), MAX(date) FROM {SALE_TABLE}")
+        first, last = cursor.fetchone()
+
+    schema_editor.execute(f"ALTER TABLE {SALE_TABLE} RENAME TO {old_table}")
+    schema_editor.execute(
+        f"CREATE TABLE {SALE_TABLE} "
+        f"(LIKE {old_table} INCLUDING DEFAULTS INCLUDING IDENTITY)"
+        + (" PARTITION BY RANGE (date)" if partitioned else "")
+    )
+    if partitioned:
+        schema_editor.execute(
+            f"CREATE TABLE {SALE_TABLE}_default PARTITION OF {SALE_TABLE} DEFAULT"
+        )
+        today = month_start(date.today())
+        month = min(first or today, today).replace(day=1)
+        last = max(last or today, today)
+        for _ in range(INITIAL_PARTITIONS_AHEAD):
+            last = next_month(last)
+        while month <= last:
+            schema_editor.execute(
+                f"CREATE TABLE {SALE_TABLE}_y{month:%Y}m{month:%m} "
+                f"PARTITION OF {SALE_TABLE} FOR VALUES "
+                f"FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            )
+            month = next_month(month)
+    schema_editor.execute(f"INSERT INTO {SALE_TABLE} SELECT * FROM {old_table}")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{SALE_TABLE}', 'id'), "
+        f"COALESCE(MAX(id), 0) + 1, false) FROM {SALE_TABLE}"
+    )
+    for table, name, _ in dependents:
+        schema_editor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+    schema_editor.execute(f"DROP TABLE {old_table}")
+    # Последовательность новой таблицы получает имя с суффиксом, так как
+    # прежняя существовала до удаления старой таблицы.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, 'id')", [SALE_TABLE]
+        )
+        sequence = cursor.fetchone()[0]
+    if sequence.split(".")[-1] != f"{SALE_TABLE}_id_seq":
+        schema_editor.execute(
+            f"ALTER SEQUENCE {sequence} RENAME TO {SALE_TABLE}_id_seq"
+        )
+
+    primary_key = "PRIMARY KEY (id, date)" if partitioned else "PRIMARY KEY (id)"
+    for name, kind, definition in constraints:
+        schema_editor.execute(
+            f"ALTER TABLE {SALE_TABLE} ADD CONSTRAINT {name} "
+            f"{primary_key if kind == 'p' else definition}"
+        )
+    for definition in indexes:
+        schema_editor.execute(definition)
+    for table, name, definition in dependents:
+        schema_editor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"
+        )
+
+
+def partition_sale_table(apps, schema_editor):
+    """Секционирует таблицу продаж по месяцам."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    rebuild_sale_table(schema_editor, partitioned=True)
+
+
+def unpartition_sale_table(apps, schema_editor):
+    """Возвращает таблицу продаж без секций."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    rebuild_sale_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0008_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_sale_table, unpartition_sale_table),
+    ]
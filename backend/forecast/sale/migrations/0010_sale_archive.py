@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 09:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0009_sale_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц')),
+                ('rows', models.PositiveIntegerField(verbose_name='Число продаж')),
+                ('data', models.BinaryField(verbose_name='Продажи (сжатые колонки)')),
+                ('archived_at', models.DateTimeField(auto_now=True, verbose_name='Архивирован')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sale.store', verbose_name='Название магазина')),
+            ],
+            options={
+                'verbose_name': 'Архив продаж',
+                'verbose_name_plural': 'Архивы продаж',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='salearchive',
+            constraint=models.UniqueConstraint(fields=('store', 'month'), name='unique_store_month_in_sale_archive'),
+        ),
+    ]
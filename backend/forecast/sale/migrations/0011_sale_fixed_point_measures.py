@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations
+
+import sale.fields
+
+# Показатели продаж переводятся из numeric(15, 1) в bigint со значением,
+# умноженным на 10 (FixedPointDecimalField). В PostgreSQL все колонки
+# меняются одной командой ALTER TABLE, то есть таблица (и ее секции)
+# перезаписывается один раз. Отсоединенные секции продаж не меняются:
+# перед присоединением их колонки нужно привести к тем же типам.
+# В остальных СУБД колонки меняются по очереди операциями AlterField.
+SALE_TABLE = "sale_sale"
+MEASURES = ("sales_rub", "sales_run_promo", "sales_units", "sales_units_promo")
+SCALE = 10
+
+
+class AlterSaleMeasures(migrations.SeparateDatabaseAndState):
+    """Меняет хранение показателей продаж с пересчетом значений."""
+
+    def __init__(self, operations):
+        """Создает операцию из операций AlterField показателей."""
+        super().__init__(
+            database_operations=operations, state_operations=operations
+        )
+
+    def alter_table(self, schema_editor, column_type, expression):
+        """Меняет тип всех показателей одной командой ALTER TABLE."""
+        schema_editor.execute(
+            f"ALTER TABLE {SALE_TABLE} "
+            + ", ".join(
+                f"ALTER COLUMN {name} TYPE {column_type} "
+                f"USING {expression.format(name=name)}"
+                for name in MEASURES
+            )
+        )
+
+    def update_values(self, schema_editor, expression):
+        """Пересчитывает значения всех показателей."""
+        schema_editor.execute(
+            f"UPDATE {SALE_TABLE} SET "
+            + ", ".join(
+                f"{name} = {expression.format(name=name)}" for name in MEASURES
+            )
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        """Переводит показатели в целые числа."""
+        if schema_editor.connection.vendor == "postgresql":
+            self.alter_table(
+                schema_editor, "bigint", f"round({{name}} * {SCALE})::bigint"
+            )
+            return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+        self.update_values(
+            schema_editor, f"CAST(ROUND({{name}} * {SCALE}) AS INTEGER)"
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        """Возвращает показатели к типу numeric."""
+        if schema_editor.connection.vendor == "postgresql":
+            self.alter_table(
+                schema_editor, "numeric(15, 1)", f"{{name}} / {SCALE}.0"
+            )
+            return
+        super().database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
+        self.update_values(schema_editor, f"{{name}} / {SCALE}.0")
+
+    def describe(self):
+        """Возвращает описание операции."""
+        return "Store sale measures as fixed-point integers"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0010_sale_archive'),
+    ]
+
+    operations = [
+        AlterSaleMeasures([
+            migrations.AlterField(
+                model_name='sale',
+                name='sales_rub',
+                field=sale.fields.FixedPointDecimalField(decimal_places=1, max_digits=15, validators=[django.core.validators.MinValueValidator(Decimal('0.1'))], verbose_name='Продажи без признака промо в РУБ'),
+            ),
+            migrations.AlterField(
+                model_name='sale',
+                name='sales_run_promo',
+                field=sale.fields.FixedPointDecimalField(decimal_places=1, max_digits=15, validators=[django.core.validators.MinValueValidator(Decimal('0.1'))], verbose_name='Продажи с признаком промо в РУБ'),
+            ),
+            migrations.AlterField(
+                model_name='sale',
+                name='sales_units',
+                field=sale.fields.FixedPointDecimalField(decimal_places=1, max_digits=15, validators=[django.core.validators.MinValueValidator(Decimal('0.1'))], verbose_name='Число проданных товаров без признака промо'),
+            ),
+            migrations.AlterField(
+                model_name='sale',
+                name='sales_units_promo',
+                field=sale.fields.FixedPointDecimalField(decimal_places=1, max_digits=15, validators=[django.core.validators.MinValueValidator(Decimal('0.1'))], verbose_name='Число проданных товаров с признаком промо'),
+            ),
+        ]),
+    ]
@@ -0,0 +1,45 @@
+import json
+import lzma
+
+from django.db import migrations, models
+
+
+def set_sku_range(apps, schema_editor):
+    """Заполняет диапазон SKU существующих архивов (по одной части на месяц)."""
+    SaleArchive = apps.get_model("sale", "SaleArchive")
+    for archive in SaleArchive.objects.all().iterator(chunk_size=1):
+        skus = json.loads(lzma.decompress(bytes(archive.data)))["sku"]
+        if skus:
+            archive.first_sku, archive.last_sku = skus[0], skus[-1]
+            archive.save(update_fields=("first_sku", "last_sku"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0011_sale_fixed_point_measures'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='salearchive',
+            name='unique_store_month_in_sale_archive',
+        ),
+        migrations.AddField(
+            model_name='salearchive',
+            name='first_sku',
+            field=models.CharField(default='', max_length=32, verbose_name='Первый SKU'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='salearchive',
+            name='last_sku',
+            field=models.CharField(default='', max_length=32, verbose_name='Последний SKU'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_sku_range, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='salearchive',
+            constraint=models.UniqueConstraint(fields=('store', 'month', 'first_sku'), name='unique_store_month_sku_in_sale_archive'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0012_sale_archive_sku_parts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='uom',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Маркер, обозначающий продаётся товар на вес или в ШТ'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='Флаг активного магазина на данный момент'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='loc',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Тип локации'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='size',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Тип размера'),
+        ),
+        migrations.AlterField(
+            model_name='store',
+            name='type_format',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Формат'),
+        ),
+    ]
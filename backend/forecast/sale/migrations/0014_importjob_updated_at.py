@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0013_reference_field_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последнее обновление прогресса'),
+        ),
+    ]
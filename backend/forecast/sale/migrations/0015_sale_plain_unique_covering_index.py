@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0014_importjob_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='sale',
+            name='unique_store_sku_date_in_sale',
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['store', 'sku', 'date'], include=('sales_type', 'sales_units', 'sales_units_promo', 'sales_rub', 'sales_run_promo'), name='sale_store_sku_date_cover_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sale',
+            constraint=models.UniqueConstraint(fields=('store', 'sku', 'date'), name='unique_store_sku_date_in_sale'),
+        ),
+    ]
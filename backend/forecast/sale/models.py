@@ -1,11 +1,44 @@
+import os
+from collections import defaultdict
+from datetime import timedelta
 from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
 
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, TruncMonth, TruncWeek
+from django.utils import timezone
 
-from .constants import DECIMAL_PLACES, MAX_DIGITS, MAX_LENGTH_FOR_FIELDS
+from .constants import (DECIMAL_PLACES, FORECAST_STORAGE_COMPACT, MAX_DIGITS,
+                        MAX_LENGTH_FOR_FIELDS, RESAMPLE_MONTH, RESAMPLE_WEEK,
+                        SALE_TOTAL_FIELDS)
+from .fields import FixedPointDecimalField, PackedIntegerArrayField
 
 DECIMAL_VALIDATION = [MinValueValidator(Decimal("0.1"))]
+RESAMPLE_FUNCTIONS = {RESAMPLE_WEEK: TruncWeek, RESAMPLE_MONTH: TruncMonth}
+
+
+def get_period_start(day, freq):
+    """
+    Возвращает начало периода, в который попадает дата.
+
+    Совпадает с date_trunc в PostgreSQL: неделя начинается с понедельника,
+    месяц - с первого числа.
+
+    Args:
+        day (date): Дата.
+        freq (str): Период: W - неделя, M - месяц.
+
+    Returns:
+        date: Первый день периода.
+    """
+    if freq == RESAMPLE_WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
 
 
 class Category(models.Model):
@@ -52,6 +85,125 @@ class Store(models.Model):
         return self.store
 
 
+class SaleQuerySet(models.QuerySet):
+    """Набор запросов для модели Sale."""
+
+    def get_value_expressions(self, fields, as_float=False):
+        """
+        Возвращает поля продажи или выражения для чтения их значений.
+
+        Показатели продаж (FixedPointDecimalField) хранятся целыми числами,
+        и при чтении из каждого значения создается Decimal. С as_float
+        показатели делятся на множитель в базе данных и читаются как float:
+        деление выполняется с правильным округлением, поэтому значение
+        совпадает с float(Decimal), к которому DRF приводит Decimal в JSON.
+
+        Args:
+            fields (Iterable[str]): Поля продажи.
+            as_float (bool): Читать показатели продаж как float.
+
+        Returns:
+            list: Имена полей или выражения в порядке fields.
+        """
+        if not as_float:
+            return list(fields)
+        expressions = []
+        for field in fields:
+            model_field = self.model._meta.get_field(field)
+            if isinstance(model_field, FixedPointDecimalField):
+                field = Cast(field, FloatField()) / Value(float(model_field.scale))
+            expressions.append(field)
+        return expressions
+
+    def fact_by_sku(self, fields, chunk_size=2000, sku_chunk_size=50,
+                    as_float=False):
+        """
+        Группирует продажи по SKU на стороне базы данных.
+
+        В PostgreSQL для каждого SKU строится упорядоченный по дате массив
+        значений каждого поля (ARRAY_AGG ... ORDER BY date), и из базы
+        приходит по одной строке на SKU. В остальных СУБД продажи читаются
+        в порядке (sku, date) и группируются при чтении.
+
+        Args:
+            fields (Iterable[str]): Поля продажи, попадающие в результат.
+            chunk_size (int): Число продаж в порции при чтении курсором.
+            sku_chunk_size (int): Число SKU в порции при группировке в БД.
+            as_float (bool): Читать показатели продаж как float
+                (см. get_value_expressions).
+
+        Yields:
+            tuple: SKU и словарь {поле: список значений по датам}.
+        """
+        fields = tuple(fields)
+        values = self.get_value_expressions(fields, as_float)
+        if connections[self.db].vendor == "postgresql":
+            from django.contrib.postgres.aggregates import ArrayAgg
+
+            rows = (
+                self.order_by()
+                .values("sku")
+                .annotate(
+                    **{
+                        f"{field}_agg": ArrayAgg(value, ordering="date")
+                        for field, value in zip(fields, values)
+                    }
+                )
+                .order_by("sku")
+                .values_list("sku", *(f"{field}_agg" for field in fields))
+            )
+            for sku, *columns in rows.iterator(chunk_size=sku_chunk_size):
+                yield sku, dict(zip(fields, columns))
+            return
+
+        rows = (
+            self.order_by("sku_id", "date")
+            .values_list("sku", *values)
+            .iterator(chunk_size=chunk_size)
+        )
+        for sku, group in groupby(rows, key=itemgetter(0)):
+            columns = {field: [] for field in fields}
+            for row in group:
+                for field, value in zip(fields, row[1:]):
+                    columns[field].append(value)
+            yield sku, columns
+
+    def resample(self, freq):
+        """
+        Суммирует продажи по неделям или месяцам на стороне базы данных.
+
+        Период вычисляется через TruncWeek/TruncMonth (date_trunc
+        в PostgreSQL, эквивалентные функции Django в SQLite).
+
+        Args:
+            freq (str): Период: W - неделя, M - месяц.
+
+        Returns:
+            list: Словари с началом периода (date), суммами показателей,
+            числом дней с промо (promo_days) и числом дней (days).
+        """
+        rows = (
+            self.order_by()
+            .annotate(period=RESAMPLE_FUNCTIONS[freq]("date"))
+            .values("period")
+            .annotate(
+                **{f"{field}_sum": Sum(field) for field in SALE_TOTAL_FIELDS},
+                promo_days=Count("pk", filter=Q(sales_type=True)),
+                days=Count("pk"),
+            )
+            .order_by("period")
+        )
+        return [
+            {
+                "date": row["period"],
+                **{field: row[f"{field}_sum"] for field in SALE_TOTAL_FIELDS},
+                "promo_days": row["promo_days"],
+                "days": row["days"],
+            }
+            for row in rows
+        ]
+
+
 class Sale(models.Model):
     """Модель продаж."""
 
@@ -63,44 +215,79 @@ class Sale(models.Model):
     )
     date = models.DateField("Дата")
     sales_type = models.BooleanField("Флаг наличия промо")
-    sales_units = models.DecimalField(
+    sales_units = FixedPointDecimalField(
         "Число проданных товаров без признака промо",
         max_digits=MAX_DIGITS,
         decimal_places=DECIMAL_PLACES,
         validators=DECIMAL_VALIDATION,
     )
-    sales_units_promo = models.DecimalField(
+    sales_units_promo = FixedPointDecimalField(
         "Число проданных товаров с признаком промо",
         max_digits=MAX_DIGITS,
         decimal_places=DECIMAL_PLACES,
         validators=DECIMAL_VALIDATION,
     )
-    sales_rub = models.DecimalField(
+    sales_rub = FixedPointDecimalField(
         "Продажи без признака промо в РУБ",
         max_digits=MAX_DIGITS,
         decimal_places=DECIMAL_PLACES,
         validators=DECIMAL_VALIDATION,
     )
-    sales_run_promo = models.DecimalField(
+    sales_run_promo = FixedPointDecimalField(
         "Продажи с признаком промо в РУБ",
         max_digits=MAX_DIGITS,
         decimal_places=DECIMAL_PLACES,
         validators=DECIMAL_VALIDATION,
     )
 
+    objects = SaleQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Продажа"
         verbose_name_plural = "Продажи"
 
         constraints = [
             models.UniqueConstraint(
-                fields=("store", "sku", "date"), name="unique_store_sku_date_in_sale"
+                fields=("store", "sku", "date"),
+                name="unique_store_sku_date_in_sale",
             )
         ]
+        indexes = [
+            # Показатели продаж включены в индекс (INCLUDE), чтобы запросы
+            # графиков по магазину, SKU и периоду выполнялись только по индексу.
+            # SQLite не поддерживает INCLUDE, там индекс создается без него.
+            models.Index(
+                fields=("store", "sku", "date"),
+                name="sale_store_sku_date_cover_idx",
+                include=(
+                    "sales_type",
+                    "sales_units",
+                    "sales_units_promo",
+                    "sales_rub",
+                    "sales_run_promo",
+                ),
+            ),
+            # Индекс по дате используется навигацией по датам в админке.
+            models.Index(fields=("date",), name="sale_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.store} {self.sku}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Создает продажу из строки базы данных.
+
+        Запоминает загруженные магазин и дату (saved_key): при их изменении
+        агрегаты пересчитываются и для прежней пары (см. sale.signals).
+        """
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if "store_id" in loaded and "date" in loaded:
+            instance.saved_key = (loaded["store_id"], loaded["date"])
+        return instance
+
 
 class Forecast(models.Model):
     """Модель прогнозов продаж."""
@@ -112,6 +299,12 @@ class Forecast(models.Model):
         Category, on_delete=models.CASCADE, verbose_name="Единица складского учета"
     )
     forecast_date = models.DateField("Дата расчета прогноза")
+    horizon_start = models.DateField(
+        "Первая дата компактного прогноза", null=True, blank=True
+    )
+    horizon_units = PackedIntegerArrayField(
+        "Спрос в ШТ по дням компактного прогноза", null=True, blank=True
+    )
 
     class Meta:
         verbose_name = "Прогноз"
@@ -131,6 +324,89 @@ class Forecast(models.Model):
     def __str__(self):
         return f"{self.store_id} {self.sku_id} {self.forecast_date}"
 
+    @staticmethod
+    def is_compact_storage():
+        """Проверяет, хранятся ли новые прогнозы дней в компактном виде."""
+        return settings.FORECAST_STORAGE == FORECAST_STORAGE_COMPACT
+
+    def pack_days(self, days_forecast):
+        """
+        Записывает прогнозы дней в компактное поле, если дни идут подряд.
+
+        Args:
+            days_forecast (list): Словари с ключами date (date) и units.
+
+        Returns:
+            bool: True, если прогноз упакован, иначе дни нужно хранить
+            строками DayForecast.
+        """
+        days = sorted(days_forecast, key=itemgetter("date"))
+        contiguous = bool(days) and all(
+            (later["date"] - earlier["date"]).days == 1
+            for earlier, later in zip(days, days[1:])
+        )
+        if not contiguous:
+            self.horizon_start = self.horizon_units = None
+            return False
+        self.horizon_start = days[0]["date"]
+        self.horizon_units = [day["units"] for day in days]
+        return True
+
+    def get_days_forecast(self):
+        """
+        Возвращает прогнозы дней независимо от способа хранения.
+
+        Returns:
+            list: Пары (дата, спрос в ШТ), упорядоченные по дате.
+        """
+        if self.horizon_units is not None:
+            return [
+                (self.horizon_start + timedelta(days=offset), units)
+                for offset, units in enumerate(self.horizon_units)
+            ]
+        return sorted(
+            (day_forecast.date, day_forecast.units)
+            for day_forecast in self.forecast.all()
+        )
+
+    @staticmethod
+    def resample_forecasts(forecasts, freq):
+        """
+        Суммирует прогнозы дней по неделям или месяцам.
+
+        Прогнозы, хранящиеся строками DayForecast, суммируются одним
+        запросом с группировкой в базе данных, компактные - в памяти.
+
+        Args:
+            forecasts (Iterable[Forecast]): Прогнозы.
+            freq (str): Период: W - неделя, M - месяц.
+
+        Returns:
+            dict: Для каждого ID прогноза словарь {начало периода: спрос}.
+        """
+        resampled = defaultdict(dict)
+        row_ids = []
+        for forecast in forecasts:
+            if forecast.horizon_units is None:
+                row_ids.append(forecast.pk)
+                continue
+            periods = resampled[forecast.pk]
+            for day, units in forecast.get_days_forecast():
+                period = get_period_start(day, freq)
+                periods[period] = periods.get(period, 0) + units
+        if row_ids:
+            rows = (
+                DayForecast.objects.filter(forecast_sku_of_store_id__in=row_ids)
+                .annotate(period=RESAMPLE_FUNCTIONS[freq]("date"))
+                .values("forecast_sku_of_store_id", "period")
+                .annotate(total=Sum("units"))
+                .order_by("forecast_sku_of_store_id", "period")
+                .values_list("forecast_sku_of_store_id", "period", "total")
+            )
+            for forecast_id, period, units in rows:
+                resampled[forecast_id][period] = units
+        return resampled
+
 
 class DayForecast(models.Model):
     """Модель прогнозов дней."""
@@ -147,3 +423,312 @@ class DayForecast(models.Model):
     class Meta:
         verbose_name = "Прогноз дня"
         verbose_name_plural = "Прогнозы дней"
+        indexes = [models.Index(fields=("date",), name="dayforecast_date_idx")]
+
+
+class DailySalesRollup(models.Model):
+    """
+    Базовая модель суточного агрегата продаж.
+
+    Агрегаты обновляются инкрементально после импорта продаж
+    (см. sale.rollups).
+    """
+
+    date = models.DateField("Дата")
+    sales_units = models.DecimalField(
+        "Число проданных товаров без признака промо",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    sales_units_promo = models.DecimalField(
+        "Число проданных товаров с признаком промо",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    sales_rub = models.DecimalField(
+        "Продажи без признака промо в РУБ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    sales_run_promo = models.DecimalField(
+        "Продажи с признаком промо в РУБ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+
+    class Meta:
+        """Параметры модели."""
+
+        abstract = True
+
+
+class StoreGroupDailySales(DailySalesRollup):
+    """Модель продаж магазина по группе товаров за день."""
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, verbose_name="Название магазина"
+    )
+    group = models.CharField("Группа", max_length=MAX_LENGTH_FOR_FIELDS)
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Продажи магазина по группе за день"
+        verbose_name_plural = "Продажи магазинов по группам за день"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=("store", "group", "date"),
+                name="unique_store_group_date_in_rollup",
+            )
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление агрегата."""
+        return f"{self.store_id} {self.group} {self.date}"
+
+
+class DivisionCategoryDailySales(DailySalesRollup):
+    """Модель продаж дивизиона по категории товаров за день."""
+
+    division = models.CharField("Дивизион", max_length=MAX_LENGTH_FOR_FIELDS)
+    category = models.CharField("Категория", max_length=MAX_LENGTH_FOR_FIELDS)
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Продажи дивизиона по категории за день"
+        verbose_name_plural = "Продажи дивизионов по категориям за день"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=("division", "category", "date"),
+                name="unique_division_category_date_in_rollup",
+            )
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление агрегата."""
+        return f"{self.division} {self.category} {self.date}"
+
+
+class CityDailySales(DailySalesRollup):
+    """Модель продаж города за день."""
+
+    city = models.CharField("Город", max_length=MAX_LENGTH_FOR_FIELDS)
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Продажи города за день"
+        verbose_name_plural = "Продажи городов за день"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=("city", "date"),
+                name="unique_city_date_in_rollup",
+            )
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление агрегата."""
+        return f"{self.city} {self.date}"
+
+
+class ForecastAccuracy(models.Model):
+    """
+    Модель точности прогнозов магазина по SKU для горизонта прогноза.
+
+    Хранятся суммы по всем дням, для которых известен факт продаж, поэтому
+    метрики (WAPE, смещение, MAE) любого уровня - категории, магазина,
+    горизонта - получаются суммированием строк (см. sale.accuracy).
+    """
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, verbose_name="Название магазина"
+    )
+    sku = models.ForeignKey(
+        Category, on_delete=models.CASCADE, verbose_name="Единица складского учета"
+    )
+    horizon = models.SmallIntegerField("Горизонт прогноза в днях")
+    days = models.PositiveIntegerField("Число дней с фактом продаж")
+    forecast_units = models.DecimalField(
+        "Прогноз в ШТ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    fact_units = models.DecimalField(
+        "Продано в ШТ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    error_units = models.DecimalField(
+        "Сумма ошибок (прогноз - факт) в ШТ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+    abs_error_units = models.DecimalField(
+        "Сумма абсолютных ошибок в ШТ",
+        max_digits=MAX_DIGITS,
+        decimal_places=DECIMAL_PLACES,
+    )
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Точность прогноза"
+        verbose_name_plural = "Точность прогнозов"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=("store", "sku", "horizon"),
+                name="unique_store_sku_horizon_in_accuracy",
+            )
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление точности прогноза."""
+        return f"{self.store_id} {self.sku_id} {self.horizon}"
+
+
+class SaleArchive(models.Model):
+    """
+    Модель архива продаж магазина за месяц.
+
+    Продажи месяцев старше settings.SALE_HOT_MONTHS переносятся из Sale
+    в сжатые колонки (см. sale.archive), поэтому таблица продаж и ее
+    индексы содержат только последние месяцы. Продажи месяца делятся
+    на части по диапазонам SKU, чтобы продажи одного SKU или одной
+    страницы списка читались без распаковки всего месяца.
+    """
+
+    store = models.ForeignKey(
+        Store, on_delete=models.CASCADE, verbose_name="Название магазина"
+    )
+    month = models.DateField("Месяц")
+    first_sku = models.CharField("Первый SKU", max_length=MAX_LENGTH_FOR_FIELDS)
+    last_sku = models.CharField("Последний SKU", max_length=MAX_LENGTH_FOR_FIELDS)
+    rows = models.PositiveIntegerField("Число продаж")
+    data = models.BinaryField("Продажи (сжатые колонки)")
+    archived_at = models.DateTimeField("Архивирован", auto_now=True)
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Архив продаж"
+        verbose_name_plural = "Архивы продаж"
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=("store", "month", "first_sku"),
+                name="unique_store_month_sku_in_sale_archive",
+            )
+        ]
+
+    def __str__(self):
+        """Возвращает строковое представление архива."""
+        return f"{self.store_id} {self.month:%Y-%m}"
+
+
+class ImportStorage(FileSystemStorage):
+    """
+    Хранилище загруженных файлов импорта.
+
+    Каталог читается из настройки IMPORT_ROOT при каждом обращении,
+    а не при создании хранилища.
+    """
+
+    @property
+    def base_location(self):
+        """Возвращает каталог файлов импорта из настроек."""
+        return settings.IMPORT_ROOT
+
+    @property
+    def location(self):
+        """Возвращает абсолютный путь к каталогу файлов импорта."""
+        return os.path.abspath(self.base_location)
+
+
+class ImportJob(models.Model):
+    """
+    Модель задачи фонового импорта файла продаж.
+
+    Файл обрабатывается порциями в потоке фонового обработчика
+    (см. sale.jobs), а после каждой порции в задаче сохраняется прогресс.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "В очереди"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Завершена"),
+        (STATUS_FAILED, "Ошибка"),
+    )
+
+    file = models.FileField(
+        "Файл CSV", storage=ImportStorage(), upload_to="sales/%Y/%m/%d/"
+    )
+    status = models.CharField(
+        "Статус",
+        max_length=MAX_LENGTH_FOR_FIELDS,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField("Создана", auto_now_add=True)
+    started_at = models.DateTimeField("Начата", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+    updated_at = models.DateTimeField(
+        "Последнее обновление прогресса", null=True, blank=True
+    )
+    bytes_total = models.PositiveBigIntegerField("Размер файла", default=0)
+    bytes_done = models.PositiveBigIntegerField("Обработано байт", default=0)
+    rows_done = models.PositiveIntegerField("Импортировано строк", default=0)
+    rows_failed = models.PositiveIntegerField("Строк с ошибками", default=0)
+    errors = models.TextField("Ошибки", blank=True)
+
+    class Meta:
+        """Параметры модели."""
+
+        verbose_name = "Задача импорта"
+        verbose_name_plural = "Задачи импорта"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        """Возвращает строковое представление задачи импорта."""
+        return f"{self.pk} {self.file.name}"
+
+    @property
+    def is_finished(self):
+        """Проверяет, завершена ли задача (успешно или с ошибкой)."""
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def progress(self):
+        """Доля обработанного файла в процентах."""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.bytes_total:
+            return 0
+        return min(100, self.bytes_done * 100 // self.bytes_total)
+
+    @property
+    def throughput(self):
+        """Скорость импорта в строках в секунду."""
+        if self.started_at is None:
+            return None
+        elapsed = (
+            (self.finished_at or timezone.now()) - self.started_at
+        ).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round((self.rows_done + self.rows_failed) / elapsed, 1)
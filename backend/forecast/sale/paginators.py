@@ -0,0 +1,59 @@
+"""Пагинаторы списков админки для больших таблиц."""
+
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор больших таблиц с оценкой числа записей.
+
+    В PostgreSQL число записей без фильтров берется из статистики таблицы
+    (pg_class.reltuples, для секционированной таблицы - сумма по секциям),
+    а с фильтрами - из оценки планировщика (EXPLAIN), поэтому страница
+    не выполняет COUNT(*) по всей таблице. Точный подсчет выполняется,
+    если оценка меньше exact_count_limit или недоступна (другие СУБД).
+    """
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        """Возвращает оценку числа записей или точное число для малых наборов."""
+        estimate = self.get_estimate()
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
+
+    def get_estimate(self):
+        """
+        Оценивает число записей набора данных по статистике PostgreSQL.
+
+        Returns:
+            int | None: Оценка числа записей или None, если оценка недоступна.
+        """
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                table = queryset.model._meta.db_table
+                cursor.execute(
+                    "SELECT SUM(GREATEST(c.reltuples, 0)) FROM pg_class c "
+                    "WHERE c.oid = %s::regclass OR c.oid IN "
+                    "(SELECT inhrelid FROM pg_inherits "
+                    "WHERE inhparent = %s::regclass)",
+                    [table, table],
+                )
+                estimate = cursor.fetchone()[0]
+                return None if estimate is None else int(estimate)
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,215 @@
+"""Секционирование таблицы продаж по месяцам."""
+
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .models import Sale
+
+SALE_TABLE = Sale._meta.db_table
+SALE_DEFAULT_PARTITION = f"{SALE_TABLE}_default"
+SALE_PARTITION_NAME = re.compile(rf"^{SALE_TABLE}_y(\d{{4}})m(\d{{2}})$")
+SALE_PARTITION_BOUND = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+# Ключ рекомендательной блокировки создания секций продаж.
+SALE_PARTITION_LOCK = 20231001
+
+
+def month_start(day):
+    """Возвращает первый день месяца даты."""
+    return day.replace(day=1)
+
+
+def next_month(month):
+    """Возвращает первый день следующего месяца."""
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def iter_months(first, last):
+    """Возвращает первые дни месяцев от first до last включительно."""
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def get_partition_name(month):
+    """Возвращает имя секции продаж месяца."""
+    return f"{SALE_TABLE}_y{month:%Y}m{month:%m}"
+
+
+def get_partition_month(name):
+    """
+    Возвращает месяц секции продаж по ее имени.
+
+    Raises:
+        ValueError: Имя не является именем секции продаж.
+    """
+    match = SALE_PARTITION_NAME.match(name)
+    if match is None:
+        raise ValueError(f"{name} не является секцией продаж.")
+    return date(int(match[1]), int(match[2]), 1)
+
+
+def is_partitioned(using=DEFAULT_DB_ALIAS):
+    """Проверяет, что таблица продаж секционирована (только PostgreSQL)."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass",
+            [SALE_TABLE],
+        )
+        return cursor.fetchone()[0]
+
+
+def get_partitions(using=DEFAULT_DB_ALIAS):
+    """
+    Возвращает присоединенные секции продаж по месяцам.
+
+    Returns:
+        list: Кортежи (имя, первый день, первый день следующего периода,
+        оценка числа строк) в порядке дат. Секция по умолчанию
+        не включается.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), "
+            "GREATEST(c.reltuples, 0) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [SALE_TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound, estimate in rows:
+        match = SALE_PARTITION_BOUND.search(bound)
+        if match is not None:
+            partitions.append(
+                (
+                    name,
+                    date.fromisoformat(match[1]),
+                    date.fromisoformat(match[2]),
+                    int(estimate),
+                )
+            )
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def attach_partition(month, using=DEFAULT_DB_ALIAS):
+    """
+    Присоединяет к таблице продаж секцию месяца.
+
+    Если таблицы секции нет, она создается. Строки месяца, попавшие
+    в секцию по умолчанию (до создания секции), переносятся в нее.
+    Индексы родительской таблицы создаются в секции при присоединении.
+
+    Args:
+        month (date): Первый день месяца.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        str: Имя секции.
+    """
+    name = get_partition_name(month)
+    start, end = month.isoformat(), next_month(month).isoformat()
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} "
+            f"(LIKE {SALE_TABLE} INCLUDING DEFAULTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {SALE_DEFAULT_PARTITION} "
+            "WHERE date >= %s AND date < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {SALE_TABLE} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    return name
+
+
+def detach_partitions(before, using=DEFAULT_DB_ALIAS):
+    """
+    Отсоединяет секции продаж месяцев до даты before.
+
+    Отсоединенные секции остаются отдельными таблицами: их можно
+    выгрузить, удалить или присоединить обратно (attach_partition).
+    Продажи этих месяцев перестают возвращаться API и не участвуют
+    в обслуживании (VACUUM, перестроение индексов) таблицы продаж.
+
+    Args:
+        before (date): Первый день месяца, секции до которого отсоединяются.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        list: Имена отсоединенных секций.
+    """
+    names = [
+        name for name, _, end, _ in get_partitions(using) if end <= before
+    ]
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for name in names:
+            cursor.execute(f"ALTER TABLE {SALE_TABLE} DETACH PARTITION {name}")
+    return names
+
+
+def ensure_sale_partitions(days, using=DEFAULT_DB_ALIAS):
+    """
+    Создает недостающие секции продаж для месяцев дат.
+
+    Вызывается перед записью продаж, чтобы они сразу попадали в секции
+    своих месяцев, а не в секцию по умолчанию. Если таблица продаж
+    не секционирована (SQLite), ничего не делает. Одновременное создание
+    секций несколькими процессами импорта упорядочивается
+    рекомендательной блокировкой.
+
+    Args:
+        days (Iterable[date]): Даты продаж.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        list: Имена созданных секций.
+    """
+    months = {month_start(day) for day in days}
+    if not months or not is_partitioned(using):
+        return []
+    existing = {start for _, start, _, _ in get_partitions(using)}
+    if months <= existing:
+        return []
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [SALE_PARTITION_LOCK])
+        existing = {start for _, start, _, _ in get_partitions(using)}
+        return [
+            attach_partition(month, using)
+            for month in sorted(months - existing)
+        ]
+
+
+def ensure_future_partitions(months_ahead=None, using=DEFAULT_DB_ALIAS):
+    """
+    Создает секции продаж текущего и следующих месяцев.
+
+    Args:
+        months_ahead (int | None): Число следующих месяцев, по умолчанию
+            settings.SALE_PARTITIONS_AHEAD.
+        using (str): Псевдоним базы данных.
+
+    Returns:
+        list: Имена созданных секций.
+    """
+    if months_ahead is None:
+        months_ahead = settings.SALE_PARTITIONS_AHEAD
+    month = month_start(date.today())
+    months = [month]
+    for _ in range(months_ahead):
+        month = next_month(month)
+        months.append(month)
+    return ensure_sale_partitions(months, using)
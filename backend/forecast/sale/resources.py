@@ -1,5 +1,7 @@
 from import_export import resources, fields, widgets
 
+from .cache import bump_reference_version
+from .signals import sales_imported
 from .models import Category, Sale, Store, Forecast, DayForecast
 
 
@@ -15,6 +17,14 @@ class CategoryResource(resources.ModelResource):
         import_id_fields = ('sku',)
         model = Category
 
+    def after_import(self, dataset, result, using_transactions, dry_run,
+                     **kwargs):
+        """Сбрасывает кэш справочников после импорта."""
+        super().after_import(dataset, result, using_transactions, dry_run,
+                             **kwargs)
+        if not dry_run:
+            bump_reference_version()
+
 
 class SaleResource(resources.ModelResource):
     store = fields.Field(
@@ -40,6 +50,35 @@ class SaleResource(resources.ModelResource):
         import_id_fields = ('store', 'sku', 'date')
         model = Sale
 
+    def before_import(self, dataset, using_transactions, dry_run, **kwargs):
+        """Начинает сбор затронутых импортом пар (магазин, дата)."""
+        super().before_import(dataset, using_transactions, dry_run, **kwargs)
+        self.imported_keys = set()
+
+    def before_save_instance(self, instance, using_transactions, dry_run):
+        """
+        Отмечает продажу как импортируемую.
+
+        Сигнал сохранения продажи не обновляет агрегаты импортируемых
+        продаж: они обновляются один раз по сигналу sales_imported.
+        """
+        super().before_save_instance(instance, using_transactions, dry_run)
+        instance.imported = True
+
+    def after_save_instance(self, instance, using_transactions, dry_run):
+        """Запоминает пару (магазин, дата) сохраненной продажи."""
+        super().after_save_instance(instance, using_transactions, dry_run)
+        self.imported_keys.add((instance.store_id, instance.date))
+
+    def after_import(self, dataset, result, using_transactions, dry_run,
+                     **kwargs):
+        """Отправляет сигнал sales_imported с затронутыми парами."""
+        super().after_import(dataset, result, using_transactions, dry_run,
+                             **kwargs)
+        if not dry_run and not result.has_errors():
+            sales_imported.send(sender=self.__class__,
+                                keys=self.imported_keys)
+
 
 class StoreResource(resources.ModelResource):
     store = fields.Field(attribute='store', column_name='st_id')
@@ -56,6 +95,14 @@ class StoreResource(resources.ModelResource):
         import_id_fields = ('store',)
         model = Store
 
+    def after_import(self, dataset, result, using_transactions, dry_run,
+                     **kwargs):
+        """Сбрасывает кэш справочников после импорта."""
+        super().after_import(dataset, result, using_transactions, dry_run,
+                             **kwargs)
+        if not dry_run:
+            bump_reference_version()
+
 
 class ForecastResource(resources.ModelResource):
     store = fields.Field()
@@ -66,14 +113,57 @@ class ForecastResource(resources.ModelResource):
         model = DayForecast
         fields = ('store', 'sku', 'forecast_date', 'date', 'units')
 
+    def __init__(self, start=None, end=None, forecast_filters=None, **kwargs):
+        """
+        Создает ресурс с отбором выгружаемых компактных прогнозов.
+
+        Args:
+            start (date | None): Первый день выгружаемых компактных прогнозов.
+            end (date | None): День, следующий за последним днем выгружаемых
+                компактных прогнозов.
+            forecast_filters (dict | None): Условия отбора компактных
+                прогнозов (Forecast) - те же, что отбирают прогнозы дней
+                выгрузки по полям прогноза.
+        """
+        super().__init__(**kwargs)
+        self.start = start
+        self.end = end
+        self.forecast_filters = forecast_filters or {}
+
+    def get_queryset(self):
+        """Возвращает прогнозы дней вместе с прогнозами одним запросом."""
+        return super().get_queryset().select_related('forecast_sku_of_store')
+
+    def iter_queryset(self, queryset):
+        """
+        Возвращает прогнозы дней, в том числе дни компактных прогнозов.
+
+        У компактных прогнозов (Forecast.horizon_units) нет строк
+        DayForecast, поэтому их дни за период start - end выгружаются
+        несохраненными прогнозами дней после строк queryset. Компактные
+        прогнозы отбираются условиями forecast_filters.
+        """
+        yield from super().iter_queryset(queryset)
+        forecasts = Forecast.objects.filter(
+            horizon_units__isnull=False, **self.forecast_filters)
+        if self.end is not None:
+            forecasts = forecasts.filter(horizon_start__lt=self.end)
+        forecasts = forecasts.order_by('store_id', 'sku_id', 'forecast_date')
+        for forecast in forecasts.iterator(chunk_size=self.get_chunk_size()):
+            for day, units in forecast.get_days_forecast():
+                if ((self.start is None or day >= self.start)
+                        and (self.end is None or day < self.end)):
+                    yield DayForecast(forecast_sku_of_store=forecast,
+                                      date=day, units=units)
+
     @staticmethod
     def dehydrate_store(day_forecast):
-        return getattr(day_forecast.forecast_sku_of_store.store, "store")
+        return day_forecast.forecast_sku_of_store.store_id
 
     @staticmethod
-    def sku(day_forecast):
-        return getattr(day_forecast.forecast_sku_of_store.sku, "sku")
+    def dehydrate_sku(day_forecast):
+        return day_forecast.forecast_sku_of_store.sku_id
 
     @staticmethod
     def dehydrate_forecast_date(day_forecast):
-        return getattr(day_forecast.forecast_sku_of_store, "forecast_date")
+        return day_forecast.forecast_sku_of_store.forecast_date
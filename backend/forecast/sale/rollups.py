@@ -0,0 +1,290 @@
+"""Агрегаты продаж по магазинам, дивизионам и городам."""
+
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+from itertools import chain
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Sum
+
+from .archive import iter_archived_days
+from .constants import SALE_TOTAL_FIELDS
+from .models import (Category, CityDailySales, DivisionCategoryDailySales,
+                     Sale, SaleArchive, StoreGroupDailySales, Store)
+from .partitions import next_month
+
+ROLLUP_BATCH_SIZE = 5000
+
+# Агрегаты: модель, поле затронутого ключа в Store (None - сам магазин)
+# и измерения агрегата с соответствующими полями Sale.
+ROLLUPS = (
+    (
+        StoreGroupDailySales,
+        None,
+        {"store_id": "store_id", "group": "sku__group"},
+    ),
+    (
+        DivisionCategoryDailySales,
+        "division",
+        {"division": "store__division", "category": "sku__category"},
+    ),
+    (
+        CityDailySales,
+        "city",
+        {"city": "store__city"},
+    ),
+)
+
+
+def group_by_date(keys):
+    """
+    Группирует ключи (значение, дата) по дате.
+
+    Returns:
+        dict: Множество значений по каждой дате.
+    """
+    by_date = defaultdict(set)
+    for value, date in keys:
+        by_date[date].add(value)
+    return by_date
+
+
+def get_dimension(path, store, category):
+    """Возвращает значение измерения агрегата для продажи из архива."""
+    if path == "store_id":
+        return store.pk
+    relation, field = path.split("__")
+    return getattr(store if relation == "store" else category, field)
+
+
+def sum_archived_sales(archived, dimensions, key_field, keys, stores):
+    """
+    Суммирует продажи из архива по измерениям агрегата.
+
+    Args:
+        archived (list): Пары (ID магазина, словарь SALE_ARCHIVE_FIELDS).
+        dimensions (dict): Измерения агрегата и поля Sale.
+        key_field (str): Поле ключа в агрегате (store_id, division, city).
+        keys (set): Пары (значение ключа, дата) агрегата.
+        stores (dict): Магазины по ID.
+
+    Returns:
+        dict: Суммы показателей по дате и значениям измерений.
+    """
+    categories = Category.objects.in_bulk({row["sku_id"] for _, row in archived})
+    totals = defaultdict(dict)
+    for store, row in archived:
+        category = categories.get(row["sku_id"])
+        if category is None:
+            continue
+        values = {
+            name: get_dimension(path, stores[store], category)
+            for name, path in dimensions.items()
+        }
+        if (values[key_field], row["date"]) not in keys:
+            continue
+        sums = totals[row["date"]].setdefault(
+            tuple(values.values()), dict.fromkeys(SALE_TOTAL_FIELDS, 0)
+        )
+        for field in SALE_TOTAL_FIELDS:
+            sums[field] += row[field]
+    return totals
+
+
+def refresh_rollup(model, dimensions, key_field, keys, archived=None):
+    """
+    Пересчитывает один агрегат для затронутых ключей.
+
+    Строки агрегата по затронутым ключам удаляются и строятся заново
+    группировкой продаж только этих ключей. К продажам из таблицы
+    добавляются суммы продаж из архива, иначе пересчет архивного месяца
+    стер бы его агрегаты.
+
+    Args:
+        model: Модель агрегата.
+        dimensions (dict): Измерения агрегата и поля Sale.
+        key_field (str): Поле ключа в агрегате (store_id, division, city).
+        keys (set): Пары (значение ключа, дата).
+        archived (dict | None): Суммы продаж из архива по дате и значениям
+            измерений (см. sum_archived_sales).
+
+    Returns:
+        int: Число записанных строк агрегата.
+    """
+    sale_key = "store_id" if key_field == "store_id" else f"store__{key_field}"
+    total = 0
+    for date, values in sorted(group_by_date(keys).items()):
+        values = sorted(values)
+        model.objects.filter(date=date, **{f"{key_field}__in": values}).delete()
+        rows = (
+            Sale.objects.filter(date=date, **{f"{sale_key}__in": values})
+            .values(*dimensions.values())
+            .annotate(**{f"{field}_sum": Sum(field) for field in SALE_TOTAL_FIELDS})
+            .order_by()
+        )
+        totals = dict((archived or {}).get(date, {}))
+        for row in rows:
+            key = tuple(row[path] for path in dimensions.values())
+            sums = totals.get(key, {})
+            totals[key] = {
+                field: row[f"{field}_sum"] + sums.get(field, 0)
+                for field in SALE_TOTAL_FIELDS
+            }
+        created = model.objects.bulk_create(
+            [
+                model(date=date, **dict(zip(dimensions, key)), **sums)
+                for key, sums in totals.items()
+            ],
+            batch_size=ROLLUP_BATCH_SIZE,
+        )
+        total += len(created)
+    return total
+
+
+def refresh_sales_rollups(keys):
+    """
+    Обновляет агрегаты продаж для затронутых пар (магазин, дата).
+
+    Для дивизионов и городов пересчитываются все пары (дивизион, дата)
+    и (город, дата), в которые входят затронутые магазины. Продажи
+    из архива (см. sale.archive) входят в агрегаты наравне с продажами
+    из таблицы.
+
+    Args:
+        keys (Iterable[tuple]): Пары (ID магазина, дата).
+
+    Returns:
+        int: Число записанных строк агрегатов.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+    stores = Store.objects.in_bulk()
+    rollups = []
+    archived_keys = set()
+    for model, store_field, dimensions in ROLLUPS:
+        if store_field is None:
+            rollups.append((model, dimensions, "store_id", keys))
+            archived_keys |= keys
+            continue
+        rollup_keys = {
+            (getattr(stores[store], store_field), date)
+            for store, date in keys
+            if store in stores
+        }
+        rollups.append((model, dimensions, store_field, rollup_keys))
+        # Агрегат дивизиона или города включает продажи всех его магазинов.
+        dates = defaultdict(set)
+        for value, date in rollup_keys:
+            dates[value].add(date)
+        archived_keys |= {
+            (store.pk, date)
+            for store in stores.values()
+            for date in dates.get(getattr(store, store_field), ())
+        }
+    archived = list(iter_archived_days(archived_keys))
+    total = 0
+    with transaction.atomic():
+        for model, dimensions, key_field, rollup_keys in rollups:
+            total += refresh_rollup(
+                model,
+                dimensions,
+                key_field,
+                rollup_keys,
+                sum_archived_sales(
+                    archived, dimensions, key_field, rollup_keys, stores
+                ),
+            )
+    return total
+
+
+class PendingRollupsRefresh(threading.local):
+    """
+    Пары (магазин, дата), агрегаты которых обновятся после фиксации.
+
+    Пары копятся отдельно для каждого потока и базы данных. Первый
+    обработчик, выполненный после фиксации, пересчитывает все накопленные
+    пары, остальные обработчики той же транзакции находят их пустыми.
+    Пары отмененной транзакции пересчитываются вместе со следующей:
+    лишний пересчет не меняет агрегаты.
+    """
+
+    def __init__(self):
+        """Создает пустые множества пар."""
+        self.keys = defaultdict(set)
+
+    def add(self, keys, using):
+        """Добавляет пары к пересчету после фиксации транзакции."""
+        self.keys[using].update(keys)
+
+    def refresh(self, using):
+        """Пересчитывает накопленные пары базы данных."""
+        keys = self.keys.pop(using, None)
+        if keys:
+            refresh_sales_rollups(keys)
+
+
+pending_rollups_refresh = PendingRollupsRefresh()
+
+
+def schedule_sales_rollups_refresh(keys, using=DEFAULT_DB_ALIAS):
+    """
+    Обновляет агрегаты продаж после фиксации текущей транзакции.
+
+    Пары всех изменений одной транзакции (например, нескольких продаж,
+    сохраненных по одной) пересчитываются одним вызовом
+    refresh_sales_rollups. Вне транзакции агрегаты обновляются сразу.
+
+    Args:
+        keys (Iterable[tuple]): Пары (ID магазина, дата).
+        using (str): Псевдоним базы данных.
+    """
+    pending_rollups_refresh.add(keys, using)
+    transaction.on_commit(
+        partial(pending_rollups_refresh.refresh, using), using=using
+    )
+
+
+def rebuild_sales_rollups(chunk_size=100000):
+    """
+    Полностью перестраивает агрегаты продаж.
+
+    Агрегаты строятся по продажам из таблицы и из архива. Нужна
+    для первоначального заполнения; после этого агрегаты
+    обновляются инкрементально при импорте продаж и при изменении
+    продаж по одной (например, в админке). Продажи, измененные в обход
+    сигналов модели (bulk_create, update, delete набора записей без
+    sales_imported), требуют перестроения этой функцией (команда
+    rebuild_sales_rollups).
+
+    Args:
+        chunk_size (int): Число пар (магазин, дата) в одном пересчете.
+
+    Returns:
+        int: Число записанных строк агрегатов.
+    """
+    for model, _, _ in ROLLUPS:
+        model.objects.all().delete()
+    keys = Sale.objects.values_list("store_id", "date").distinct().order_by(
+        "date", "store_id"
+    )
+    archived_months = (
+        SaleArchive.objects.values_list("store_id", "month")
+        .distinct()
+        .order_by("month", "store_id")
+    )
+    archived_keys = (
+        (store, month + timedelta(days=day))
+        for store, month in archived_months.iterator()
+        for day in range((next_month(month) - month).days)
+    )
+    total = 0
+    chunk = []
+    for key in chain(keys.iterator(), archived_keys):
+        chunk.append(key)
+        if len(chunk) >= chunk_size:
+            total += refresh_sales_rollups(chunk)
+            chunk = []
+    return total + refresh_sales_rollups(chunk)
@@ -0,0 +1,66 @@
+"""Обработчики сигналов приложения sale."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .accuracy import refresh_forecast_accuracy
+from .cache import bump_reference_version
+from .models import Category, Sale, Store
+from .partitions import ensure_sale_partitions
+from .rollups import refresh_sales_rollups, schedule_sales_rollups_refresh
+
+# Отправляется после импорта продаж; keys - множество пар
+# (ID магазина, дата), продажи которых изменились.
+sales_imported = Signal()
+
+
+@receiver(post_save, sender=Store)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Store)
+@receiver(post_delete, sender=Category)
+def reference_changed(sender, **kwargs):
+    """Сбрасывает кэш справочников при изменении магазина или категории."""
+    bump_reference_version()
+
+
+@receiver(post_save, sender=Sale)
+def sale_saved(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Обновляет агрегаты продаж после сохранения продажи.
+
+    Если магазин или дата продажи изменились, обновляются и агрегаты
+    прежней пары (saved_key, см. Sale.from_db). Продажи, сохраняемые
+    импортом SaleResource, пропускаются: их агрегаты обновляются один раз
+    по сигналу sales_imported. Удаление продаж обрабатывается в SaleAdmin,
+    а не сигналом post_delete: с ним Django не удаляет наборы продаж
+    одним запросом (archive_sales).
+    """
+    if raw or getattr(instance, "imported", False):
+        return
+    key = (
+        instance.store_id,
+        sender._meta.get_field("date").to_python(instance.date),
+    )
+    keys = {key}
+    if getattr(instance, "saved_key", None) is not None:
+        keys.add(instance.saved_key)
+    instance.saved_key = key
+    schedule_sales_rollups_refresh(keys, using)
+
+
+@receiver(sales_imported)
+def ensure_partitions_after_import(sender, keys, **kwargs):
+    """Создает секции продаж месяцев, впервые появившихся при импорте."""
+    ensure_sale_partitions({day for _, day in keys})
+
+
+@receiver(sales_imported)
+def refresh_rollups_after_import(sender, keys, **kwargs):
+    """Обновляет агрегаты продаж для затронутых импортом магазинов и дат."""
+    refresh_sales_rollups(keys)
+
+
+@receiver(sales_imported)
+def refresh_accuracy_after_import(sender, keys, **kwargs):
+    """Пересчитывает точность прогнозов магазинов, затронутых импортом."""
+    refresh_forecast_accuracy({store for store, _ in keys})
@@ -0,0 +1 @@
+"""Теги шаблонов приложения sale."""
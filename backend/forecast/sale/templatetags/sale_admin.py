@@ -0,0 +1,107 @@
+"""Теги шаблонов админки приложения sale."""
+
+import datetime
+
+from django import template
+from django.db.models import Max, Min
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def month_range(first, last):
+    """Возвращает первые дни месяцев от first до last включительно."""
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def indexed_date_hierarchy(cl):
+    """
+    Навигация по датам для больших таблиц.
+
+    В отличие от стандартного date_hierarchy, который собирает список
+    годов, месяцев и дней запросом DISTINCT по всем записям уровня,
+    список периодов строится по первой и последней дате уровня (MIN/MAX),
+    которые читаются по индексу поля даты. Поэтому в списке могут
+    оказаться периоды без записей внутри диапазона.
+    """
+    field_name = cl.date_hierarchy
+    year_field = f"{field_name}__year"
+    month_field = f"{field_name}__month"
+    day_field = f"{field_name}__day"
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [
+                {"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}
+            ],
+        }
+
+    date_range = cl.queryset.aggregate(first=Min(field_name), last=Max(field_name))
+    first, last = date_range["first"], date_range["last"]
+    if first is None:
+        return {"show": True, "back": None, "choices": []}
+    if not year_lookup and first.year == last.year:
+        year_lookup = first.year
+        if first.month == last.month:
+            month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [
+                {
+                    "link": link(
+                        {
+                            year_field: year_lookup,
+                            month_field: month_lookup,
+                            day_field: day,
+                        }
+                    ),
+                    "title": capfirst(
+                        formats.date_format(
+                            first.replace(day=day), "MONTH_DAY_FORMAT"
+                        )
+                    ),
+                }
+                for day in range(first.day, last.day + 1)
+            ],
+        }
+    if year_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in month_range(first, last)
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [
+            {"link": link({year_field: str(year)}), "title": str(year)}
+            for year in range(first.year, last.year + 1)
+        ],
+    }
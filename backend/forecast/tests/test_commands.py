@@ -0,0 +1,363 @@
+"""Тесты для команд управления."""
+
+import os
+import sys
+import tempfile
+import unittest  # noqa
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from sale.archive import archive_sales
+from sale.importers import import_sales
+from sale.models import (Category, DayForecast, Forecast, ImportJob, Sale,
+                         Store)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_DIR_PATH = os.path.join(BASE_DIR, "api")
+sys.path.append(CODE_DIR_PATH)
+
+
+class LoadForecastsCommandTestCase(TestCase):
+    """Тесты для команды load_forecasts."""
+
+    def setUp(self):
+        """Настройка данных для тестирования."""
+        Store.objects.create(store="Store1")
+        Category.objects.create(sku="SKU001")
+        self.csv = (
+            "store,sku,forecast_date,date,units\n"
+            "Store1,SKU001,2023-10-01,2023-10-02,5\n"
+            "Store1,SKU001,2023-10-01,2023-10-03,6\n"
+        )
+
+    def load(self, content, suffix=".csv"):
+        """Записывает данные во временный файл и загружает их командой."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=suffix, delete=False, encoding="utf-8"
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command("load_forecasts", file.name, stdout=out)
+        return out.getvalue()
+
+    def test_load_csv(self):
+        """Проверка загрузки прогнозов из CSV."""
+        output = self.load(self.csv)
+        self.assertIn("Загружено прогнозов: 1", output)
+        self.assertEqual(Forecast.objects.count(), 1)
+        self.assertEqual(
+            sorted(DayForecast.objects.values_list("units", flat=True)), [5, 6]
+        )
+
+    def test_load_is_idempotent(self):
+        """Проверка того, что повторная загрузка заменяет прогнозы дней."""
+        self.load(self.csv)
+        self.load(self.csv.replace(",5\n", ",9\n"))
+        self.assertEqual(Forecast.objects.count(), 1)
+        self.assertEqual(
+            sorted(DayForecast.objects.values_list("units", flat=True)), [6, 9]
+        )
+
+    def test_load_ndjson(self):
+        """Проверка загрузки прогнозов из NDJSON."""
+        self.load(
+            '{"store": "Store1", "sku": "SKU001", "forecast_date": "2023-10-01", '
+            '"date": "2023-10-02", "units": 3}\n',
+            suffix=".ndjson",
+        )
+        self.assertEqual(DayForecast.objects.get().units, 3)
+
+    @override_settings(FORECAST_STORAGE="compact")
+    def test_load_compact(self):
+        """Проверка упаковки дней, идущих подряд, при компактном хранении."""
+        self.load(self.csv)
+        self.load(self.csv.replace(",5\n", ",9\n"))
+        forecast = Forecast.objects.get()
+        self.assertEqual(forecast.horizon_units, [9, 6])
+        self.assertFalse(DayForecast.objects.exists())
+
+    @override_settings(FORECAST_STORAGE="compact")
+    def test_load_compact_in_chunks(self):
+        """Проверка упаковки прогнозов, дни которых читаются порциями."""
+        Category.objects.create(sku="SKU002")
+        with mock.patch("sale.loaders.STAGE_CHUNK_SIZE", 1):
+            self.load(
+                self.csv + self.csv.split("\n", 1)[1].replace("SKU001", "SKU002")
+            )
+        self.assertEqual(
+            list(
+                Forecast.objects.order_by("sku_id").values_list(
+                    "sku_id", "horizon_units"
+                )
+            ),
+            [("SKU001", [5, 6]), ("SKU002", [5, 6])],
+        )
+        self.assertFalse(DayForecast.objects.exists())
+
+    @override_settings(FORECAST_STORAGE="compact")
+    def test_load_compact_with_gap(self):
+        """Проверка того, что дни с пропусками хранятся строками."""
+        self.load(self.csv.replace("2023-10-03", "2023-10-05"))
+        self.assertIsNone(Forecast.objects.get().horizon_units)
+        self.assertEqual(DayForecast.objects.count(), 2)
+
+    def test_load_unknown_store(self):
+        """Проверка того, что загрузка с неизвестным магазином отклоняется."""
+        with self.assertRaises(CommandError):
+            self.load(self.csv.replace("Store1", "Store2"))
+        self.assertEqual(Forecast.objects.count(), 0)
+
+
+class ImportSalesCommandTestCase(TestCase):
+    """Тесты для команды import_sales."""
+
+    def test_import_csv(self):
+        """Проверка импорта продаж из CSV."""
+        Store.objects.create(store="Store1")
+        Category.objects.create(sku="SKU001")
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as file:
+            file.write(
+                "st_id,pr_sku_id,date,pr_sales_type_id,pr_sales_in_units,"
+                "pr_promo_sales_in_units,pr_sales_in_rub,pr_promo_sales_in_rub\n"
+                "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+            )
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command("import_sales", file.name, stdout=out)
+        self.assertIn("записано продаж: 1", out.getvalue())
+        self.assertEqual(Sale.objects.get().sales_rub, 10)
+
+    def test_import_parallel(self):
+        """Проверка параллельного импорта с временем по разделам."""
+        Store.objects.create(store="Store1")
+        Store.objects.create(store="Store2")
+        Category.objects.create(sku="SKU001")
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as file:
+            file.write(
+                "st_id,pr_sku_id,date,pr_sales_type_id,pr_sales_in_units,"
+                "pr_promo_sales_in_units,pr_sales_in_rub,pr_promo_sales_in_rub\n"
+                "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+                "Store2,SKU001,2023-01-01,0,2,0,20,0\n"
+                "Store1,SKU001,2023-01-02,0,3,0,30,0\n"
+            )
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command("import_sales", file.name, workers=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn("записано продаж: 3", output)
+        self.assertIn("Store1", output)
+        self.assertEqual(Sale.objects.count(), 3)
+
+    def test_import_missing_columns(self):
+        """Проверка ошибки при отсутствии колонок."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as file:
+            file.write("st_id,date\nStore1,2023-01-01\n")
+        self.addCleanup(os.remove, file.name)
+        with self.assertRaises(CommandError):
+            call_command("import_sales", file.name, stdout=StringIO())
+
+
+class RunImportJobsCommandTestCase(TestCase):
+    """Тесты для команды run_import_jobs."""
+
+    def test_run_pending_jobs(self):
+        """Проверка выполнения задач из очереди."""
+        Store.objects.create(store="Store1")
+        Category.objects.create(sku="SKU001")
+        with tempfile.TemporaryDirectory() as import_root, override_settings(
+            IMPORT_ROOT=import_root
+        ):
+            job = ImportJob.objects.create(
+                file=SimpleUploadedFile(
+                    "sales.csv",
+                    (
+                        "st_id,pr_sku_id,date,pr_sales_type_id,"
+                        "pr_sales_in_units,pr_promo_sales_in_units,"
+                        "pr_sales_in_rub,pr_promo_sales_in_rub\n"
+                        "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+                    ).encode(),
+                )
+            )
+            out = StringIO()
+            call_command("run_import_jobs", stdout=out)
+        self.assertIn(f"Задача {job.pk}: Завершена", out.getvalue())
+        self.assertEqual(Sale.objects.count(), 1)
+
+
+class SalePartitionsCommandTestCase(TestCase):
+    """Тесты для секций таблицы продаж и команды sale_partitions."""
+
+    def setUp(self):
+        """Настройка данных для тестирования."""
+        self.store = Store.objects.create(store="Store1")
+        self.category = Category.objects.create(sku="SKU001")
+
+    def call(self, *args):
+        """Выполняет команду sale_partitions и возвращает ее вывод."""
+        out = StringIO()
+        call_command("sale_partitions", *args, stdout=out)
+        return out.getvalue()
+
+    def create_sale(self, day):
+        """Создает продажу магазина за день."""
+        return Sale.objects.create(
+            store=self.store, sku=self.category, date=day, sales_type=False,
+            sales_units=1, sales_units_promo=0, sales_rub=10, sales_run_promo=0,
+        )
+
+    def count_rows(self, table):
+        """Возвращает число строк таблицы секции."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Только PostgreSQL")
+    def test_import_creates_month_partition(self):
+        """
+        Проверка создания секции месяца при импорте.
+
+        Запрос продаж за период читает только секцию этого месяца.
+        """
+        import_sales(
+            StringIO(
+                "st_id,pr_sku_id,date,pr_sales_type_id,pr_sales_in_units,"
+                "pr_promo_sales_in_units,pr_sales_in_rub,pr_promo_sales_in_rub\n"
+                "Store1,SKU001,2019-07-01,0,1,0,10,0\n"
+            )
+        )
+        self.assertIn("sale_sale_y2019m07", self.call("list"))
+        self.assertEqual(self.count_rows("sale_sale_y2019m07"), 1)
+
+        plan = Sale.objects.filter(
+            store_id="Store1", date__range=(date(2019, 7, 1), date(2019, 7, 31))
+        ).explain()
+        self.assertIn("sale_sale_y2019m07", plan)
+        self.assertNotIn("sale_sale_default", plan)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Только PostgreSQL")
+    def test_attach_and_detach(self):
+        """Проверка переноса строк в новую секцию, ее отсоединения и возврата."""
+        self.create_sale(date(2019, 8, 1))
+        self.assertEqual(self.count_rows("sale_sale_default"), 1)
+
+        self.assertIn("sale_sale_y2019m08", self.call("attach", "2019-08"))
+        self.assertEqual(self.count_rows("sale_sale_default"), 0)
+        self.assertEqual(self.count_rows("sale_sale_y2019m08"), 1)
+
+        self.assertIn("sale_sale_y2019m08", self.call("detach", "--before", "2019-09"))
+        self.assertFalse(Sale.objects.exists())
+
+        self.call("attach", "sale_sale_y2019m08")
+        self.assertEqual(Sale.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            self.call("attach", "2019-08")
+
+    @unittest.skipIf(connection.vendor == "postgresql", "Только не PostgreSQL")
+    def test_not_partitioned(self):
+        """Проверка ошибки команды, если таблица продаж не секционирована."""
+        with self.assertRaises(CommandError):
+            self.call("list")
+
+
+class ArchiveSalesCommandTestCase(TestCase):
+    """Тесты для команд archive_sales и export_sales_history."""
+
+    def setUp(self):
+        """Создание продаж двух магазинов за старый и текущий месяц."""
+        category = Category.objects.create(sku="SKU001")
+        for store_id in ("Store1", "Store2"):
+            store = Store.objects.create(store=store_id)
+            for day in (date(2019, 8, 1), date.today()):
+                Sale.objects.create(
+                    store=store,
+                    sku=category,
+                    date=day,
+                    sales_type=False,
+                    sales_units=1,
+                    sales_units_promo=0,
+                    sales_rub="10.50",
+                    sales_run_promo=0,
+                )
+
+    def test_archive_sales(self):
+        """Проверка архивации продаж магазина до месяца."""
+        out = StringIO()
+        call_command(
+            "archive_sales", before="2019-09", stores=["Store1"], stdout=out
+        )
+        self.assertIn("месяцев магазинов: 1, продаж: 1", out.getvalue())
+        self.assertEqual(Sale.objects.count(), 3)
+        with self.assertRaises(CommandError):
+            call_command("archive_sales", before="2019", stdout=StringIO())
+
+    def test_export_sales_history(self):
+        """Проверка выгрузки архива в CSV с колонками файла импорта."""
+        archive_sales(date(2019, 9, 1))
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as file:
+            pass
+        self.addCleanup(os.remove, file.name)
+        err = StringIO()
+        call_command(
+            "export_sales_history", file.name, stores=["Store2"], stderr=err
+        )
+        self.assertIn("Выгружено продаж: 1", err.getvalue())
+        with open(file.name, encoding="utf-8") as exported:
+            header, *rows = exported.read().splitlines()
+        self.assertEqual(
+            header,
+            "st_id,pr_sku_id,date,pr_sales_type_id,pr_sales_in_units,"
+            "pr_promo_sales_in_units,pr_sales_in_rub,pr_promo_sales_in_rub",
+        )
+        self.assertEqual(len(rows), 1)
+        values = rows[0].split(",")
+        self.assertEqual(values[:4], ["Store2", "SKU001", "2019-08-01", "0"])
+        self.assertEqual(Decimal(values[6]), Decimal("10.5"))
+
+        call_command(
+            "export_sales_history", file.name, with_hot=True, stderr=err
+        )
+        self.assertIn("Выгружено продаж: 4", err.getvalue())
+
+
+class BenchRenderersCommandTestCase(TestCase):
+    """Тесты для команды bench_renderers."""
+
+    def test_bench_renderers(self):
+        """Проверка того, что замер выводится для каждого рендерера и парсера."""
+        out = StringIO()
+        call_command(
+            "bench_renderers", skus=2, days=3, repeat=1, stdout=out
+        )
+        output = out.getvalue()
+        for name in (
+            "CustomRenderer", "ORJSONCustomRenderer", "JSONParser", "ORJSONParser"
+        ):
+            self.assertIn(f"{name}:", output)
+
+
+class BenchSalesCommandTestCase(TestCase):
+    """Тесты для команды bench_sales."""
+
+    def test_bench_sales(self):
+        """Проверка замеров, совпадения ответов и отката продаж."""
+        out = StringIO()
+        call_command("bench_sales", skus=2, days=3, repeat=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn("Продаж: 6", output)
+        for name in ("numeric -> Decimal", "bigint -> float", "Список продаж"):
+            self.assertIn(name, output)
+        self.assertIn("Ответы совпадают: да", output)
+        self.assertFalse(Sale.objects.exists())
@@ -1,13 +1,41 @@
 import os
 import sys
+import tempfile
 import unittest  # noqa
+from datetime import date, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
+from django.contrib.admin import site
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
-from sale.admin import ForecastAdmin
-from sale.models import Category, DayForecast, Forecast, Sale, Store
+from sale.admin import ForecastAdmin, SaleAdmin
+from sale.archive import (archive_sales, decode_sales, get_archive_cutoff,
+                          iter_sales_history)
+from sale.accuracy import refresh_forecast_accuracy
+from sale.cache import category_cache, get_reference_version, store_cache
+from sale.constants import SALE_TOTAL_FIELDS
+from sale.models import (Category, CityDailySales, DayForecast,
+                         DivisionCategoryDailySales, Forecast,
+                         ForecastAccuracy, ImportJob, Sale, SaleArchive,
+                         StoreGroupDailySales, Store)
+from sale.importers import (SaleImportError, import_sales,
+                            import_sales_parallel, partition_sales_file)
+from sale.jobs import (claim_job, reclaim_stale_jobs, run_import_job,
+                       update_job)
+from sale.paginators import EstimatedCountPaginator
+from sale.resources import ForecastResource, SaleResource, StoreResource
+from sale.rollups import (pending_rollups_refresh, rebuild_sales_rollups,
+                          refresh_sales_rollups)
+from tablib import Dataset
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CODE_DIR_PATH = os.path.join(BASE_DIR, "api")
@@ -214,6 +242,182 @@ class SaleModelTestCase(TestCase):
         self.assertEqual(self.sale._meta.verbose_name, "Продажа")
         self.assertEqual(self.sale._meta.verbose_name_plural, "Продажи")
 
+    def test_sale_fixed_point_storage(self):
+        """Проверка хранения показателей целыми числами и чтения как float."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT sales_units, sales_rub FROM sale_sale WHERE id = %s",
+                [self.sale.pk],
+            )
+            self.assertEqual(cursor.fetchone(), (1005, 10005))
+        sales = Sale.objects.filter(store=self.store)
+        self.assertEqual(sales.filter(sales_units__gt=Decimal("100.4")).count(), 1)
+        self.assertEqual(
+            sales.aggregate(total=Sum("sales_rub"))["total"], Decimal("1000.5")
+        )
+        sku, columns = next(
+            sales.fact_by_sku(("date", "sales_units", "sales_rub"), as_float=True)
+        )
+        self.assertEqual(columns["sales_units"], [100.5])
+        self.assertEqual(columns["sales_rub"], [1000.5])
+
+    def test_fact_by_sku(self):
+        """Проверка группировки продаж по SKU с упорядочиванием по дате."""
+        Sale.objects.create(
+            store=self.store,
+            sku=self.category,
+            date="2023-09-30",
+            sales_type=False,
+            sales_units=Decimal("1.0"),
+            sales_units_promo=Decimal("0.0"),
+            sales_rub=Decimal("10.0"),
+            sales_run_promo=Decimal("0.0"),
+        )
+        result = list(
+            Sale.objects.filter(store=self.store).fact_by_sku(
+                ("date", "sales_units")
+            )
+        )
+        self.assertEqual(len(result), 1)
+        sku, columns = result[0]
+        self.assertEqual(sku, "SKU001")
+        self.assertEqual(
+            [str(day) for day in columns["date"]], ["2023-09-30", "2023-10-01"]
+        )
+        self.assertEqual(columns["sales_units"], [Decimal("1.0"), Decimal("100.5")])
+
+
+class SaleFixedPointMigrationTestCase(TransactionTestCase):
+    """Тесты миграции показателей продаж в целые числа."""
+
+    migrate_from = ("sale", "0010_sale_archive")
+    migrate_to = ("sale", "0011_sale_fixed_point_measures")
+
+    def migrate(self, target):
+        """Применяет миграции приложения sale до указанной."""
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+
+    def tearDown(self):
+        """Возвращает схему к последней миграции."""
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes("sale"))
+
+    def test_all_measures_are_bigint(self):
+        """Проверка, что миграция переводит в bigint все показатели."""
+        self.migrate(self.migrate_from)
+        self.migrate(self.migrate_to)
+        with connection.cursor() as cursor:
+            columns = {
+                column.name: connection.introspection.get_field_type(
+                    column.type_code, column
+                )
+                for column in connection.introspection.get_table_description(
+                    cursor, Sale._meta.db_table
+                )
+            }
+        for name in SALE_TOTAL_FIELDS:
+            with self.subTest(name=name):
+                self.assertEqual(columns[name], "BigIntegerField")
+
+
+class SaleArchiveTestCase(TestCase):
+    """Тесты архивации продаж (SaleArchive)."""
+
+    def setUp(self):
+        """Настройка данных для тестирования."""
+        self.store = Store.objects.create(store="Store1")
+        self.category = Category.objects.create(sku="SKU001")
+        self.second_category = Category.objects.create(sku="SKU002")
+        for sku, day, units in (
+            (self.category, date(2020, 1, 5), "1.5"),
+            (self.second_category, date(2020, 1, 3), "2"),
+            (self.category, date(2020, 2, 1), "3"),
+            (self.category, date(2023, 10, 1), "4"),
+        ):
+            self.create_sale(sku, day, units)
+
+    def create_sale(self, sku, day, units):
+        """Создание продажи SKU за день."""
+        return Sale.objects.create(
+            store=self.store,
+            sku=sku,
+            date=day,
+            sales_type=day.day == 1,
+            sales_units=Decimal(units),
+            sales_units_promo=Decimal("0"),
+            sales_rub=Decimal(units) * 10,
+            sales_run_promo=Decimal("0"),
+        )
+
+    def test_archive_sales(self):
+        """Проверка переноса продаж в архив по месяцам без потери точности."""
+        result = archive_sales(date(2020, 3, 15))
+        self.assertEqual(result, {"months": 2, "sales": 3})
+        self.assertEqual(list(Sale.objects.values_list("date", flat=True)),
+                         [date(2023, 10, 1)])
+
+        archive = SaleArchive.objects.get(month=date(2020, 1, 1))
+        self.assertEqual(str(archive), "Store1 2020-01")
+        self.assertEqual(archive.rows, 2)
+        rows = decode_sales(archive)
+        self.assertEqual(
+            [(row["sku_id"], row["date"], row["sales_units"]) for row in rows],
+            [
+                ("SKU001", date(2020, 1, 5), Decimal("1.5")),
+                ("SKU002", date(2020, 1, 3), Decimal("2")),
+            ],
+        )
+        self.assertEqual(rows[0]["sales_rub"], Decimal("15.0"))
+
+    def test_archive_sales_merges_late_sales(self):
+        """Проверка того, что повторная архивация дополняет архив месяца."""
+        archive_sales(date(2020, 2, 1))
+        self.create_sale(self.category, date(2020, 1, 20), "5")
+        self.create_sale(self.category, date(2020, 1, 5), "6")
+        self.assertEqual(archive_sales(date(2020, 2, 1))["sales"], 2)
+
+        rows = decode_sales(SaleArchive.objects.get(month=date(2020, 1, 1)))
+        self.assertEqual(
+            [(row["sku_id"], row["date"], row["sales_units"]) for row in rows],
+            [
+                ("SKU001", date(2020, 1, 5), Decimal("6")),
+                ("SKU001", date(2020, 1, 20), Decimal("5")),
+                ("SKU002", date(2020, 1, 3), Decimal("2")),
+            ],
+        )
+
+    def test_iter_sales_history(self):
+        """Проверка выгрузки истории из архива и таблицы продаж."""
+        archive_sales(date(2020, 3, 1))
+        history = list(iter_sales_history(start=date(2020, 1, 4)))
+        self.assertEqual(
+            [(store, row["date"]) for store, row in history],
+            [("Store1", date(2020, 1, 5)), ("Store1", date(2020, 2, 1))],
+        )
+        history = list(iter_sales_history(["Store1"], with_hot=True))
+        self.assertEqual(len(history), 4)
+        keys = [(row["sku_id"], row["date"]) for _, row in history]
+        self.assertEqual(keys, sorted(keys))
+        self.assertIn(date(2023, 10, 1), [key[1] for key in keys])
+
+        # Продажа, загруженная после архивации месяца, заменяет архивную.
+        self.create_sale(self.category, date(2020, 1, 5), "9")
+        history = list(iter_sales_history(["Store1"], with_hot=True))
+        self.assertEqual(len(history), 4)
+        self.assertEqual(history[0][1]["sales_units"], Decimal("9"))
+
+    @override_settings(SALE_HOT_MONTHS=3)
+    def test_archive_cutoff(self):
+        """Проверка даты отсечения по числу последних месяцев."""
+        cutoff = get_archive_cutoff()
+        today = date.today()
+        self.assertEqual(cutoff.day, 1)
+        self.assertEqual(
+            (today.year - cutoff.year) * 12 + today.month - cutoff.month, 2
+        )
+
 
 class ForecastModelTestCase(TestCase):
     """Тесты для модели Forecast."""
@@ -307,6 +511,27 @@ class DayForecastModelTestCase(TestCase):
             self.day_forecast._meta.get_field("units").verbose_name, "Спрос в ШТ"
         )
 
+    def test_resource_export_in_one_query(self):
+        """
+        Проверка выгрузки прогнозов дней через ForecastResource.
+
+        Прогнозы дней читаются одним запросом, компактные прогнозы - еще одним.
+        """
+        with self.assertNumQueries(2):
+            dataset = ForecastResource().export()
+        self.assertEqual(
+            [dict(row) for row in dataset.dict],
+            [
+                {
+                    "store": "Store1",
+                    "sku": "SKU001",
+                    "forecast_date": date(2023, 10, 1),
+                    "date": "2023-10-02",
+                    "units": 50,
+                }
+            ],
+        )
+
 
 class ForecastAdminTestCase(TestCase):
     """Тесты для админки ForecastAdmin."""
@@ -381,3 +606,668 @@ class ForecastAdminTestCase(TestCase):
         """
         response = self.client.get("http://127.0.0.1:8000/admin/sale/dayforecast/")
         self.assertEqual(response.status_code, 200)
+
+    def test_changelist_queries_do_not_depend_on_rows(self):
+        """
+        Act: Открытие списков продаж и прогнозов дней с разным числом записей.
+
+        Assert:
+        - Проверка того, что число запросов не зависит от числа записей.
+        - Проверка навигации по датам.
+        """
+        urls = ("/admin/sale/sale/", "/admin/sale/dayforecast/")
+        queries = {}
+        for url in urls:
+            queries[url] = self.count_queries(url)
+        for day in (2, 3):
+            Sale.objects.create(
+                **{**self.sale_data, "date": date(2023, 10, day),
+                   "sku": Category.objects.create(sku=f"SKU{day}")}
+            )
+            DayForecast.objects.create(
+                forecast_sku_of_store=self.forecast, date=date(2023, 10, day),
+                units=1
+            )
+        for url in urls:
+            self.assertEqual(self.count_queries(url), queries[url])
+
+        response = self.client.get("/admin/sale/sale/", {"date__year": 2023})
+        self.assertContains(response, "date__month=10")
+
+    def count_queries(self, url):
+        """Возвращает число запросов при открытии страницы админки."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_export_includes_compact_forecasts(self):
+        """
+        Act: Выгрузка прогнозов дней из админки при компактных прогнозах.
+
+        Assert:
+        - Проверка того, что дни компактного прогноза выгружаются.
+        - Проверка того, что учитывается период навигации по датам.
+        - Проверка того, что учитываются фильтры по магазину.
+        - Проверка списка компактных прогнозов.
+        """
+        compact = Forecast.objects.create(
+            store=self.store,
+            sku=Category.objects.create(sku="CompactSKU"),
+            forecast_date=date(2023, 9, 30),
+            horizon_start=date(2023, 9, 30),
+            horizon_units=[2, 6],
+        )
+        dataset = ForecastResource().export()
+        self.assertEqual(
+            [row[3:] for row in dataset if row[1] == "CompactSKU"],
+            [("2023-09-30", 2), ("2023-10-01", 6)],
+        )
+
+        request = RequestFactory().get(
+            "/admin/sale/dayforecast/export/",
+            {"date__year": 2023, "date__month": 10},
+        )
+        forecast_admin = ForecastAdmin(DayForecast, site)
+        kwargs = forecast_admin.get_export_resource_kwargs(request)
+        self.assertEqual(
+            (kwargs["start"], kwargs["end"]), (date(2023, 10, 1), date(2023, 11, 1))
+        )
+        dataset = ForecastResource(**kwargs).export(
+            queryset=DayForecast.objects.none()
+        )
+        self.assertEqual([row[3:] for row in dataset], [("2023-10-01", 6)])
+
+        other_store = Store.objects.create(store="OtherStore")
+        Forecast.objects.create(
+            store=other_store,
+            sku=compact.sku,
+            forecast_date=date(2023, 9, 30),
+            horizon_start=date(2023, 9, 30),
+            horizon_units=[1, 3],
+        )
+        request = RequestFactory().get(
+            "/admin/sale/dayforecast/export/",
+            {
+                "date__year": 2023,
+                "date__month": 10,
+                "forecast_sku_of_store__store__store__exact": "TestStore",
+            },
+        )
+        kwargs = forecast_admin.get_export_resource_kwargs(request)
+        dataset = ForecastResource(**kwargs).export(
+            queryset=DayForecast.objects.none()
+        )
+        self.assertEqual(
+            [(row[0], *row[3:]) for row in dataset],
+            [("TestStore", "2023-10-01", 6)],
+        )
+        response = self.client.get(
+            "/admin/sale/dayforecast/",
+            {"forecast_sku_of_store__store__store__exact": "TestStore"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get("/admin/sale/forecast/")
+        self.assertContains(response, "CompactSKU")
+        response = self.client.get(f"/admin/sale/forecast/{compact.pk}/change/")
+        self.assertContains(response, "2023-10-01: 6")
+
+    def test_paginator_uses_estimate_for_large_tables(self):
+        """Проверка того, что для больших таблиц COUNT(*) не выполняется."""
+        paginator = EstimatedCountPaginator(Sale.objects.order_by("pk"), 100)
+        with mock.patch.object(
+            EstimatedCountPaginator, "get_estimate", return_value=10 ** 7
+        ), self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 10 ** 7)
+
+        paginator = EstimatedCountPaginator(Sale.objects.order_by("pk"), 100)
+        with mock.patch.object(
+            EstimatedCountPaginator, "get_estimate", return_value=5
+        ):
+            self.assertEqual(paginator.count, 1)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Только PostgreSQL")
+    def test_paginator_estimate_in_postgresql(self):
+        """Проверка оценки числа записей по статистике PostgreSQL."""
+        for queryset in (
+            Sale.objects.order_by("pk"),
+            Sale.objects.filter(date__year=2023).order_by("pk"),
+        ):
+            estimate = EstimatedCountPaginator(queryset, 100).get_estimate()
+            self.assertIsInstance(estimate, int)
+
+
+class ReferenceCacheTestCase(TestCase):
+    """Тесты для кэша справочников."""
+
+    def setUp(self):
+        """Настройка данных для тестирования."""
+        Store.objects.create(store="Store1")
+        Category.objects.create(sku="SKU001")
+
+    def test_cache_reads_table_once(self):
+        """Проверка того, что повторное чтение не обращается к базе данных."""
+        self.assertIn("Store1", store_cache.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(store_cache.get("Store1").store, "Store1")
+
+    def test_cache_invalidated_on_save(self):
+        """Проверка сброса кэша при сохранении и удалении объекта."""
+        category_cache.all()
+        Category.objects.create(sku="SKU002")
+        self.assertIn("SKU002", category_cache.all())
+        Category.objects.filter(sku="SKU002").delete()
+        self.assertNotIn("SKU002", category_cache.all())
+
+    def test_cache_invalidated_on_import(self):
+        """Проверка сброса кэша после импорта справочника."""
+        store_cache.all()
+        version = get_reference_version()
+        dataset = Dataset(headers=["st_id", "st_city_id"])
+        dataset.append(["Store2", "City"])
+        StoreResource().import_data(dataset, raise_errors=True)
+        self.assertNotEqual(get_reference_version(), version)
+        self.assertIn("Store2", store_cache.all())
+
+    def test_cache_reloads_missing_key(self):
+        """Проверка перечитывания кэша при промахе по ключу из базы данных."""
+        store_cache.all()
+        # bulk_create не меняет версию справочников, как и изменение
+        # в другом процессе при кэше, не общем для процессов.
+        Store.objects.bulk_create([Store(store="Store3")])
+        self.assertNotIn("Store3", store_cache.all())
+        self.assertIn("Store3", store_cache.get_many({"Store3"}))
+        with self.assertNumQueries(1):
+            store_cache.get_many({"Unknown"})
+
+    def test_cache_expires(self):
+        """Проверка перечитывания кэша по истечении срока хранения."""
+        store_cache.all()
+        Store.objects.bulk_create([Store(store="Store3")])
+        with override_settings(REFERENCE_CACHE_TIMEOUT=0):
+            self.assertIn("Store3", store_cache.all())
+
+
+class SalesRollupTestCase(TestCase):
+    """Тесты для агрегатов продаж."""
+
+    def setUp(self):
+        """Настройка данных для тестирования."""
+        self.store = Store.objects.create(
+            store="Store1", city="City1", division="Division1"
+        )
+        self.other_store = Store.objects.create(
+            store="Store2", city="City1", division="Division1"
+        )
+        Category.objects.create(sku="SKU001", group="Group1", category="Cat1")
+        Category.objects.create(sku="SKU002", group="Group1", category="Cat2")
+
+    def import_sales(self, rows):
+        """Импортирует продажи через SaleResource."""
+        dataset = Dataset(
+            headers=[
+                "st_id", "pr_sku_id", "date", "pr_sales_type_id",
+                "pr_sales_in_units", "pr_promo_sales_in_units",
+                "pr_sales_in_rub", "pr_promo_sales_in_rub",
+            ]
+        )
+        for row in rows:
+            dataset.append(row)
+        result = SaleResource().import_data(dataset, raise_errors=True)
+        self.assertFalse(result.has_errors())
+
+    def test_rollups_updated_after_import(self):
+        """Проверка обновления агрегатов только для затронутых ключей."""
+        self.import_sales(
+            [
+                ["Store1", "SKU001", "2023-01-01", 0, 1, 0, 10, 0],
+                ["Store1", "SKU002", "2023-01-01", 0, 2, 0, 20, 0],
+                ["Store2", "SKU001", "2023-01-01", 0, 3, 0, 30, 0],
+            ]
+        )
+        self.assertEqual(
+            StoreGroupDailySales.objects.get(store=self.store).sales_units,
+            Decimal("3"),
+        )
+        self.assertEqual(
+            CityDailySales.objects.get(city="City1").sales_rub, Decimal("60")
+        )
+        self.assertEqual(
+            DivisionCategoryDailySales.objects.get(category="Cat1").sales_units,
+            Decimal("4"),
+        )
+
+        self.import_sales([["Store1", "SKU001", "2023-01-01", 0, 5, 0, 50, 0]])
+        self.assertEqual(
+            StoreGroupDailySales.objects.get(store=self.store).sales_units,
+            Decimal("7"),
+        )
+        self.assertEqual(
+            CityDailySales.objects.get(city="City1").sales_rub, Decimal("100")
+        )
+
+    def test_rollups_updated_after_sale_changes(self):
+        """
+        Проверка обновления агрегатов при изменении продаж по одной.
+
+        Изменения одной транзакции пересчитываются один раз после фиксации.
+        """
+        pending_rollups_refresh.keys.clear()
+        with mock.patch(
+            "sale.rollups.refresh_sales_rollups", wraps=refresh_sales_rollups
+        ) as refresh, self.captureOnCommitCallbacks(execute=True):
+            sale = Sale.objects.create(
+                store=self.store, sku_id="SKU001", date="2023-01-02",
+                sales_type=False, sales_units=1, sales_units_promo=0,
+                sales_rub=10, sales_run_promo=0,
+            )
+            sale.sales_units = 4
+            sale.save()
+        refresh.assert_called_once_with({(self.store.pk, date(2023, 1, 2))})
+        self.assertEqual(
+            CityDailySales.objects.get(date=date(2023, 1, 2)).sales_units,
+            Decimal("4"),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.date = date(2023, 1, 3)
+            sale.save()
+        self.assertEqual(
+            list(CityDailySales.objects.values_list("date", flat=True)),
+            [date(2023, 1, 3)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale = Sale.objects.get(pk=sale.pk)
+            sale.date = date(2023, 1, 4)
+            sale.save()
+        self.assertEqual(
+            list(CityDailySales.objects.values_list("date", flat=True)),
+            [date(2023, 1, 4)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SaleAdmin(Sale, site).delete_queryset(None, Sale.objects.all())
+        self.assertFalse(CityDailySales.objects.exists())
+
+    def test_import_refreshes_rollups_once(self):
+        """Проверка, что импорт не обновляет агрегаты сигналом сохранения."""
+        pending_rollups_refresh.keys.clear()
+        with mock.patch(
+            "sale.signals.refresh_sales_rollups", wraps=refresh_sales_rollups
+        ) as refresh, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.import_sales(
+                [
+                    ["Store1", "SKU001", "2023-01-01", 0, 1, 0, 10, 0],
+                    ["Store2", "SKU001", "2023-01-01", 0, 3, 0, 30, 0],
+                ]
+            )
+        refresh.assert_called_once()
+        self.assertEqual(callbacks, [])
+
+    def test_refresh_keeps_archived_sales(self):
+        """
+        Проверка пересчета агрегатов архивного месяца.
+
+        Продажа, загруженная после архивации, заменяет архивную, остальные
+        продажи архива остаются в агрегатах, в том числе после перестроения.
+        """
+        self.import_sales(
+            [
+                ["Store1", "SKU001", "2023-01-01", 0, 1, 0, 10, 0],
+                ["Store1", "SKU002", "2023-01-01", 0, 2, 0, 20, 0],
+                ["Store2", "SKU001", "2023-01-01", 0, 3, 0, 30, 0],
+            ]
+        )
+        archive_sales(before=date(2023, 2, 1))
+        self.assertFalse(Sale.objects.exists())
+
+        self.import_sales([["Store1", "SKU001", "2023-01-01", 0, 5, 0, 50, 0]])
+        for rebuild in (False, True):
+            if rebuild:
+                rebuild_sales_rollups()
+            with self.subTest(rebuild=rebuild):
+                self.assertEqual(
+                    StoreGroupDailySales.objects.get(store=self.store).sales_units,
+                    Decimal("7"),
+                )
+                self.assertEqual(
+                    CityDailySales.objects.get(city="City1").sales_rub,
+                    Decimal("100"),
+                )
+                self.assertEqual(
+                    DivisionCategoryDailySales.objects.get(
+                        category="Cat1"
+                    ).sales_units,
+                    Decimal("8"),
+                )
+
+    def test_rebuild_rollups(self):
+        """Проверка полного перестроения агрегатов."""
+        Sale.objects.create(
+            store=self.store,
+            sku_id="SKU001",
+            date="2023-01-02",
+            sales_type=False,
+            sales_units=1,
+            sales_units_promo=1,
+            sales_rub=1,
+            sales_run_promo=1,
+        )
+        self.assertEqual(rebuild_sales_rollups(), 3)
+        self.assertEqual(StoreGroupDailySales.objects.count(), 1)
+
+
+class ForecastAccuracyTestCase(TestCase):
+    """Тесты для точности прогнозов."""
+
+    def setUp(self):
+        """Настройка прогнозов в обоих способах хранения."""
+        self.store = Store.objects.create(
+            store="Store1", city="City1", division="Division1"
+        )
+        Category.objects.create(sku="SKU001", group="Group1", category="Cat1")
+        Category.objects.create(sku="SKU002", group="Group1", category="Cat1")
+        forecast = Forecast.objects.create(
+            store=self.store, sku_id="SKU001", forecast_date="2023-01-01"
+        )
+        DayForecast.objects.create(
+            forecast_sku_of_store=forecast, date="2023-01-02", units=5
+        )
+        DayForecast.objects.create(
+            forecast_sku_of_store=forecast, date="2023-01-03", units=4
+        )
+        Forecast.objects.create(
+            store=self.store,
+            sku_id="SKU002",
+            forecast_date="2023-01-01",
+            horizon_start="2023-01-02",
+            horizon_units=[2, 6],
+        )
+
+    def test_accuracy_refreshed_after_import(self):
+        """Проверка расчета ошибок по горизонтам после импорта продаж."""
+        dataset = Dataset(
+            headers=[
+                "st_id", "pr_sku_id", "date", "pr_sales_type_id",
+                "pr_sales_in_units", "pr_promo_sales_in_units",
+                "pr_sales_in_rub", "pr_promo_sales_in_rub",
+            ]
+        )
+        dataset.append(["Store1", "SKU001", "2023-01-02", 1, 3, 1, 30, 10])
+        dataset.append(["Store1", "SKU001", "2023-01-03", 0, 6, 0, 60, 0])
+        dataset.append(["Store1", "SKU002", "2023-01-02", 0, 2, 0, 20, 0])
+        SaleResource().import_data(dataset, raise_errors=True)
+
+        rows = {
+            (row.sku_id, row.horizon): (
+                row.days, row.forecast_units, row.fact_units,
+                row.error_units, row.abs_error_units,
+            )
+            for row in ForecastAccuracy.objects.all()
+        }
+        self.assertEqual(
+            rows,
+            {
+                ("SKU001", 1): (1, 5, 4, 1, 1),
+                ("SKU001", 2): (1, 4, 6, -2, 2),
+                ("SKU002", 1): (1, 2, 2, 0, 0),
+            },
+        )
+
+    def test_accuracy_includes_archived_sales(self):
+        """Проверка пересчета точности после архивации продаж."""
+        Sale.objects.bulk_create(
+            [
+                Sale(
+                    store=self.store, sku_id=sku, date=day, sales_type=False,
+                    sales_units=units, sales_units_promo=0, sales_rub=units,
+                    sales_run_promo=0,
+                )
+                for sku, day, units in (
+                    ("SKU001", date(2023, 1, 2), 4),
+                    ("SKU001", date(2023, 1, 3), 6),
+                    ("SKU002", date(2023, 1, 2), 2),
+                )
+            ]
+        )
+        refresh_forecast_accuracy()
+        expected = set(
+            ForecastAccuracy.objects.values_list(
+                "sku_id", "horizon", "days", "forecast_units", "fact_units"
+            )
+        )
+        archive_sales(before=date(2023, 2, 1))
+        self.assertFalse(Sale.objects.exists())
+
+        refresh_forecast_accuracy()
+        self.assertEqual(
+            set(
+                ForecastAccuracy.objects.values_list(
+                    "sku_id", "horizon", "days", "forecast_units", "fact_units"
+                )
+            ),
+            expected,
+        )
+        self.assertEqual(len(expected), 3)
+
+
+class ImportSalesTestCase(TestCase):
+    """Тесты для быстрого импорта продаж."""
+
+    header = (
+        "st_id,pr_sku_id,date,pr_sales_type_id,pr_sales_in_units,"
+        "pr_promo_sales_in_units,pr_sales_in_rub,pr_promo_sales_in_rub\n"
+    )
+
+    def setUp(self):
+        """Настройка справочников для тестирования."""
+        self.store = Store.objects.create(store="Store1", city="City1")
+        Category.objects.create(sku="SKU001", group="Group1")
+
+    def test_import_upserts_and_dedups(self):
+        """Проверка перезаписи продаж и схлопывания повторов ключа."""
+        import_sales(
+            StringIO(self.header + "Store1,SKU001,2023-01-01,0,1.0,0,10,0\n")
+        )
+        result = import_sales(
+            StringIO(
+                self.header
+                + "Store1,SKU001,2023-01-01,1,2.0,1,20,5\n"
+                + "Store1,SKU001,2023-01-01,1,3.0,1,30,5\n"
+                + "Store1,SKU001,2023-01-02,0,4.0,0,40,0\n"
+            ),
+            chunk_size=2,
+        )
+        self.assertEqual(result, {"rows": 3, "sales": 2})
+        self.assertEqual(
+            list(
+                Sale.objects.order_by("date").values_list(
+                    "sales_type", "sales_units"
+                )
+            ),
+            [(True, Decimal("3")), (False, Decimal("4"))],
+        )
+        self.assertEqual(
+            CityDailySales.objects.get(date="2023-01-01").sales_rub,
+            Decimal("30"),
+        )
+
+    def test_import_creates_partitions_before_transaction(self):
+        """Проверка создания секций продаж до транзакции импорта."""
+        calls = []
+
+        def ensure_sale_partitions(days, using):
+            calls.append((set(days), len(connection.savepoint_ids)))
+
+        depth = len(connection.savepoint_ids)
+        with mock.patch(
+            "sale.importers.ensure_sale_partitions", ensure_sale_partitions
+        ):
+            import_sales(
+                StringIO(
+                    self.header
+                    + "Store1,SKU001,2023-01-05,0,1,0,10,0\n"
+                    + "Store1,SKU001,2023-02-01,0,1,0,10,0\n"
+                )
+            )
+        self.assertEqual(calls, [({date(2023, 1, 1), date(2023, 2, 1)}, depth)])
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_import_unknown_store(self):
+        """Проверка того, что импорт с неизвестным магазином отклоняется."""
+        with self.assertRaises(SaleImportError):
+            import_sales(
+                StringIO(self.header + "Store2,SKU001,2023-01-01,0,1,0,1,0\n")
+            )
+        self.assertFalse(Sale.objects.exists())
+
+    def test_partition_by_store(self):
+        """Проверка того, что все строки магазина попадают в один раздел."""
+        rows = "".join(
+            f"Store{store},SKU001,2023-01-0{day},0,1,0,1,0\n"
+            for store in range(5)
+            for day in (1, 2)
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            partitions = partition_sales_file(
+                StringIO(self.header + rows), directory, 3
+            )
+            stores = [partition["stores"] for partition in partitions]
+            self.assertEqual(sum(len(item) for item in stores), 5)
+            self.assertEqual(set().union(*stores), {f"Store{i}" for i in range(5)})
+            self.assertEqual(
+                sum(partition["rows"] for partition in partitions), 10
+            )
+
+    def test_import_parallel_reports_failed_partition(self):
+        """Проверка сохранения разделов без ошибок при ошибке в другом."""
+        Store.objects.create(store="Store2", city="City1")
+        with self.assertRaises(SaleImportError):
+            import_sales_parallel(
+                StringIO(
+                    self.header
+                    + "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+                    + "Store2,SKU002,2023-01-01,0,1,0,10,0\n"
+                ),
+                workers=4,
+            )
+        self.assertEqual(
+            list(Sale.objects.values_list("store_id", flat=True)), ["Store1"]
+        )
+        self.assertTrue(CityDailySales.objects.exists())
+
+    def test_admin_fast_import(self):
+        """Проверка постановки быстрого импорта из админки в очередь."""
+        User.objects.create_superuser(username="admin", password="password")
+        self.client.login(username="admin", password="password")
+        response = self.client.get("/admin/sale/sale/fast-import/")
+        self.assertEqual(response.status_code, 200)
+        with tempfile.TemporaryDirectory() as import_root, override_settings(
+            IMPORT_ROOT=import_root
+        ):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(
+                    "/admin/sale/sale/fast-import/",
+                    {
+                        "import_file": SimpleUploadedFile(
+                            "sales.csv",
+                            (
+                                self.header
+                                + "Store1,SKU001,2023-01-01,0,1,0,1,0\n"
+                            ).encode(),
+                        )
+                    },
+                )
+            job = ImportJob.objects.get()
+            self.assertRedirects(
+                response, f"/admin/sale/importjob/{job.pk}/progress/"
+            )
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(job.status, ImportJob.STATUS_PENDING)
+
+            run_import_job(job.pk)
+            response = self.client.get(f"/admin/sale/importjob/{job.pk}/progress/")
+            self.assertContains(response, "Завершена")
+        self.assertEqual(Sale.objects.count(), 1)
+        response = self.client.get("/admin/sale/sale/")
+        self.assertContains(response, "/admin/sale/sale/fast-import/")
+
+
+class ImportJobTestCase(TestCase):
+    """Тесты для задач фонового импорта."""
+
+    def setUp(self):
+        """Настройка справочников и каталога файлов импорта."""
+        Store.objects.create(store="Store1")
+        Category.objects.create(sku="SKU001")
+        import_root = tempfile.TemporaryDirectory()
+        self.addCleanup(import_root.cleanup)
+        settings_override = override_settings(IMPORT_ROOT=import_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_job(self, content):
+        """Создает задачу импорта с файлом CSV."""
+        return ImportJob.objects.create(
+            file=SimpleUploadedFile("sales.csv", content.encode())
+        )
+
+    def test_run_job_in_chunks(self):
+        """Проверка порционного импорта с учетом строк с ошибками."""
+        job = self.create_job(
+            ImportSalesTestCase.header
+            + "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+            + "Store2,SKU001,2023-01-01,0,1,0,10,0\n"
+            + "Store1,SKU001,not-a-date,0,1,0,10,0\n"
+            + "Store1,SKU001,2023-01-02,1,2,1,20,5\n"
+        )
+        job = run_import_job(job.pk, chunk_size=2)
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertEqual((job.rows_done, job.rows_failed), (2, 2))
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.bytes_done, job.bytes_total)
+        self.assertIsNotNone(job.throughput)
+        self.assertIn("Строка 3: не найден магазин Store2.", job.errors)
+        self.assertIn("Строка 4: неверный формат.", job.errors)
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertEqual(
+            CityDailySales.objects.filter(date="2023-01-02").count(), 1
+        )
+        self.assertIsNone(run_import_job(job.pk))
+
+    def test_reclaim_stale_job(self):
+        """
+        Проверка возврата в очередь прерванной задачи.
+
+        Прежний обработчик задачи после возврата в очередь ее не обновляет.
+        """
+        job = self.create_job(
+            ImportSalesTestCase.header + "Store1,SKU001,2023-01-01,0,1,0,10,0\n"
+        )
+        self.assertTrue(claim_job(job.pk))
+        stale_job = ImportJob.objects.get(pk=job.pk)
+        self.assertEqual(reclaim_stale_jobs(), 0)
+
+        ImportJob.objects.filter(pk=job.pk).update(
+            updated_at=now() - timedelta(hours=1), rows_done=5
+        )
+        self.assertEqual(reclaim_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.started_at, job.rows_done),
+            (ImportJob.STATUS_PENDING, None, 0),
+        )
+
+        job = run_import_job(job.pk)
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+        self.assertFalse(update_job(stale_job, status=ImportJob.STATUS_FAILED))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_DONE)
+
+    def test_run_job_missing_columns(self):
+        """Проверка ошибки задачи при отсутствии колонок."""
+        job = run_import_job(self.create_job("st_id,date\n").pk)
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("В файле нет колонок", job.errors)
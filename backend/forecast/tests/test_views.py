@@ -1,13 +1,26 @@
+import json
 import os
 import sys
 import unittest  # noqa
 from datetime import date
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
 
-from django.test import TestCase
+from api.utils import (CustomRenderer, ORJSONCustomRenderer, ORJSONParser,
+                       pyarrow)
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
 from rest_framework.test import APIClient
-from sale.models import Category, Sale, Store
+from sale.archive import archive_sales, decode_sales
+from sale.models import (Category, CityDailySales, DayForecast, Forecast,
+                         ForecastAccuracy, Sale, SaleArchive, Store)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CODE_DIR_PATH = os.path.join(BASE_DIR, "api")
@@ -41,6 +54,19 @@ class CategoryAPITestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
 
+    def test_get_category_list_from_cache(self):
+        """
+        Act: Повторное получение списка категорий без фильтров.
+
+        Assert:
+        - Проверка того, что ответ отдается без запросов к базе данных.
+        """
+        self.client.get("/api/categories/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/categories/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["sku"], "TestSKU")
+
     def test_get_category_detail(self):
         """
         Act: Получение детальной информации о категории.
@@ -80,6 +106,63 @@ class CategoryAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_search_categories_ranked(self):
+        """
+        Act: Поиск категорий по подстроке.
+
+        Assert:
+        - Проверка того, что найдены только подходящие категории.
+        - Проверка того, что полное совпадение идет первым.
+        """
+        Category.objects.create(sku="SKU2", group="Bread")
+        Category.objects.create(sku="SKU3", group="Breadsticks")
+        Category.objects.create(sku="SKU4", group="Milk")
+        response = self.client.get("/api/categories/", {"search": "bread"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["sku"] for item in response.data], ["SKU2", "SKU3"])
+
+    def test_get_category_tree(self):
+        """
+        Act: Получение дерева категорий и повторный запрос с ETag.
+
+        Assert:
+        - Проверка структуры дерева и количества SKU в узлах.
+        - Проверка ответа 304 при неизменном дереве, в том числе после
+          изменения справочника магазинов.
+        - Проверка смены ETag после изменения справочника.
+        """
+        Category.objects.create(
+            sku="SKU2", group="TestCategoryGroup", category="Other", subcategory="Sub"
+        )
+        response = self.client.get("/api/categories/tree/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        group = response.data[0]
+        self.assertEqual(group["group"], "TestCategoryGroup")
+        self.assertEqual(group["sku_count"], 2)
+        self.assertEqual(
+            [node["sku_count"] for node in group["categories"]], [1, 1]
+        )
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/api/categories/tree/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Store.objects.create(store="TreeStore")
+        response = self.client.get(
+            "/api/categories/tree/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Category.objects.create(sku="SKU3", group="Another")
+        response = self.client.get(
+            "/api/categories/tree/", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
 
 class StoreAPITestCase(TestCase):
     """Тестирование StoreViewSet."""
@@ -170,6 +253,19 @@ class StoreAPITestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
 
+    def test_search_stores(self):
+        """
+        Act: Поиск магазинов по части названия города.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 200 OK).
+        - Проверка того, что найден только магазин с подходящим городом.
+        """
+        Store.objects.create(**{**self.store_data, "store": "Other", "city": "X"})
+        response = self.client.get("/api/shops/", {"search": "stcit"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["store"] for item in response.data], ["TestStore"])
+
     def test_invalid_type_format_value(self):
         """
         Act: Попытка фильтрации магазинов по неправильному значению типа формата.
@@ -250,6 +346,141 @@ class SaleViewAPITestCase(TestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["store"], "TestStore")
 
+    def test_list_sales_ndjson(self):
+        """
+        Act: Потоковое получение списка продаж в формате NDJSON.
+
+        Assert: Проверка типа ответа и того, что каждая строка - объект SKU.
+        """
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "format": "ndjson"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        item = json.loads(lines[0])
+        self.assertEqual(item["store"], "TestStore")
+        self.assertEqual(item["sku"], "TestSKU")
+        self.assertEqual(item["fact"][0]["sales_units"], 10.0)
+        self.assertNotIn("sku", item["fact"][0])
+
+    def test_list_sales_keyset_pagination(self):
+        """
+        Act: Постраничное получение списка продаж по курсору.
+
+        Assert: Проверка размера страниц и того, что страницы не пересекаются.
+        """
+        second_sku = Category.objects.create(sku="TestSKU2")
+        for day in (1, 2):
+            Sale.objects.create(
+                **{**self.sale_data, "sku": second_sku, "date": date(2023, 1, day)}
+            )
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "page_size": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        first_page = response.data["results"]
+        self.assertEqual(sum(len(item["fact"]) for item in first_page), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(
+            [(item["sku"], len(item["fact"])) for item in response.data["results"]],
+            [("TestSKU2", 1)],
+        )
+        self.assertEqual(first_page[0]["sku"], "TestSKU")
+
+    def test_list_sales_ndjson_keyset_pagination(self):
+        """
+        Act: Постраничное получение списка продаж в формате NDJSON.
+
+        Assert: Проверка того, что каждая строка - объект SKU страницы,
+        а ссылка на следующую страницу передается в заголовке Link.
+        """
+        second_sku = Category.objects.create(sku="TestSKU2")
+        for day in (1, 2):
+            Sale.objects.create(
+                **{**self.sale_data, "sku": second_sku, "date": date(2023, 1, day)}
+            )
+        response = self.client.get(
+            "/api/sales/",
+            {"store": self.store.store, "page_size": 2, "format": "ndjson"},
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["sku"] for line in lines], ["TestSKU", "TestSKU2"]
+        )
+        self.assertNotIn("results", json.loads(lines[0]))
+        next_link = response["Link"]
+        self.assertTrue(next_link.endswith('>; rel="next"'))
+
+        response = self.client.get(next_link[1:next_link.index(">")])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["sku"], "TestSKU2")
+        self.assertFalse(response.has_header("Link"))
+
+    def test_list_sales_filter_by_date_and_sku(self):
+        """
+        Act: Получение списка продаж за период по списку SKU.
+
+        Assert: Проверка того, что в ответ попали только продажи периода и SKU.
+        """
+        second_sku = Category.objects.create(sku="TestSKU2")
+        third_sku = Category.objects.create(sku="TestSKU3")
+        for sku in (second_sku, third_sku):
+            for day in (1, 20):
+                Sale.objects.create(
+                    **{**self.sale_data, "sku": sku, "date": date(2023, 1, day)}
+                )
+        response = self.client.get(
+            "/api/sales/",
+            {
+                "store": self.store.store,
+                "date_after": "2023-01-10",
+                "date_before": "2023-01-31",
+                "sku__in": "TestSKU2,TestSKU3",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item["sku"], len(item["fact"])) for item in response.data],
+            [("TestSKU2", 1), ("TestSKU3", 1)],
+        )
+
+    def test_retrieve_sale_filter_by_date(self):
+        """
+        Act: Получение продаж SKU за период, в который нет продаж.
+
+        Assert: Проверка того, что список продаж пуст.
+        """
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/",
+            {
+                "store": self.store.store,
+                "sku": self.category.sku,
+                "date_before": "2000-01-01",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["fact"], [])
+
+    def test_list_sales_invalid_cursor(self):
+        """
+        Act: Получение списка продаж с неверным курсором.
+
+        Assert: Проверка статуса ответа (HTTP 404).
+        """
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "cursor": "invalid"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_retrieve_sale(self):
         """
         Act: Получение деталей продажи для магазина и категории.
@@ -264,6 +495,264 @@ class SaleViewAPITestCase(TestCase):
         self.assertEqual(response.data["store"], "TestStore")
         self.assertEqual(response.data["sku"], "TestSKU")
 
+    def test_list_sales_columns_layout(self):
+        """
+        Act: Получение списка продаж в колоночном представлении.
+
+        Assert: Проверка того, что продажи SKU отдаются массивами по полям.
+        """
+        Sale.objects.create(**{**self.sale_data, "date": date(2023, 1, 1)})
+        for params in ({}, {"page_size": 10}):
+            response = self.client.get(
+                "/api/sales/",
+                {"store": self.store.store, "layout": "columns", **params},
+            )
+            self.assertEqual(response.status_code, 200)
+            results = response.data
+            if params:
+                results = results["results"]
+            fact = results[0]["fact"]
+            self.assertEqual(fact["date"][0], date(2023, 1, 1))
+            self.assertEqual(fact["sales_units"], [10, 10])
+
+    def test_retrieve_sale_columns_layout(self):
+        """
+        Act: Получение продаж SKU в колоночном представлении.
+
+        Assert: Проверка массивов значений по полям.
+        """
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/",
+            {"store": self.store.store, "sku": self.category.sku,
+             "layout": "columns"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["fact"]["sales_units"], [10])
+        self.assertEqual(response.data["fact"]["date"], [date.today()])
+
+    def test_list_sales_invalid_layout(self):
+        """
+        Act: Получение списка продаж с неизвестным представлением.
+
+        Assert: Проверка статуса ответа (HTTP 400 BAD REQUEST).
+        """
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "layout": "invalid"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @unittest.skipUnless(pyarrow, "pyarrow не установлен")
+    def test_list_sales_arrow(self):
+        """
+        Act: Получение списка продаж в формате Arrow IPC.
+
+        Assert: Проверка типа ответа и содержимого таблицы.
+        """
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "format": "arrow"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["Content-Type"], "application/vnd.apache.arrow.stream"
+        )
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.column("sku").to_pylist(), ["TestSKU"])
+        self.assertEqual(table.column("sales_units").to_pylist(), [10])
+
+    def test_retrieve_sale_resampled_by_week(self):
+        """
+        Act: Получение продаж SKU, просуммированных по неделям.
+
+        Assert: Проверка сумм и числа дней с промо по каждой неделе.
+        """
+        Sale.objects.all().delete()
+        for day, sales_type in ((2, True), (3, False), (9, False)):
+            Sale.objects.create(
+                **{**self.sale_data, "date": date(2023, 1, day),
+                   "sales_type": sales_type}
+            )
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/",
+            {"store": self.store.store, "sku": self.category.sku, "freq": "W"},
+        )
+        self.assertEqual(response.status_code, 200)
+        fact = response.data["fact"]
+        self.assertEqual(
+            [(row["date"], row["sales_units"], row["promo_days"], row["days"])
+             for row in fact],
+            [(date(2023, 1, 2), 20, 1, 2), (date(2023, 1, 9), 10, 0, 1)],
+        )
+
+    def test_retrieve_sale_invalid_freq(self):
+        """
+        Act: Получение продаж SKU с неизвестным периодом.
+
+        Assert: Проверка статуса ответа (HTTP 400 BAD REQUEST).
+        """
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/",
+            {"store": self.store.store, "sku": self.category.sku, "freq": "Y"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def archive_old_sales(self):
+        """Создание продаж января 2020 года и перенос их в архив."""
+        for day in (6, 14):
+            Sale.objects.create(
+                **{**self.sale_data, "date": date(2020, 1, day), "sales_units": 7}
+            )
+        archive_sales(date(2021, 1, 1))
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_list_sales_with_archive(self):
+        """
+        Act: Получение списка продаж, часть которых перенесена в архив.
+
+        Assert: Проверка того, что архивные продажи идут перед продажами
+        из таблицы, а период без архива их не содержит.
+        """
+        self.archive_old_sales()
+        response = self.client.get("/api/sales/", {"store": self.store.store})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["date"] for row in response.data[0]["fact"]],
+            [date(2020, 1, 6), date(2020, 1, 14), date.today()],
+        )
+        self.assertEqual(response.data[0]["fact"][0]["sales_units"], 7)
+
+        response = self.client.get(
+            "/api/sales/",
+            {"store": self.store.store, "date_after": "2021-01-01"},
+        )
+        self.assertEqual(len(response.data[0]["fact"]), 1)
+
+    def test_list_sales_with_archive_paginated(self):
+        """
+        Act: Постраничное получение продаж из архива и таблицы.
+
+        Assert: Проверка того, что страницы не пересекаются и содержат
+        все продажи.
+        """
+        self.archive_old_sales()
+        dates = []
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "page_size": 2}
+        )
+        while True:
+            self.assertEqual(response.status_code, 200)
+            for item in response.data["results"]:
+                dates.extend(row["date"] for row in item["fact"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(dates, [date(2020, 1, 6), date(2020, 1, 14), date.today()])
+
+    def test_retrieve_sale_with_archive(self):
+        """
+        Act: Получение продаж SKU из архива и таблицы, в том числе по месяцам.
+
+        Assert: Проверка дат продаж и сумм по месяцам.
+        """
+        self.archive_old_sales()
+        params = {"store": self.store.store, "sku": self.category.sku}
+        response = self.client.get(f"/api/sales/{self.category.sku}/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["date"] for row in response.data["fact"]],
+            ["2020-01-06", "2020-01-14", date.today().isoformat()],
+        )
+
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/", {**params, "freq": "M"}
+        )
+        self.assertEqual(response.status_code, 200)
+        fact = response.data["fact"]
+        self.assertEqual(
+            (fact[0]["date"], fact[0]["sales_units"], fact[0]["days"]),
+            (date(2020, 1, 1), 14, 2),
+        )
+        self.assertEqual(fact[-1]["date"], date.today().replace(day=1))
+
+    def test_hot_sale_wins_over_archive(self):
+        """
+        Act: Загрузка продажи за дату, уже перенесенную в архив.
+
+        Assert: Проверка того, что в списке, на страницах и в продажах SKU
+        продажа за эту дату одна и берется из таблицы.
+        """
+        self.archive_old_sales()
+        Sale.objects.create(
+            **{**self.sale_data, "date": date(2020, 1, 6), "sales_units": 3}
+        )
+        expected = [(date(2020, 1, 6), 3), (date(2020, 1, 14), 7), (date.today(), 10)]
+        response = self.client.get("/api/sales/", {"store": self.store.store})
+        self.assertEqual(
+            [(row["date"], row["sales_units"]) for row in response.data[0]["fact"]],
+            expected,
+        )
+
+        facts = []
+        response = self.client.get(
+            "/api/sales/", {"store": self.store.store, "page_size": 1}
+        )
+        while True:
+            for item in response.data["results"]:
+                facts.extend((row["date"], row["sales_units"]) for row in item["fact"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(facts, expected)
+
+        params = {"store": self.store.store, "sku": self.category.sku}
+        response = self.client.get(f"/api/sales/{self.category.sku}/", params)
+        self.assertEqual(
+            [(row["date"], row["sales_units"]) for row in response.data["fact"]],
+            [(day.isoformat(), units) for day, units in expected],
+        )
+        response = self.client.get(
+            f"/api/sales/{self.category.sku}/", {**params, "freq": "M"}
+        )
+        fact = response.data["fact"][0]
+        self.assertEqual((fact["sales_units"], fact["days"]), (10, 2))
+
+    @mock.patch("sale.archive.SALE_ARCHIVE_PART_SKUS", 1)
+    def test_list_sales_reads_archive_parts_lazily(self):
+        """
+        Act: Получение первой страницы продаж и продаж одного SKU.
+
+        Архив месяца состоит из нескольких частей.
+
+        Assert: Проверка того, что распаковываются не все части архива.
+        """
+        for sku in ("A1", "A2"):
+            Sale.objects.create(
+                **{
+                    **self.sale_data,
+                    "sku": Category.objects.create(sku=sku),
+                    "date": date(2020, 1, 6),
+                }
+            )
+        self.archive_old_sales()
+        self.assertEqual(SaleArchive.objects.count(), 3)
+
+        with mock.patch(
+            "sale.archive.decode_sales", wraps=decode_sales
+        ) as decode:
+            response = self.client.get(
+                "/api/sales/", {"store": self.store.store, "page_size": 1}
+            )
+        self.assertEqual(response.data["results"][0]["sku"], "A1")
+        self.assertEqual(decode.call_count, 2)
+
+        with mock.patch(
+            "sale.archive.decode_sales", wraps=decode_sales
+        ) as decode:
+            response = self.client.get(
+                "/api/sales/A2/", {"store": self.store.store, "sku": "A2"}
+            )
+        self.assertEqual(len(response.data["fact"]), 1)
+        self.assertEqual(decode.call_count, 1)
+
     def test_invalid_list_sales(self):
         """
         Act: Получение списка продаж для неверного магазина.
@@ -290,6 +779,44 @@ class SaleViewAPITestCase(TestCase):
         )
 
 
+class RendererTestCase(TestCase):
+    """Тестирование рендереров и парсеров API."""
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        """
+        Act: Рендеринг одного ответа стандартным и orjson-рендерером.
+
+        Assert:
+        - Проверка одинакового результата для успешного ответа и ошибки.
+        """
+        data = {
+            "date": date(2023, 10, 1),
+            "sales_rub": Decimal("12.5"),
+            "fact": [{"units": 1}],
+        }
+        for status_code in (status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST):
+            context = {"response": Response(status=status_code)}
+            self.assertEqual(
+                json.loads(
+                    ORJSONCustomRenderer().render(data, renderer_context=context)
+                ),
+                json.loads(CustomRenderer().render(data, renderer_context=context)),
+            )
+
+    def test_orjson_parser(self):
+        """
+        Act: Разбор корректного и некорректного тела запроса.
+
+        Assert:
+        - Проверка разобранных данных.
+        - Проверка ошибки разбора для некорректного JSON.
+        """
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"data": [1]}')), {"data": [1]})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b"{"))
+
+
 class ForecastAPITestCase(TestCase):
     """Тестирование ForecastViewSet."""
 
@@ -337,6 +864,54 @@ class ForecastAPITestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_forecast_keyset_pagination(self):
+        """
+        Act: Постраничное получение прогнозов по курсору.
+
+        Assert: Проверка того, что каждая страница содержит следующий прогноз.
+        """
+        for day in (1, 2):
+            Forecast.objects.create(
+                store=self.store, sku=self.category, forecast_date=date(2023, 1, day)
+            )
+        url = reverse("forecast-list")
+        response = self.client.get(
+            url, {"store": "TestStore", "sku": "TestSKU", "page_size": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["forecast_date"], "2023-01-01")
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["forecast_date"], "2023-01-02")
+        self.assertIsNone(response.data["next"])
+
+    def test_list_forecast_for_store_in_constant_queries(self):
+        """
+        Act: Получение прогнозов магазина по нескольким SKU и группе.
+
+        Assert:
+        - Проверка того, что прогнозы всех SKU получены за два запроса.
+        - Проверка фильтрации по группе товаров.
+        """
+        other = Category.objects.create(sku="OtherSKU", group="OtherGroup")
+        for category in (self.category, other):
+            forecast = Forecast.objects.create(
+                store=self.store, sku=category, forecast_date=date(2023, 10, 1)
+            )
+            DayForecast.objects.create(
+                forecast_sku_of_store=forecast, date=date(2023, 10, 2), units=1
+            )
+        url = reverse("forecast-list")
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, {"store": "TestStore", "sku__in": "TestSKU,OtherSKU"}
+            )
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]["forecast"], {"2023-10-02": 1})
+
+        response = self.client.get(url, {"store": "TestStore", "group": "OtherGroup"})
+        self.assertEqual([item["sku"] for item in response.data], ["OtherSKU"])
+
     def test_filter_forecast_by_invalid_sku(self):
         """
         Act: Попытка фильтрации прогнозов по неправильному SKU.
@@ -350,3 +925,464 @@ class ForecastAPITestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+    def get_forecast_payload(self, forecast_date="2023-10-01", units=5):
+        """Возвращает прогноз тестового SKU в формате загрузки."""
+        return {
+            "store": "TestStore",
+            "sku": "TestSKU",
+            "forecast_date": forecast_date,
+            "forecast": {"2023-10-02": units, "2023-10-03": units + 1},
+        }
+
+    def test_bulk_create_forecast(self):
+        """
+        Act: Пакетная загрузка прогнозов.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 201 CREATED).
+        - Проверка количества созданных прогнозов и прогнозов дней.
+        """
+        url = reverse("forecast-list")
+        response = self.client.post(
+            f"{url}?bulk=true",
+            {
+                "data": [
+                    self.get_forecast_payload("2023-10-01"),
+                    self.get_forecast_payload("2023-10-02"),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"forecasts": 2, "days": 4})
+        self.assertEqual(Forecast.objects.count(), 2)
+        self.assertEqual(DayForecast.objects.count(), 4)
+
+    def test_bulk_create_forecast_invalid_store(self):
+        """
+        Act: Пакетная загрузка прогнозов с несуществующим магазином.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 400 BAD REQUEST).
+        - Проверка того, что не сохранен ни один прогноз пакета.
+        """
+        url = reverse("forecast-list")
+        invalid = {**self.get_forecast_payload("2023-10-02"), "store": "NoStore"}
+        response = self.client.post(
+            f"{url}?bulk=true",
+            {"data": [self.get_forecast_payload(), invalid]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Forecast.objects.count(), 0)
+
+    def test_create_forecast_malformed_items(self):
+        """
+        Act: Загрузка прогнозов без прогноза дней или неверной структуры.
+
+        Assert: Проверка ответа HTTP 400 вместо ошибки сервера
+        в пакетном и обычном режимах.
+        """
+        url = reverse("forecast-list")
+        payload = self.get_forecast_payload()
+        without_days = {key: value for key, value in payload.items() if key != "forecast"}
+        for item in (
+            without_days,
+            {**payload, "forecast": [1, 2]},
+            {**payload, "store": ["x"]},
+            "not-a-forecast",
+        ):
+            for query in ("?bulk=true", ""):
+                with self.subTest(item=item, query=query):
+                    response = self.client.post(
+                        f"{url}{query}", {"data": [item]}, format="json"
+                    )
+                    self.assertEqual(
+                        response.status_code, status.HTTP_400_BAD_REQUEST
+                    )
+        self.assertEqual(Forecast.objects.count(), 0)
+
+    def test_create_forecast_references_from_cache(self):
+        """
+        Act: Загрузка отдельных прогнозов при прогретом кэше справочников.
+
+        Assert:
+        - Проверка того, что магазин и SKU не читаются из базы данных.
+        - Проверка ответа HTTP 400 для несуществующего магазина.
+        """
+        url = reverse("forecast-list")
+        self.client.post(
+            url, {"data": [self.get_forecast_payload("2023-10-01")]}, format="json"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url,
+                {"data": [self.get_forecast_payload("2023-10-02")]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data[0]["store"], "TestStore")
+        self.assertEqual(response.data[0]["sku"], "TestSKU")
+        for query in queries.captured_queries:
+            self.assertNotIn('"sale_store"', query["sql"])
+            self.assertNotIn('"sale_category"', query["sql"])
+
+        invalid = {**self.get_forecast_payload("2023-10-03"), "store": "NoStore"}
+        response = self.client.post(url, {"data": [invalid]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Forecast.objects.count(), 2)
+
+    def test_bulk_create_forecast_malformed_store_and_sku(self):
+        """
+        Act: Пакетная загрузка прогнозов с магазином и SKU не в виде строки.
+
+        Assert: Проверка ответа HTTP 400 с ошибкой поля вместо ошибки сервера.
+        """
+        url = reverse("forecast-list")
+        payload = self.get_forecast_payload()
+        for field, value in (("store", ["x"]), ("sku", {"sku": "TestSKU"})):
+            with self.subTest(field=field):
+                response = self.client.post(
+                    f"{url}?bulk=true",
+                    {"data": [{**payload, field: value}]},
+                    format="json",
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertEqual(
+                    response.data["errors"][0]["attr"],
+                    f"non_field_errors.0.{field}",
+                )
+        self.assertEqual(Forecast.objects.count(), 0)
+
+    def test_bulk_create_forecast_new_store(self):
+        """
+        Act: Пакетная загрузка прогноза магазина, добавленного в обход кэша.
+
+        Assert: Проверка того, что магазин найден в базе данных
+        и прогноз сохранен.
+        """
+        url = reverse("forecast-list")
+        self.client.post(
+            f"{url}?bulk=true", {"data": [self.get_forecast_payload()]}, format="json"
+        )
+        Store.objects.bulk_create([Store(store="NewStore")])
+        response = self.client.post(
+            f"{url}?bulk=true",
+            {"data": [{**self.get_forecast_payload(), "store": "NewStore"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Forecast.objects.filter(store="NewStore").exists())
+
+    def test_bulk_create_forecast_conflict(self):
+        """
+        Act: Пакетная загрузка прогноза, который уже существует.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 409 CONFLICT).
+        - Проверка того, что остальные прогнозы пакета не сохранены.
+        """
+        Forecast.objects.create(
+            store=self.store, sku=self.category, forecast_date=date(2023, 10, 2)
+        )
+        url = reverse("forecast-list")
+        response = self.client.post(
+            f"{url}?bulk=true",
+            {
+                "data": [
+                    self.get_forecast_payload("2023-10-01"),
+                    self.get_forecast_payload("2023-10-02"),
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Forecast.objects.count(), 1)
+        self.assertEqual(DayForecast.objects.count(), 0)
+
+    def test_upsert_forecast(self):
+        """
+        Act: Повторная загрузка прогноза в режиме upsert.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 201 CREATED).
+        - Проверка того, что прогноз не задублирован, а его дни заменены.
+        """
+        url = reverse("forecast-list")
+        for units in (5, 7):
+            response = self.client.post(
+                f"{url}?upsert=true",
+                {"data": [self.get_forecast_payload(units=units)]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Forecast.objects.count(), 1)
+        self.assertEqual(
+            sorted(DayForecast.objects.values_list("units", flat=True)), [7, 8]
+        )
+
+    def test_list_forecast_resampled_by_month(self):
+        """
+        Act: Получение прогнозов, просуммированных по месяцам.
+
+        Assert:
+        - Проверка сумм для прогнозов в обоих способах хранения.
+        """
+        url = reverse("forecast-list")
+        payload = self.get_forecast_payload()
+        payload["forecast"]["2023-11-01"] = 10
+        self.client.post(f"{url}?bulk=true", {"data": [payload]}, format="json")
+        with override_settings(FORECAST_STORAGE="compact"):
+            self.client.post(
+                f"{url}?bulk=true",
+                {"data": [{**payload, "forecast_date": "2023-09-30",
+                           "forecast": {"2023-10-31": 1, "2023-11-01": 2}}]},
+                format="json",
+            )
+        response = self.client.get(url, {"store": "TestStore", "freq": "M"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {item["forecast_date"]: item["forecast"] for item in response.data},
+            {
+                "2023-09-30": {"2023-10-01": 1, "2023-11-01": 2},
+                "2023-10-01": {"2023-10-01": 11, "2023-11-01": 10},
+            },
+        )
+
+    @override_settings(FORECAST_STORAGE="compact")
+    def test_upsert_forecast_compact(self):
+        """
+        Act: Загрузка и чтение прогноза при компактном хранении.
+
+        Assert:
+        - Проверка того, что строки DayForecast не создаются.
+        - Проверка того, что повторная загрузка заменяет значения.
+        - Проверка того, что прогноз отдается в прежнем формате.
+        """
+        url = reverse("forecast-list")
+        for units in (5, 7):
+            response = self.client.post(
+                f"{url}?upsert=true",
+                {"data": [self.get_forecast_payload(units=units)]},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(DayForecast.objects.count(), 0)
+        self.assertEqual(Forecast.objects.get().horizon_units, [7, 8])
+
+        response = self.client.get(url, {"store": "TestStore"})
+        self.assertEqual(
+            response.data[0]["forecast"], {"2023-10-02": 7, "2023-10-03": 8}
+        )
+
+    def test_load_forecast_requires_authentication(self):
+        """
+        Act: Загрузка файла прогнозов без аутентификации.
+
+        Assert: Проверка статуса ответа (HTTP 403 FORBIDDEN).
+        """
+        response = self.client.post(
+            reverse("forecast-load"), data="", content_type="text/csv"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_load_forecast_csv(self):
+        """
+        Act: Загрузка файла прогнозов в формате CSV.
+
+        Assert:
+        - Проверка статуса ответа (HTTP 201 CREATED).
+        - Проверка количества загруженных прогнозов дней.
+        """
+        self.client.force_authenticate(User.objects.create_user(username="ml"))
+        response = self.client.post(
+            reverse("forecast-load"),
+            data=(
+                "store,sku,forecast_date,date,units\n"
+                "TestStore,TestSKU,2023-10-01,2023-10-02,5\n"
+            ),
+            content_type="text/csv",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"forecasts": 1, "days": 1})
+        self.assertEqual(DayForecast.objects.get().units, 5)
+
+    def create_export_forecasts(self):
+        """Создает прогноз со строками DayForecast и компактный прогноз."""
+        forecast = Forecast.objects.create(
+            store=self.store, sku=self.category, forecast_date=date(2023, 10, 1)
+        )
+        for day, units in ((2, 5), (3, 6)):
+            DayForecast.objects.create(
+                forecast_sku_of_store=forecast, date=date(2023, 10, day), units=units
+            )
+        other = Category.objects.create(sku="OtherSKU", group="OtherGroup")
+        Forecast.objects.create(
+            store=self.store,
+            sku=other,
+            forecast_date=date(2023, 10, 1),
+            horizon_start=date(2023, 10, 2),
+            horizon_units=[7, 8],
+        )
+
+    def test_export_forecast_csv_in_one_query(self):
+        """
+        Act: Выгрузка прогнозов магазина в CSV.
+
+        Assert:
+        - Проверка того, что ответ отдается потоком в формате CSV.
+        - Проверка того, что прогнозы обоих видов хранения выгружены
+          одним запросом.
+        """
+        self.create_export_forecasts()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("forecast-export"), {"store": "TestStore", "format": "csv"}
+            )
+            content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertEqual(
+            content.splitlines(),
+            [
+                "store,sku,forecast_date,date,units",
+                "TestStore,OtherSKU,2023-10-01,2023-10-02,7",
+                "TestStore,OtherSKU,2023-10-01,2023-10-03,8",
+                "TestStore,TestSKU,2023-10-01,2023-10-02,5",
+                "TestStore,TestSKU,2023-10-01,2023-10-03,6",
+            ],
+        )
+
+    def test_export_forecast_ndjson_round_trip(self):
+        """
+        Act: Выгрузка прогнозов группы в NDJSON и повторная загрузка файла.
+
+        Assert:
+        - Проверка фильтрации выгрузки по группе товаров.
+        - Проверка того, что выгрузку принимает загрузка прогнозов.
+        """
+        self.create_export_forecasts()
+        response = self.client.get(
+            reverse("forecast-export"), {"group": "TestGroup", "format": "ndjson"}
+        )
+        content = b"".join(response.streaming_content)
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [
+                {
+                    "store": "TestStore",
+                    "sku": "TestSKU",
+                    "forecast_date": "2023-10-01",
+                    "date": "2023-10-02",
+                    "units": 5,
+                },
+                {
+                    "store": "TestStore",
+                    "sku": "TestSKU",
+                    "forecast_date": "2023-10-01",
+                    "date": "2023-10-03",
+                    "units": 6,
+                },
+            ],
+        )
+
+        self.client.force_authenticate(User.objects.create_user(username="ml"))
+        response = self.client.post(
+            reverse("forecast-load"),
+            data=content,
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"forecasts": 1, "days": 2})
+
+
+class RollupAPITestCase(TestCase):
+    """Тестирование вьюсетов агрегатов продаж."""
+
+    def setUp(self):
+        """Создание клиента API и тестовых агрегатов."""
+        self.client = APIClient()
+        for day in (1, 2, 3):
+            CityDailySales.objects.create(
+                city="City1",
+                date=date(2023, 1, day),
+                sales_units=day,
+                sales_units_promo=0,
+                sales_rub=day * 10,
+                sales_run_promo=0,
+            )
+
+    def test_list_city_rollups_by_period(self):
+        """
+        Act: Получение продаж города за период.
+
+        Assert: Проверка того, что в ответ попали только дни периода.
+        """
+        response = self.client.get(
+            "/api/rollups/cities/",
+            {"city": "City1", "date_after": "2023-01-02"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["sales_units"] for item in response.data], [2, 3]
+        )
+
+
+class ForecastAccuracyAPITestCase(TestCase):
+    """Тестирование ForecastAccuracyViewSet."""
+
+    def setUp(self):
+        """Создание клиента API и сумм точности прогнозов."""
+        self.client = APIClient()
+        Store.objects.create(store="TestStore")
+        Category.objects.create(sku="SKU1", category="Cat1")
+        Category.objects.create(sku="SKU2", category="Cat1")
+        for sku, horizon, fact, error, abs_error in (
+            ("SKU1", 1, 10, 2, 4),
+            ("SKU2", 1, 30, -6, 6),
+            ("SKU1", 2, 10, 5, 5),
+        ):
+            ForecastAccuracy.objects.create(
+                store_id="TestStore",
+                sku_id=sku,
+                horizon=horizon,
+                days=2,
+                forecast_units=fact + error,
+                fact_units=fact,
+                error_units=error,
+                abs_error_units=abs_error,
+            )
+
+    def test_accuracy_by_category_and_horizon(self):
+        """
+        Act: Получение точности по категориям и горизонтам.
+
+        Assert: Проверка метрик, рассчитанных по суммам SKU.
+        """
+        response = self.client.get(
+            "/api/accuracy/",
+            {"group_by": "category,horizon", "horizon_max": 1},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        row = response.data[0]
+        self.assertEqual((row["category"], row["horizon"]), ("Cat1", 1))
+        self.assertEqual(row["days"], 4)
+        self.assertEqual(row["fact_units"], 40)
+        self.assertAlmostEqual(row["wape"], 0.25)
+        self.assertAlmostEqual(row["bias"], -0.1)
+        self.assertAlmostEqual(row["mae"], 2.5)
+        self.assertNotIn("sku", row)
+
+    def test_accuracy_invalid_group_by(self):
+        """
+        Act: Запрос точности с неизвестным измерением.
+
+        Assert: Проверка ответа с ошибкой валидации.
+        """
+        response = self.client.get("/api/accuracy/", {"group_by": "city"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)